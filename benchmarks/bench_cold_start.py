@@ -0,0 +1,57 @@
+"""Import-time and cold-start benchmark, each sample in a fresh interpreter.
+
+    python -m benchmarks.bench_cold_start --runs 5
+    python -m benchmarks.bench_cold_start --runs 5 --build   # also build the runtime (needs .env and credentials.json)
+
+Building with the bundled prompt and static discovery needs no network; run
+with AGENT_PROMPT=hub to compare against the hub.pull path.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = {
+  "import src.backend.main": "import src.backend.main",
+  "import agent.assistant": "import src.backend.agent.assistant",
+  "build runtime": "import src.backend.main as m; m.build_assistant()",
+}
+
+SNIPPET = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+
+def sample(code: str, env: dict) -> float:
+  output = subprocess.run(
+    [sys.executable, "-c", SNIPPET.format(code=code)],
+    cwd=ROOT, env=env, capture_output=True, text=True, check=True
+  ).stdout
+  return float(output.strip().splitlines()[-1])
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--runs", type=int, default=5)
+  parser.add_argument("--build", action="store_true", help="include building the assistant runtime")
+  args = parser.parse_args()
+
+  env = dict(os.environ)
+  # Keep the session database out of the working tree
+  env.setdefault("SESSION_DB_PATH", os.path.join(tempfile.mkdtemp(), "sessions.db"))
+  stages = {k: v for k, v in STAGES.items() if args.build or k != "build runtime"}
+  for label, code in stages.items():
+    samples = [sample(code, env) for _ in range(args.runs)]
+    print(f"{label:<28} median={statistics.median(samples) * 1000:8.1f} ms  "
+          f"min={min(samples) * 1000:8.1f} ms  runs={len(samples)}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,54 @@
+"""Per-request setup cost: building a full CalendarAssistant vs. pairing a session with the shared runtime.
+
+Run from the repository root with a configured .env and credentials.json:
+
+    python -m benchmarks.bench_session_setup --requests 20
+"""
+import argparse
+import statistics
+import time
+
+from src.backend.agent.assistant import CalendarAssistant
+from src.backend.agent.session import ChatSession
+
+
+def _timed(fn, n):
+  samples = []
+  for _ in range(n):
+    start = time.perf_counter()
+    fn()
+    samples.append(time.perf_counter() - start)
+  return samples
+
+
+def _report(label, samples):
+  print(f"{label:<40} mean={statistics.mean(samples) * 1000:9.3f} ms  "
+        f"median={statistics.median(samples) * 1000:9.3f} ms  n={len(samples)}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--requests", type=int, default=20)
+  parser.add_argument("--history", type=int, default=20, help="messages in the loaded session")
+  args = parser.parse_args()
+
+  snapshot = ChatSession(session_id="bench").to_dict()
+  snapshot["chat_history"] = [
+    {"type": "human" if i % 2 == 0 else "ai", "content": f"message {i}"}
+    for i in range(args.history)
+  ]
+
+  # Before: every /chat built a whole assistant, then restored history into it
+  before = _timed(CalendarAssistant, args.requests)
+  # After: the runtime is built once, each request only restores the light session
+  runtime_build = _timed(CalendarAssistant, 1)
+  after = _timed(lambda: ChatSession.from_dict(snapshot), args.requests)
+
+  _report("before: CalendarAssistant per request", before)
+  _report("after: one-time runtime build", runtime_build)
+  _report("after: ChatSession.from_dict per request", after)
+  print(f"per-request setup speedup: {statistics.mean(before) / statistics.mean(after):.0f}x")
+
+
+if __name__ == "__main__":
+  main()
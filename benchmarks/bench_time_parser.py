@@ -0,0 +1,71 @@
+"""Time-expression parser: accuracy on the correctness corpus and parsing throughput.
+
+    python -m benchmarks.bench_time_parser --iterations 20000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import pytz
+
+from src.backend.agent import time_parser
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "time_expressions.json")
+
+
+def load_corpus():
+  with open(CORPUS_PATH) as f:
+    corpus = json.load(f)
+  tz = pytz.timezone(corpus["timezone"])
+  reference = datetime.fromisoformat(corpus["reference"]).astimezone(tz)
+  return corpus["cases"], tz, reference
+
+
+def check_accuracy(cases, tz, reference):
+  failures = []
+  for case in cases:
+    result = time_parser.parse_time_expression(case["text"], tz, reference)
+    if case.get("error"):
+      ok = "error" in result
+    else:
+      ok = (
+        "error" not in result
+        and result["start"] == datetime.fromisoformat(case["start"])
+        and result["end"] == datetime.fromisoformat(case["end"])
+      )
+    if not ok:
+      failures.append((case, result))
+  return failures
+
+
+def throughput(cases, tz, reference, iterations, cold):
+  texts = [case["text"] for case in cases]
+  start = time.perf_counter()
+  for i in range(iterations):
+    if cold:
+      time_parser._parse_cached.cache_clear()
+    time_parser.parse_time_expression(texts[i % len(texts)], tz, reference)
+  return iterations / (time.perf_counter() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--iterations", type=int, default=20000)
+  args = parser.parse_args()
+
+  cases, tz, reference = load_corpus()
+  failures = check_accuracy(cases, tz, reference)
+  print(f"accuracy: {len(cases) - len(failures)}/{len(cases)}")
+  for case, result in failures:
+    print(f"  FAIL {case['text']!r}: expected {case}, got {result}")
+
+  print(f"cold (no cache):  {throughput(cases, tz, reference, args.iterations, cold=True):12,.0f} parses/s")
+  time_parser._parse_cached.cache_clear()
+  print(f"warm (LRU cache): {throughput(cases, tz, reference, args.iterations, cold=False):12,.0f} parses/s")
+  print(f"cache: {time_parser.cache_info()}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,84 @@
+"""Local stand-in for the Google Calendar REST API, served over real HTTP.
+
+Serves FakeCalendarBackend (benchmarks/fakes.py) as an ASGI app so clients that
+talk HTTP directly, like AsyncGoogleCalendar, can run offline:
+
+    python -m benchmarks.fake_calendar_server --port 8081 --latency 0.05 --seed primary
+    GOOGLE_CALENDAR_API_URL=http://127.0.0.1:8081/calendar/v3 CALENDAR_ASYNC=true ...
+
+Latency is simulated with asyncio.sleep, so many slow requests can be in flight.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import socket
+import threading
+from urllib.parse import parse_qs
+
+from benchmarks.fakes import FakeCalendarBackend
+
+
+def create_app(backend: FakeCalendarBackend):
+  async def app(scope, receive, send):
+    if scope["type"] != "http":
+      return
+    body = b""
+    while True:
+      message = await receive()
+      body += message.get("body", b"")
+      if not message.get("more_body"):
+        break
+    if backend.latency:
+      await asyncio.sleep(backend.latency)
+    query = {key: values[-1] for key, values in parse_qs(scope["query_string"].decode()).items()}
+    status, result = backend.handle(scope["method"], scope["path"], query, json.loads(body) if body else None)
+    payload = json.dumps(result).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+      (b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())
+    ]})
+    await send({"type": "http.response.body", "body": payload})
+  return app
+
+
+@contextlib.contextmanager
+def serve_in_thread(backend: FakeCalendarBackend, host: str = "127.0.0.1", port: int = 0):
+  """Run the stand-in on a background thread, yielding its Calendar API base URL;
+  the server is shut down and its port released on exit"""
+  import uvicorn
+
+  sock = socket.socket()
+  sock.bind((host, port))
+  server = uvicorn.Server(uvicorn.Config(create_app(backend), log_level="warning", backlog=4096))
+  thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+  thread.start()
+  try:
+    while not server.started:
+      if not thread.is_alive():
+        raise RuntimeError("fake calendar server failed to start")
+      threading.Event().wait(0.01)
+    yield f"http://{host}:{sock.getsockname()[1]}/calendar/v3"
+  finally:
+    server.should_exit = True
+    thread.join(5)
+    sock.close()
+
+
+def main():
+  import uvicorn
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8081)
+  parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+  parser.add_argument("--seed", nargs="*", default=["primary"], help="calendars to create with sample meetings")
+  args = parser.parse_args()
+
+  backend = FakeCalendarBackend(args.seed, latency=args.latency)
+  for calendar_id in args.seed:
+    backend.seed(calendar_id)
+  uvicorn.run(create_app(backend), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,342 @@
+"""Offline stand-ins for Gemini and the Google Calendar API.
+
+FakeCalendarBackend keeps calendars in memory and answers the events.insert,
+events.list (including syncToken paging) and freebusy.query calls that
+GoogleCalendar makes. FakeCalendarHttp plugs it into googleapiclient as the
+http transport, so request building, batching and response parsing run for real:
+
+    backend = FakeCalendarBackend(["primary"], latency=0.05)
+    calendar = GoogleCalendar("primary", http=FakeCalendarHttp(backend))
+
+ScriptedChatModel is a chat model that answers either agent (the structured-chat
+prompt or native tool calling) with tool calls picked by keyword, then a final
+answer once it sees the observations.
+"""
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.parser import Parser
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httplib2
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def _parse(value: str) -> datetime:
+  dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+  return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _utc(dt: datetime) -> str:
+  return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _event_bounds(event: dict):
+  start, end = event["start"], event["end"]
+  if "dateTime" in start:
+    return _parse(start["dateTime"]), _parse(end["dateTime"])
+  return _parse(start["date"] + "T00:00:00"), _parse(end["date"] + "T00:00:00")
+
+
+class FakeCalendarBackend:
+  """In-memory Calendar API: one event list per calendar and a global change sequence for sync tokens"""
+  def __init__(self, calendar_ids=("primary",), latency: float = 0.0, timezone_name: str = "UTC"):
+    self.latency = latency
+    self.timezone_name = timezone_name
+    self.calendars = {calendar_id: {} for calendar_id in calendar_ids}
+    self.requests = Counter()
+    self._seq = itertools.count(1)
+    self._changes = {}
+    self._lock = threading.Lock()
+
+  def seed(self, calendar_id: str, days: int = 14, per_day: int = 3, start: datetime = None):
+    """Add per_day one-hour meetings on each of the next `days` days, starting at 10:00 UTC"""
+    start = (start or datetime.now(timezone.utc)).replace(hour=10, minute=0, second=0, microsecond=0)
+    for day in range(days):
+      for slot in range(per_day):
+        begin = start + timedelta(days=day, hours=2 * slot)
+        self.insert(calendar_id, {
+          "summary": f"Seeded meeting {day}.{slot}",
+          "start": {"dateTime": _utc(begin)},
+          "end": {"dateTime": _utc(begin + timedelta(hours=1))}
+        })
+
+  # Calendar API operations
+
+  def insert(self, calendar_id: str, body: dict):
+    """The created event, or None when body carries an id that is already taken"""
+    with self._lock:
+      events = self.calendars.setdefault(calendar_id, {})
+      event_id = body.get("id") or uuid.uuid4().hex
+      if event_id in events:
+        return None
+      event = {
+        "kind": "calendar#event",
+        "id": event_id,
+        "status": "confirmed",
+        "htmlLink": f"https://calendar.example/event?eid={event_id}",
+        "summary": body.get("summary", ""),
+        "start": body["start"],
+        "end": body["end"],
+        "updated": _utc(datetime.now(timezone.utc))
+      }
+      events[event_id] = event
+      self._changes[event_id] = next(self._seq)
+      return event
+
+  def delete(self, calendar_id: str, event_id: str):
+    with self._lock:
+      self.calendars[calendar_id][event_id]["status"] = "cancelled"
+      self._changes[event_id] = next(self._seq)
+
+  def list(self, calendar_id: str, params: dict):
+    with self._lock:
+      if calendar_id not in self.calendars:
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+      events = list(self.calendars[calendar_id].values())
+      if "syncToken" in params:
+        since = int(params["syncToken"])
+        events = [e for e in events if self._changes[e["id"]] > since]
+      else:
+        if params.get("showDeleted") != "true":
+          events = [e for e in events if e["status"] != "cancelled"]
+        if "timeMin" in params:
+          lo = _parse(params["timeMin"])
+          events = [e for e in events if _event_bounds(e)[1] > lo]
+        if "timeMax" in params:
+          hi = _parse(params["timeMax"])
+          events = [e for e in events if _event_bounds(e)[0] < hi]
+      events.sort(key=lambda e: _event_bounds(e)[0])
+      offset = int(params.get("pageToken", 0))
+      limit = int(params.get("maxResults", 250))
+      page = events[offset:offset + limit]
+      response = {"kind": "calendar#events", "timeZone": self.timezone_name, "items": page}
+      if offset + limit < len(events):
+        response["nextPageToken"] = str(offset + limit)
+      else:
+        response["nextSyncToken"] = str(max(self._changes.values(), default=0))
+      return 200, response
+
+  def freebusy(self, body: dict):
+    lo, hi = _parse(body["timeMin"]), _parse(body["timeMax"])
+    calendars = {}
+    with self._lock:
+      for item in body.get("items", []):
+        events = self.calendars.get(item["id"])
+        if events is None:
+          calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+          continue
+        intervals = []
+        for event in events.values():
+          if event["status"] == "cancelled" or event.get("transparency") == "transparent":
+            continue
+          start, end = _event_bounds(event)
+          if start < hi and end > lo:
+            intervals.append((max(start, lo), min(end, hi)))
+        merged = []
+        for start, end in sorted(intervals):
+          if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+          else:
+            merged.append([start, end])
+        calendars[item["id"]] = {"busy": [{"start": _utc(s), "end": _utc(e)} for s, e in merged]}
+    return 200, {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendars}
+
+  def handle(self, method: str, path: str, query: dict, body):
+    """Route one REST call; returns (status, json body)"""
+    match = re.fullmatch(r"/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?", path)
+    if match and match.group(2) and method == "GET":
+      self.requests["get"] += 1
+      event = self.calendars.get(unquote(match.group(1)), {}).get(unquote(match.group(2)))
+      return (200, event) if event else (404, {"error": {"code": 404, "message": "Not Found"}})
+    if match and method == "POST":
+      self.requests["insert"] += 1
+      event = self.insert(unquote(match.group(1)), body)
+      return (200, event) if event else (409, {"error": {"code": 409, "message": "The requested identifier already exists."}})
+    if match and method == "GET":
+      self.requests["list"] += 1
+      return self.list(unquote(match.group(1)), query)
+    if path == "/calendar/v3/freeBusy" and method == "POST":
+      self.requests["freebusy"] += 1
+      return self.freebusy(body)
+    return 404, {"error": {"code": 404, "message": f"No fake for {method} {path}"}}
+
+
+class FakeCalendarHttp:
+  """httplib2.Http look-alike that serves googleapiclient requests from a FakeCalendarBackend"""
+  def __init__(self, backend: FakeCalendarBackend):
+    self.backend = backend
+
+  def _call(self, method: str, uri: str, body):
+    parsed = urlparse(uri)
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    payload = json.loads(body) if body else None
+    return self.backend.handle(method, parsed.path, query, payload)
+
+  def _batch(self, headers: dict, body: str):
+    self.backend.requests["batch"] += 1
+    message = Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+    boundary = f"batch_{uuid.uuid4().hex}"
+    parts = []
+    for part in message.get_payload():
+      request_line, _, rest = part.get_payload().partition("\n")
+      method, uri, _ = request_line.strip().split(" ", 2)
+      inner = rest.replace("\r\n", "\n").split("\n\n", 1)
+      status, result = self._call(method, uri, inner[1] if len(inner) > 1 and inner[1].strip() else None)
+      content_id = part["Content-ID"].strip("<>")
+      parts.append(
+        f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+        f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(result)}\r\n"
+      )
+    content = "".join(parts) + f"--{boundary}--\r\n"
+    return httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={boundary}"}), content.encode()
+
+  def request(self, uri, method="GET", body=None, headers=None, redirections=None, connection_type=None):
+    if self.backend.latency:
+      time.sleep(self.backend.latency)
+    if urlparse(uri).path.startswith("/batch/"):
+      return self._batch(headers or {}, body)
+    status, result = self._call(method, uri, body)
+    return httplib2.Response({"status": status, "content-type": "application/json"}), json.dumps(result).encode()
+
+
+_TIME = (
+  r"(?P<time>(?:today|tomorrow|(?:next |this )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|week))"
+  r"(?:\s+(?:at\s+|from\s+)?\d{1,2}(?::\d{2})?\s*(?:am|pm)?(?:\s*(?:-|to)\s*\d{1,2}(?::\d{2})?\s*(?:am|pm)?)?)?)"
+)
+
+# (pattern, tool, arguments from the match); the first matching rule wins
+DEFAULT_RULES = [
+  (rf"\b(?:book|schedule|set up)\b.*?\b(?P<summary>[a-z]+ (?:sync|review|call|meeting))\b.*?{_TIME}", "CreateBooking",
+   lambda m: {"summary": m.group("summary").title(), "time_range": m.group("time")}),
+  (rf"\b(?:free slot|open slot|find (?:me )?(?:a |some )?(?:time|slot))\b.*?{_TIME}", "FindFreeSlots",
+   lambda m: {"time_range": m.group("time"), "duration_minutes": 30, "count": 3}),
+  (rf"\b(?:what(?:'s| is)|events|meetings|agenda|schedule)\b.*?{_TIME}", "ListEvents",
+   lambda m: {"time_range": m.group("time"), "max_results": 5}),
+  (rf"{_TIME}", "CheckAvailability",
+   lambda m: {"time_range": m.group("time")}),
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+  """Deterministic chat model for both agent modes.
+
+  Each clause of the user's message (split on ";" or "and also") maps to a tool
+  call chosen by the first matching rule ("yes" confirms a pending proposal).
+  For the structured-chat prompt the calls come one per LLM call, as that format
+  allows; with bound tools (AGENT_MODE=tool_calling) they all come in one
+  message. Once every call has an observation: a final answer quoting them. Any
+  other prompt (e.g. history summarization) gets a short plain-text reply.
+  `latency` seconds are slept per call to mimic Gemini.
+  """
+  latency: float = 0.0
+  rules: list = DEFAULT_RULES
+
+  @property
+  def _llm_type(self) -> str:
+    return "scripted-fake"
+
+  def bind_tools(self, tools, **kwargs):
+    return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+  @staticmethod
+  def _blob(action: str, action_input) -> str:
+    return "Action:\n```json\n" + json.dumps({"action": action, "action_input": action_input}) + "\n```"
+
+  @staticmethod
+  def _final(observations: list) -> str:
+    return "Here is what I found: " + " | ".join(observation.strip()[:300] for observation in observations)
+
+  def _proposal(self, messages):
+    for message in reversed(messages):
+      if isinstance(message, SystemMessage) and message.content.startswith("Booking proposal awaiting"):
+        return json.loads(message.content.split(": ", 1)[1])
+    return None
+
+  def _calls(self, messages, text: str) -> list:
+    """(tool, arguments) for each clause of the user's message"""
+    proposal = self._proposal(messages)
+    if proposal and re.match(r"^\s*(?:yes|yep|confirm|go ahead)\b", text):
+      return [("ConfirmBooking", {
+        "confirmation": True, "summary": proposal["summary"], "start_iso": proposal["start"], "end_iso": proposal["end"],
+        "idempotency_key": proposal.get("idempotency_key")
+      })]
+    calls = []
+    for clause in re.split(r"\s*(?:;|\band also\b)\s*", text):
+      for pattern, tool, arguments in self.rules:
+        match = re.search(pattern, clause)
+        if match:
+          calls.append((tool, arguments(match)))
+          break
+    return calls
+
+  def _reply(self, messages) -> str:
+    human = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    if not isinstance(human, str) or "(reminder to respond in a JSON blob" not in human:
+      return "Summary of the conversation so far."
+    user_input, _, scratchpad = human.partition("\n\n")
+    observations = [part.split("\nThought:", 1)[0] for part in scratchpad.split("Observation:")[1:]]
+    calls = self._calls(messages, user_input.lower())
+    if len(observations) < len(calls):
+      return self._blob(*calls[len(observations)])
+    if observations:
+      return self._blob("Final Answer", self._final(observations))
+    return self._blob("Final Answer", "I can check availability, list events and book meetings for you.")
+
+  def _tool_reply(self, messages) -> AIMessage:
+    if isinstance(messages[-1], ToolMessage):
+      observations = []
+      for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+          break
+        observations.insert(0, str(message.content))
+      return AIMessage(content=self._final(observations))
+    human = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    calls = self._calls(messages, str(human).lower())
+    if not calls:
+      return AIMessage(content="I can check availability, list events and book meetings for you.")
+    return AIMessage(content="", tool_calls=[
+      {"name": tool, "args": arguments, "id": f"call_{uuid.uuid4().hex[:12]}"} for tool, arguments in calls
+    ])
+
+  def _message(self, messages, kwargs) -> AIMessage:
+    if kwargs.get("tools"):
+      return self._tool_reply(messages)
+    return AIMessage(content=self._reply(messages))
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    if self.latency:
+      time.sleep(self.latency)
+    return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+  async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    if self.latency:
+      await asyncio.sleep(self.latency)
+    return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+
+def offline_assistant(backend: FakeCalendarBackend, llm: BaseChatModel, calendar_id: str = "primary"):
+  """CalendarAssistant wired to the fakes; needs no credentials.json or network"""
+  import os
+  os.environ.setdefault("GOOGLE_API_KEY", "offline")
+  os.environ.setdefault("GOOGLE_CALENDAR_ID", calendar_id)
+  from src.backend.agent.assistant import CalendarAssistant
+  from src.backend.agent.calendar_client import GoogleCalendar
+
+  class OfflineAssistant(CalendarAssistant):
+    def create_llm(self):
+      return llm
+
+    def create_calendar_client(self):
+      return GoogleCalendar(calendar_id, http=FakeCalendarHttp(backend))
+
+  return OfflineAssistant()
@@ -0,0 +1,246 @@
+"""Concurrent /chat load test.
+
+Offline, in-process with the scripted Gemini and fake Calendar API from
+benchmarks/fakes.py (no network, no credentials):
+
+    python -m benchmarks.load_chat --offline --sessions 1 4 16 64 --llm-latency 0.3 --calendar-latency 0.05
+
+Add --agent-mode tool_calling to use the native function-calling agent instead
+of the structured-chat one (the backend reads AGENT_MODE; set it yourself when
+targeting a running server). Add --async-calendar to run the native asyncio calendar tools against the
+stand-in server from benchmarks/fake_calendar_server.py (raise
+MAX_CONCURRENT_TURNS to let hundreds of turns run at once).
+
+Against a running backend (./start-backend.sh):
+
+    python -m benchmarks.load_chat --url http://localhost:8000 --sessions 1 4 16
+
+Each level runs that many sessions in parallel, each sending --turns messages
+back to back (cycling through --message, or a mixed default script offline).
+Reports throughput, p50/p95/p99 turn latency, LLM calls and parse-error retries
+per agent turn, speculative prefetch hit rate and waste (from /metrics) and,
+offline, traced memory per session. Every run is appended to benchmarks/results/load_chat.jsonl with the
+current commit and compared against the previous run with the same settings.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "load_chat.jsonl")
+
+# Offline default: listing, fast-path availability, a booking with its confirmation, and a slot search
+DEFAULT_SCRIPT = [
+  "what meetings do I have tomorrow",
+  "am I free tomorrow 2-4pm?",
+  "please book a team sync tomorrow 4pm",
+  "yes",
+  "could you find me a free slot next monday",
+]
+
+
+def percentile(ordered: list, q: float) -> float:
+  """Nearest-rank percentile of an already sorted list"""
+  if not ordered:
+    return float("nan")
+  index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+  return ordered[index]
+
+
+async def _session(client, messages, turns, latencies):
+  session_id = str(uuid.uuid4())
+  for turn in range(turns):
+    started = time.perf_counter()
+    response = await client.post("/chat", json={"session_id": session_id, "message": messages[turn % len(messages)]})
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_level(client, sessions, turns, messages):
+  latencies = []
+  start = time.perf_counter()
+  await asyncio.gather(*(_session(client, messages, turns, latencies) for _ in range(sessions)))
+  elapsed = time.perf_counter() - start
+  latencies.sort()
+  return {
+    "sessions": sessions,
+    "turns": len(latencies),
+    "elapsed_s": elapsed,
+    "throughput": len(latencies) / elapsed,
+    "p50_ms": 1000 * percentile(latencies, 50),
+    "p95_ms": 1000 * percentile(latencies, 95),
+    "p99_ms": 1000 * percentile(latencies, 99),
+  }
+
+
+async def memory_per_session(client, sessions, turns, messages) -> float:
+  """Traced bytes still allocated after running `sessions` new sessions, per session"""
+  gc.collect()
+  tracemalloc.start()
+  baseline = tracemalloc.get_traced_memory()[0]
+  await asyncio.gather(*(_session(client, messages, turns, []) for _ in range(sessions)))
+  gc.collect()
+  retained = tracemalloc.get_traced_memory()[0] - baseline
+  tracemalloc.stop()
+  return retained / sessions
+
+
+async def agent_stats(client) -> dict:
+  """Per-agent-turn LLM calls and parse-error retries plus prefetch outcomes so far, scraped from /metrics"""
+  text = (await client.get("/metrics")).text
+  totals = {}
+  for line in text.splitlines():
+    match = re.match(
+      r"assistant_(agent_llm_calls_sum|agent_llm_calls_count|agent_parse_error_retries_sum"
+      r"|calendar_prefetches_total|prefetch_wasted_total|prefetch_lookups_total)(?:\{([^}]*)\})? (\S+)", line
+    )
+    if match:
+      name = match.group(1)
+      if name == "prefetch_lookups_total":
+        name += "_hit" if 'result="hit"' in (match.group(2) or "") else "_miss"
+      totals[name] = totals.get(name, 0) + float(match.group(3))
+  stats = {"agent_turns": int(totals.get("agent_llm_calls_count", 0))}
+  if stats["agent_turns"]:
+    stats["llm_calls_per_turn"] = totals.get("agent_llm_calls_sum", 0) / stats["agent_turns"]
+    stats["parse_errors_per_turn"] = totals.get("agent_parse_error_retries_sum", 0) / stats["agent_turns"]
+  lookups = totals.get("prefetch_lookups_total_hit", 0) + totals.get("prefetch_lookups_total_miss", 0)
+  if totals.get("calendar_prefetches_total"):
+    stats["prefetches"] = int(totals["calendar_prefetches_total"])
+    stats["prefetch_hit_rate"] = totals.get("prefetch_lookups_total_hit", 0) / lookups if lookups else 0.0
+    stats["prefetch_wasted"] = int(totals.get("prefetch_wasted_total", 0))
+  return stats
+
+
+def offline_app(args, stack: contextlib.ExitStack):
+  """main.app with the shared runtime replaced by one wired to the fakes; servers it starts stop with `stack`"""
+  os.environ["AGENT_MODE"] = args.agent_mode
+  os.environ["PREFETCH"] = "true" if args.prefetch else "false"
+  os.environ.setdefault("SESSION_DB_PATH", os.path.join(tempfile.mkdtemp(), "sessions.db"))
+  from benchmarks.fakes import FakeCalendarBackend, ScriptedChatModel, offline_assistant
+  from src.backend import main
+
+  backend = FakeCalendarBackend(["primary"], latency=args.calendar_latency)
+  backend.seed("primary")
+  if args.async_calendar:
+    # Async tools talk HTTP to the stand-in server instead of the in-process transport
+    from benchmarks.fake_calendar_server import serve_in_thread
+    os.environ["GOOGLE_CALENDAR_API_URL"] = stack.enter_context(serve_in_thread(backend))
+    os.environ["CALENDAR_ASYNC"] = "true"
+  main._assistant = offline_assistant(backend, ScriptedChatModel(latency=args.llm_latency))
+  main._assistant.agent_executor.verbose = False
+  return main.app, backend
+
+
+def git_commit() -> str:
+  try:
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return commit + ("-dirty" if dirty else "")
+  except (OSError, subprocess.CalledProcessError):
+    return "unknown"
+
+
+def save_and_compare(record: dict):
+  previous = None
+  if os.path.exists(RESULTS_PATH):
+    with open(RESULTS_PATH) as f:
+      for line in f:
+        entry = json.loads(line)
+        if entry["config"] == record["config"]:
+          previous = entry
+  os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+  with open(RESULTS_PATH, "a") as f:
+    f.write(json.dumps(record) + "\n")
+  if previous is None:
+    return
+  print(f"\nvs {previous['commit']} ({previous['timestamp']}):")
+  earlier = {level["sessions"]: level for level in previous["levels"]}
+  for level in record["levels"]:
+    before = earlier.get(level["sessions"])
+    if before:
+      print(f"sessions={level['sessions']:<4} throughput {100 * (level['throughput'] / before['throughput'] - 1):+6.1f}%  "
+            f"p95 {100 * (level['p95_ms'] / before['p95_ms'] - 1):+6.1f}%")
+  if record.get("bytes_per_session") and previous.get("bytes_per_session"):
+    print(f"memory/session {100 * (record['bytes_per_session'] / previous['bytes_per_session'] - 1):+6.1f}%")
+
+
+async def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--url", default="http://localhost:8000")
+  parser.add_argument("--offline", action="store_true", help="run main.app in-process against the fakes")
+  parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+  parser.add_argument("--turns", type=int, default=3)
+  parser.add_argument("--message", action="append", help="message to send (repeat to cycle through several)")
+  parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake Gemini call (offline)")
+  parser.add_argument("--calendar-latency", type=float, default=0.05, help="seconds per fake Calendar round-trip (offline)")
+  parser.add_argument("--async-calendar", action="store_true", help="native async calendar tools against the stand-in server (offline)")
+  parser.add_argument("--agent-mode", choices=["structured", "tool_calling"], default="structured",
+                      help="AGENT_MODE for the in-process backend (offline)")
+  parser.add_argument("--prefetch", action="store_true", help="enable speculative calendar prefetch (offline)")
+  parser.add_argument("--memory-sessions", type=int, default=200, help="sessions for the memory pass (offline, 0 to skip)")
+  parser.add_argument("--no-save", action="store_true")
+  args = parser.parse_args()
+
+  messages = args.message or (DEFAULT_SCRIPT if args.offline else ["am I free tomorrow 2-4pm?"])
+  stack = contextlib.ExitStack()
+  if args.offline:
+    app, backend = offline_app(args, stack)
+    transport, base_url = httpx.ASGITransport(app=app), "http://offline"
+  else:
+    transport, base_url = None, args.url
+
+  with stack:
+    levels = []
+    bytes_per_session = None
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+      for sessions in args.sessions:
+        level = await run_level(client, sessions, args.turns, messages)
+        levels.append(level)
+        print(f"sessions={sessions:<4} turns={level['turns']:<5} throughput={level['throughput']:7.2f} turns/s  "
+              f"p50={level['p50_ms']:8.1f} ms  p95={level['p95_ms']:8.1f} ms  p99={level['p99_ms']:8.1f} ms")
+      if args.offline and args.memory_sessions:
+        bytes_per_session = await memory_per_session(client, args.memory_sessions, args.turns, messages)
+        print(f"memory/session={bytes_per_session / 1024:.1f} KiB (traced, {args.memory_sessions} sessions)")
+      stats = await agent_stats(client)
+      if stats["agent_turns"]:
+        print(f"agent turns={stats['agent_turns']}  llm calls/turn={stats['llm_calls_per_turn']:.2f}  "
+              f"parse errors/turn={stats['parse_errors_per_turn']:.2f}")
+      if stats.get("prefetches"):
+        print(f"prefetches={stats['prefetches']}  hit rate={100 * stats['prefetch_hit_rate']:.0f}%  wasted={stats['prefetch_wasted']}")
+    if args.offline:
+      print(f"calendar requests: {dict(backend.requests)}")
+
+  if not args.no_save:
+    save_and_compare({
+      "commit": git_commit(),
+      "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+      "config": {
+        "mode": "offline" if args.offline else args.url,
+        "turns": args.turns,
+        "messages": messages,
+        "llm_latency": args.llm_latency if args.offline else None,
+        "calendar_latency": args.calendar_latency if args.offline else None,
+        "async_calendar": args.async_calendar,
+        "agent_mode": args.agent_mode if args.offline else os.getenv("AGENT_MODE", "structured"),
+        "max_concurrent_turns": os.getenv("MAX_CONCURRENT_TURNS"),
+      },
+      "levels": levels,
+      "bytes_per_session": bytes_per_session,
+      **stats,
+    })
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
@@ -1,31 +1,72 @@
-import getpass, os, sys, logging, pytz, uuid, re
+import asyncio, bisect, contextlib, contextvars, functools, getpass, hashlib, json, os, sys, logging, pytz, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import StructuredTool
-from langchain import hub
-from langchain.agents import AgentExecutor, create_structured_chat_agent
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain.agents import AgentExecutor, create_structured_chat_agent, create_tool_calling_agent
 from tenacity import retry, stop_after_attempt, wait_exponential
-import dateutil.parser
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from .calendar_client import GoogleCalendar  # Relative import
-from .schemas import ListEventsSchema, CreateBookingSchema, CheckAvailabilitySchema, ConfirmBookingSchema
+from .calendar_client import GoogleCalendar, iter_events  # Relative import
+from .calendar_mirror import AsyncCalendarMirror, CalendarMirror, to_utc_iso
+from .calendar_scheduler import AsyncCalendarScheduler, CalendarScheduler
+from .callbacks import TurnMetricsHandler
+from .free_slots import BusyIndex, combine_busy, find_free_slots
+from .fast_path import FastPathRouter
+from .time_parser import parse_time_expression
+from .history import HistoryManager
+from .metrics import TURN_SECONDS
+from .prefetch import CalendarPrefetcher, current_prefetch
+from .prompts import structured_chat_prompt, tool_calling_prompt
+from .response_cache import DiskCacheBackend, MemoryCacheBackend, ResponseCache
+from .schemas import BulkBookingSchema, ListEventsSchema, CreateBookingSchema, CheckAvailabilitySchema, CheckMultipleAvailabilitySchema, ConfirmBookingSchema, FindFreeSlotsSchema, TeamAvailabilitySchema
+from .session import ChatMessage, ChatSession, DEFAULT_TIMEZONE, message_to_dict
+
+# Session whose turn is currently running; tools read the user timezone from it
+_current_session: ContextVar = ContextVar("current_session", default=None)
+# What AgentExecutor returns when it runs out of iterations or time
+AGENT_STOPPED_OUTPUTS = ("Agent stopped due to iteration limit or time limit.", "Agent stopped due to max iterations.")
+
 
 class CalendarAssistant:
-  def __init__(self, session_id: str = None):
+  """Process-wide runtime: LLM client, calendar service, tools and agent executor.
+
+  Built once per worker and shared by every session. Per-session state lives in
+  ChatSession and is handed to chat() on each turn.
+  """
+  def __init__(self):
     load_dotenv()
     self.configure_logging()
     self.configure_api_keys()
+    self.default_timezone = pytz.timezone(DEFAULT_TIMEZONE)  # IST timezone
+    # Blocking calendar tools run on a bounded pool so async turns never stall the event loop
+    self.tool_executor = ThreadPoolExecutor(
+      max_workers=int(os.getenv("TOOL_WORKERS", "8")),
+      thread_name_prefix="calendar-tool"
+    )
+    self.turn_semaphore = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_TURNS", "16")))
     self.llm = self.create_llm()
-    self.calendar = GoogleCalendar()
+    self.calendar = self.create_calendar()
+    self.acalendar = self.create_async_calendar()
+    self.cache = self.create_cache()
     self.tools = self.create_tools()
+    # "structured": ReAct JSON blobs, one tool per LLM call; "tool_calling": Gemini function calls, several per step
+    self.agent_mode = os.getenv("AGENT_MODE", "structured").lower()
     self.agent_executor = self.create_agent_executor()
-    # Initialize session and chat history
-    self.session_id = session_id or str(uuid.uuid4())
-    self.chat_history = []
-    self.user_timezone = pytz.timezone("Asia/Kolkata")  # IST timezone
+    self.history = HistoryManager(
+      self.llm,
+      token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "2000")),
+      keep_recent=int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+    )
+    # Deterministic answers for simple availability/listing questions
+    self.router = FastPathRouter(self) if os.getenv("FAST_PATH", "true").lower() == "true" else None
+    self.prefetcher = self.create_prefetcher()
+
+  @property
+  def user_timezone(self):
+    session = _current_session.get()
+    return session.user_timezone if session else self.default_timezone
   
   def configure_logging(self):
     logging.basicConfig(level=logging.INFO)
@@ -40,6 +81,8 @@ class CalendarAssistant:
   
   @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
   def create_llm(self):
+    # Deferred: the Gemini client pulls in the whole generativelanguage stack
+    from langchain_google_genai import ChatGoogleGenerativeAI
     return ChatGoogleGenerativeAI(
         model="gemini-2.0-flash",
         temperature=0,
@@ -47,95 +90,183 @@ class CalendarAssistant:
         max_retries=5,
     )
   
+  def create_calendar_client(self):
+    return GoogleCalendar()
+  
+  def schedule(self, calendar, scheduler_class=CalendarScheduler):
+    """Put the shared quota-aware scheduler in front of a calendar client"""
+    if os.getenv("CALENDAR_SCHEDULER", "true").lower() != "true":
+      return calendar
+    return scheduler_class(
+      calendar,
+      rate=float(os.getenv("CALENDAR_RATE_LIMIT", "10")),
+      burst=float(os.getenv("CALENDAR_RATE_BURST", "20")),
+      max_attempts=int(os.getenv("CALENDAR_MAX_RETRIES", "5"))
+    )
+  
+  def create_calendar(self):
+    calendar = self.schedule(self.create_calendar_client())
+    if os.getenv("CALENDAR_MIRROR", "true").lower() != "true":
+      return calendar
+    # Serve reads from a local mirror kept current with incremental sync
+    return CalendarMirror(
+      calendar,
+      max_staleness=float(os.getenv("CALENDAR_MIRROR_MAX_STALENESS", "30")),
+      lookback_days=int(os.getenv("CALENDAR_MIRROR_LOOKBACK_DAYS", "30"))
+    )
+  
+  def create_async_calendar(self):
+    """Native asyncio client for async agent turns, or None to offload the sync tools to threads"""
+    if os.getenv("CALENDAR_ASYNC", "false").lower() != "true":
+      return None
+    from .async_calendar_client import AsyncGoogleCalendar
+    # A GOOGLE_CALENDAR_API_URL override points at a local stand-in that needs no token
+    credentials = None if os.getenv("GOOGLE_CALENDAR_API_URL") else GoogleCalendar.shared_credentials()
+    acalendar = self.schedule(AsyncGoogleCalendar(credentials=credentials), AsyncCalendarScheduler)
+    if isinstance(self.calendar, CalendarMirror):
+      # Keep async reads on the mirror too; only what it can't answer goes to Google
+      return AsyncCalendarMirror(self.calendar, acalendar, self.tool_executor)
+    return acalendar
+  
+  def create_prefetcher(self):
+    """Speculative calendar reads for the time ranges in a message, overlapped with LLM planning.
+    Off by default: each unused read still spends calendar quota."""
+    if os.getenv("PREFETCH", "false").lower() != "true":
+      return None
+    return CalendarPrefetcher(
+      self,
+      operations=tuple(op.strip() for op in os.getenv("PREFETCH_OPERATIONS", "freebusy,list").split(",") if op.strip()),
+      max_ranges=int(os.getenv("PREFETCH_MAX_RANGES", "2")),
+      max_results=int(os.getenv("PREFETCH_LIST_RESULTS", "10"))
+    )
+  
+  def create_cache(self):
+    backend = os.getenv("RESPONSE_CACHE", "memory").lower()
+    size = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    if backend == "memory":
+      cache_backend = MemoryCacheBackend(max_entries=size)
+    elif backend == "disk":
+      cache_backend = DiskCacheBackend(os.getenv("RESPONSE_CACHE_PATH", "response_cache.db"), max_entries=size)
+    else:
+      return None
+    ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # Changes made outside this service only reach the mirror on its next sync, and a
+    # cache hit never triggers one: don't serve answers older than the mirror may be
+    max_staleness = getattr(self.calendar, "max_staleness", None)
+    if max_staleness is not None:
+      ttl = min(ttl, max_staleness)
+    return ResponseCache(cache_backend, ttl=ttl)
+  
+  def calendar_state(self) -> tuple:
+    """Calendar identity and version; any booking (in any worker sharing the cache) or synced change moves it"""
+    calendar_id = self.calendar.calendar_id
+    generation = self.cache.generation(calendar_id) if self.cache is not None else 0
+    return calendar_id, generation, getattr(self.calendar, "version", 0)
+  
+  def calendar_changed(self):
+    """Invalidate cached replies and tool results after a booking"""
+    if self.cache is not None:
+      self.cache.bump(self.calendar.calendar_id)
+  
+  def cached(self, name: str, func):
+    """Wrap a read-only tool so identical calls against the same calendar state hit the cache"""
+    if self.cache is None:
+      return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+      key = self.cache.make_key(
+        "tool", name, args, kwargs, self.user_timezone.zone,
+        datetime.now(self.user_timezone).date(), self.calendar_state()
+      )
+      result = self.cache.get("tool", key)
+      if result is None:
+        result = func(*args, **kwargs)
+        if "error" not in result:
+          self.cache.set(key, result)
+      return result
+    return wrapper
+  
+  def acached(self, name: str, coroutine):
+    """Async counterpart of cached()"""
+    if self.cache is None:
+      return coroutine
+    @functools.wraps(coroutine)
+    async def wrapper(*args, **kwargs):
+      key = self.cache.make_key(
+        "tool", name, args, kwargs, self.user_timezone.zone,
+        datetime.now(self.user_timezone).date(), self.calendar_state()
+      )
+      result = self.cache.get("tool", key)
+      if result is None:
+        result = await coroutine(*args, **kwargs)
+        if "error" not in result:
+          self.cache.set(key, result)
+      return result
+    return wrapper
+  
+  def _prefetched(self, operation: str, start_iso: str, end_iso: str, max_results: int = None):
+    prefetch = current_prefetch.get()
+    return prefetch.take(operation, start_iso, end_iso, max_results) if prefetch is not None else None
+  
+  def _freebusy(self, start_iso: str, end_iso: str) -> list:
+    """Busy slots for a range, handed over from this turn's prefetch when it covered the range"""
+    call = self._prefetched("freebusy", start_iso, end_iso)
+    if call is not None:
+      try:
+        return call.result()
+      except Exception as e:
+        self.logger.warning(f"Prefetched freebusy failed, fetching again: {str(e)}")
+    return self.calendar.get_freebusy(start_iso, end_iso)
+  
+  async def _afreebusy(self, start_iso: str, end_iso: str) -> list:
+    call = self._prefetched("freebusy", start_iso, end_iso)
+    if call is not None:
+      try:
+        return await asyncio.wrap_future(call)
+      except Exception as e:
+        self.logger.warning(f"Prefetched freebusy failed, fetching again: {str(e)}")
+    return await self.acalendar.get_freebusy(start_iso, end_iso)
+  
+  def _list_events(self, start_iso: str, end_iso: str, max_results: int) -> list:
+    call = self._prefetched("list", start_iso, end_iso, max_results)
+    if call is not None:
+      try:
+        # Prefetched with a larger page; events come ordered by start time
+        return call.result()[:max_results]
+      except Exception as e:
+        self.logger.warning(f"Prefetched event list failed, fetching again: {str(e)}")
+    return self.calendar.list_events(start_iso, end_iso, max_results)
+  
+  async def _alist_events(self, start_iso: str, end_iso: str, max_results: int) -> list:
+    call = self._prefetched("list", start_iso, end_iso, max_results)
+    if call is not None:
+      try:
+        return (await asyncio.wrap_future(call))[:max_results]
+      except Exception as e:
+        self.logger.warning(f"Prefetched event list failed, fetching again: {str(e)}")
+    return await self.acalendar.list_events(start_iso, end_iso, max_results)
+  
+  @contextlib.contextmanager
+  def prefetching(self, user_input: str, in_loop: bool = False):
+    """Run the enclosed agent call with calendar reads for the message's time ranges already in flight.
+    in_loop: the turn runs on the event loop, so native async reads can be used"""
+    prefetch = None
+    if self.prefetcher is not None:
+      prefetch = self.prefetcher.astart(user_input) if in_loop else self.prefetcher.start(user_input)
+    token = current_prefetch.set(prefetch)
+    try:
+      yield prefetch
+    finally:
+      current_prefetch.reset(token)
+      if prefetch is not None:
+        prefetch.finish()
+  
   def parse_time(self, time_str: str, reference: datetime = None) -> dict:
     """Parse natural language time expressions into start and end times"""
-    if not reference:
-      reference = datetime.now(self.user_timezone)
-        
-    time_str = time_str.lower().strip()
-    
-    # Handle relative times
-    if time_str in ["now", "current time"]:
-      start = reference
-      end = start + timedelta(hours=1)
-      return {"start": start, "end": end}
-    
-    if time_str == "today":
-      start = reference.replace(hour=0, minute=0, second=0, microsecond=0)
-      end = start + timedelta(days=1)
-      return {"start": start, "end": end}
-    
-    if time_str == "tomorrow":
-      start = reference.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-      end = start + timedelta(days=1)
-      return {"start": start, "end": end}
-    
-    # Handle time ranges
-    try:
-      # NEW: Pre-process to ensure future dates
-      if re.match(r"^(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)", time_str):
-          # If month is specified without year, assume future date
-          if not re.search(r"\d{4}", time_str):
-              # Add current year if missing
-              time_str = f"{time_str} {reference.year}"
-      
-      # Try to parse as a time range
-      if " to " in time_str or "-" in time_str:
-        separator = " to " if " to " in time_str else "-"
-        start_part, end_part = time_str.split(separator, 1)
-        
-        # Parse start time with exact hour handling
-        start_dt = self._parse_with_future_preference(start_part.strip(), reference)
-        
-        # Parse end time with exact hour handling
-        end_dt = self._parse_with_future_preference(end_part.strip(), start_dt)
-        
-        return {"start": start_dt, "end": end_dt}
-      
-      # Parse single time point with future preference
-      dt = self._parse_with_future_preference(time_str, reference)
-        
-        # Default to 1 hour duration
-      return {"start": dt, "end": dt + timedelta(hours=1)}
-    
-    except Exception as e:
-      self.logger.error(f"Time parsing failed: {str(e)}")
-      return {"error": f"Could not parse time: {time_str}"}   
-
-  def _parse_with_future_preference(self, time_str: str, reference: datetime) -> datetime:
-    """Parse time with preference for future dates and exact hour handling"""
-    try:
-      # First try to parse normally
-      dt = dateutil.parser.parse(time_str, fuzzy=True, default=reference)
-      
-      # Extract time components from the string
-      hour_match = re.search(r'(\d{1,2})(?::\d{1,2})?\s*(am|pm)?', time_str, re.IGNORECASE)
-      if hour_match:
-        hour = int(hour_match.group(1))
-        period = hour_match.group(2).lower() if hour_match.group(2) else None
-        
-        # Convert to 24-hour format
-        if period == 'pm' and hour < 12:
-            hour += 12
-        elif period == 'am' and hour == 12:
-            hour = 0
-            
-        # Check if minutes were specified
-        minute_match = re.search(r':(\d{1,2})', time_str)
-        minutes = int(minute_match.group(1)) if minute_match else 0
-        
-        # Set exact time
-        dt = dt.replace(hour=hour, minute=minutes, second=0, microsecond=0)
-      
-      # Handle timezone
-      if not dt.tzinfo:
-        dt = self.user_timezone.localize(dt)
-      else:
-        dt = dt.astimezone(self.user_timezone)
-          
-      return dt
-    except:
-        return reference
+    result = parse_time_expression(time_str, self.user_timezone, reference)
+    if "error" in result:
+      self.logger.error(f"Time parsing failed: {result['error']}")
+    return result
       
   def format_time(self, dt: datetime) -> str:
     """Format datetime for user display"""
@@ -149,6 +280,23 @@ class CalendarAssistant:
     except (ValueError, TypeError):
         return False
   
+  def _availability_result(self, parsed_time: dict, busy_slots: list) -> dict:
+    formatted_start = self.format_time(parsed_time["start"])
+    formatted_end = self.format_time(parsed_time["end"])
+    self.logger.debug(f"Busy slots: {busy_slots}")
+    if busy_slots:
+      return {
+          "available": False,
+          "busy_slots": busy_slots,
+          "message": f"Busy between {formatted_start} and {formatted_end}",
+          "suggestions": ["Try a different time", "Adjust the duration"]
+      }
+    return {
+        "available": True,
+        "busy_slots": [],
+        "message": f"Available between {formatted_start} and {formatted_end}"
+    }
+  
   def check_availability_tool(self, time_range: str) -> dict:
     """
     Check calendar availability in a given time range
@@ -159,26 +307,75 @@ class CalendarAssistant:
       if "error" in parsed_time:
           return {"error": parsed_time["error"]}
       
-      start_iso = parsed_time["start"].isoformat()
-      end_iso = parsed_time["end"].isoformat()
+      busy_slots = self._freebusy(parsed_time["start"].isoformat(), parsed_time["end"].isoformat())
+      return self._availability_result(parsed_time, busy_slots)
+    except Exception as e:
+      self.logger.error(f"Availability check failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  async def acheck_availability_tool(self, time_range: str) -> dict:
+    try:
+      parsed_time = self.parse_time(time_range)
+      if "error" in parsed_time:
+          return {"error": parsed_time["error"]}
+      
+      busy_slots = await self._afreebusy(parsed_time["start"].isoformat(), parsed_time["end"].isoformat())
+      return self._availability_result(parsed_time, busy_slots)
+    except Exception as e:
+      self.logger.error(f"Availability check failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  def _parse_ranges(self, time_ranges: list):
+    """Parsed ranges, or an error dict for the first one that fails"""
+    parsed = []
+    for time_range in time_ranges:
+      parsed_time = self.parse_time(time_range)
+      if "error" in parsed_time:
+        return {"error": parsed_time["error"]}
+      parsed.append(parsed_time)
+    return parsed
+  
+  def _multiple_availability_result(self, time_ranges: list, parsed: list, busy_lists: list) -> dict:
+    results = []
+    for time_range, parsed_time, busy_slots in zip(time_ranges, parsed, busy_lists):
+      window = f"{self.format_time(parsed_time['start'])} and {self.format_time(parsed_time['end'])}"
+      results.append({
+        "time_range": time_range,
+        "available": not busy_slots,
+        "busy_slots": busy_slots,
+        "message": f"{'Busy' if busy_slots else 'Available'} between {window}"
+      })
+    free = sum(1 for r in results if r["available"])
+    return {"results": results, "message": f"{free} of {len(results)} ranges are available"}
+  
+  def check_multiple_availability_tool(self, time_ranges: list) -> dict:
+    """
+    Check several time ranges with one batched calendar round-trip
+    Returns: {results: list, message: str, error: str}
+    """
+    try:
+      parsed = self._parse_ranges(time_ranges)
+      if isinstance(parsed, dict):
+        return parsed
       
-      busy_slots = self.calendar.get_freebusy(start_iso, end_iso)
+      busy_lists = self.calendar.get_freebusy_many(
+        [(p["start"].isoformat(), p["end"].isoformat()) for p in parsed]
+      )
+      return self._multiple_availability_result(time_ranges, parsed, busy_lists)
+    except Exception as e:
+      self.logger.error(f"Availability check failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  async def acheck_multiple_availability_tool(self, time_ranges: list) -> dict:
+    try:
+      parsed = self._parse_ranges(time_ranges)
+      if isinstance(parsed, dict):
+        return parsed
       
-      formatted_start = self.format_time(parsed_time["start"])
-      formatted_end = self.format_time(parsed_time["end"])
-      logging.info("debugging >> ", busy_slots) 
-      if busy_slots:
-        return {
-            "available": False,
-            "busy_slots": busy_slots,
-            "message": f"Busy between {formatted_start} and {formatted_end}",
-            "suggestions": ["Try a different time", "Adjust the duration"]
-        }
-      return {
-          "available": True,
-          "busy_slots": [],
-          "message": f"Available between {formatted_start} and {formatted_end}"
-      }
+      busy_lists = await self.acalendar.get_freebusy_many(
+        [(p["start"].isoformat(), p["end"].isoformat()) for p in parsed]
+      )
+      return self._multiple_availability_result(time_ranges, parsed, busy_lists)
     except Exception as e:
       self.logger.error(f"Availability check failed: {str(e)}")
       return {"error": f"Calendar error: {str(e)}"}
@@ -209,30 +406,374 @@ class CalendarAssistant:
         "proposed_summary": summary,
         "proposed_start": parsed_time["start"].isoformat(),
         "proposed_end": parsed_time["end"].isoformat(),
+        # Fresh per proposal: retries of this confirmation dedupe, a later proposal books anew
+        "idempotency_key": uuid.uuid4().hex,
         "message": confirmation_msg
       }
     except Exception as e:
       return {"error": f"Error: {str(e)}"} 
       
   
+  def booking_key(self, summary: str, start_iso: str, end_iso: str, scope: str) -> str:
+    """Calendar event ID for one event of a bulk booking: a hash of the booking's scope and the event.
+
+    Event IDs only allow base32hex characters; hex digits qualify.
+    """
+    start = datetime.fromisoformat(start_iso).astimezone(timezone.utc).isoformat()
+    end = datetime.fromisoformat(end_iso).astimezone(timezone.utc).isoformat()
+    payload = json.dumps([scope, summary, start, end])
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+  
+  def confirmation_key(self, summary: str, start_iso: str, end_iso: str, idempotency_key: str = None) -> str:
+    """Event ID for a confirmation: the key the model passed, else the pending proposal's key
+    when it is this booking, else a fresh one"""
+    if idempotency_key:
+      return idempotency_key
+    session = _current_session.get()
+    proposal = session.pending_proposal if session else None
+    if (proposal and proposal.get("idempotency_key") and proposal["summary"] == summary
+        and datetime.fromisoformat(proposal["start"]) == datetime.fromisoformat(start_iso)
+        and datetime.fromisoformat(proposal["end"]) == datetime.fromisoformat(end_iso)):
+      return proposal["idempotency_key"]
+    return uuid.uuid4().hex
+  
+  def _booking_result(self, event: dict) -> dict:
+    self.calendar_changed()
+    return {
+        "success": True,
+        "event_link": event.get("htmlLink", "No link available"),
+        "message": "✅ Booking confirmed and created"
+    }
+  
   def confirm_booking_tool(self, confirmation: bool, 
                             summary: str, 
                             start_iso: str, 
-                            end_iso: str) -> dict:
+                            end_iso: str,
+                            idempotency_key: str = None) -> dict:
     """Finalize booking after confirmation"""
     if not confirmation:
       return {"success": False, "message": "❌ Booking canceled"}
         
     try:
-      # Create the booking
-      event = self.calendar.create_booking(summary, start_iso, end_iso)
+      # Create the booking; a replayed confirmation gets the original event back
+      event = self.calendar.create_booking(
+        summary, start_iso, end_iso, self.confirmation_key(summary, start_iso, end_iso, idempotency_key)
+      )
+      return self._booking_result(event)
+    except Exception as e:
+      return {"error": f"Booking error: {str(e)}"} 
+  
+  async def aconfirm_booking_tool(self, confirmation: bool, summary: str, start_iso: str, end_iso: str,
+                                  idempotency_key: str = None) -> dict:
+    if not confirmation:
+      return {"success": False, "message": "❌ Booking canceled"}
+    try:
+      event = await self.acalendar.create_booking(
+        summary, start_iso, end_iso, self.confirmation_key(summary, start_iso, end_iso, idempotency_key)
+      )
+      return self._booking_result(event)
+    except Exception as e:
+      return {"error": f"Booking error: {str(e)}"}
+  
+  def bulk_book(self, events: list, dry_run: bool = False, idempotency_key: str = None) -> dict:
+    """Book many events at once. events: {"summary", "start", "end"} dicts with aware datetimes,
+    or {"summary", "error"} for ones that failed to parse. Event IDs derive from idempotency_key;
+    without one a random key is minted and returned, for the client to send back when it
+    confirms a dry run or retries, so the same plan never books twice.
+
+    Every event is checked against one freebusy snapshot spanning them all and
+    against earlier events in the same request; the conflict-free ones are then
+    inserted in batched calls. Returns counts and one outcome per event, in order.
+    """
+    limit = int(os.getenv("BULK_BOOKING_LIMIT", "500"))
+    if len(events) > limit:
+      raise ValueError(f"At most {limit} events per bulk booking")
+    results = []
+    valid = []
+    for index, event in enumerate(events):
+      result = {"index": index, "summary": event["summary"]}
+      results.append(result)
+      if "error" in event:
+        result.update(status="invalid", error=event["error"])
+        continue
+      result.update(start=event["start"].isoformat(), end=event["end"].isoformat())
+      if event["end"] <= event["start"]:
+        result.update(status="invalid", error="End time is before start time")
+        continue
+      valid.append((result, event["start"], event["end"]))
+
+    accepted = []
+    if valid:
+      busy = BusyIndex(self.calendar.get_freebusy(
+        to_utc_iso(min(start for _, start, _ in valid)), to_utc_iso(max(end for _, _, end in valid))
+      ))
+      # Accepted events never overlap, so sorted by start their ends are sorted too
+      taken_starts, taken = [], []
+      for result, start, end in valid:
+        conflicts = busy.overlapping(start, end)
+        if conflicts:
+          result.update(status="conflict", conflicts=[{"start": to_utc_iso(lo), "end": to_utc_iso(hi)} for lo, hi in conflicts])
+          continue
+        i = bisect.bisect_left(taken_starts, end)
+        if i and taken[i - 1][1] > start:
+          result.update(status="conflict", conflicts_with=taken[i - 1][2])
+          continue
+        taken_starts.insert(i, start)
+        taken.insert(i, (start, end, result["index"]))
+        accepted.append(result)
+
+    scope = idempotency_key or uuid.uuid4().hex
+    if dry_run:
+      for result in accepted:
+        result["status"] = "available"
+    elif accepted:
+      outcomes = self.calendar.create_bookings([
+        (result["summary"], result["start"], result["end"],
+         self.booking_key(result["summary"], result["start"], result["end"], scope=scope))
+        for result in accepted
+      ])
+      for result, (event, error) in zip(accepted, outcomes):
+        if error is None:
+          result.update(status="booked", event_id=event.get("id"), event_link=event.get("htmlLink"))
+        else:
+          result.update(status="failed", error=str(error))
+      if any(result["status"] == "booked" for result in accepted):
+        self.calendar_changed()
+
+    counts = {}
+    for result in results:
+      counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"counts": counts, "results": results, "idempotency_key": scope}
+  
+  def localize(self, dt: datetime) -> datetime:
+    """Aware datetime; naive values are taken as the user's timezone"""
+    return self.user_timezone.localize(dt) if dt.tzinfo is None else dt
+  
+  def bulk_event(self, summary: str, start: datetime, end: datetime) -> dict:
+    """A bulk_book entry"""
+    return {"summary": summary, "start": self.localize(start), "end": self.localize(end)}
+  
+  def bulk_booking_tool(self, events: list, confirmation: bool = False, idempotency_key: str = None) -> dict:
+    """
+    Check (confirmation=False) or book (confirmation=True) many events in one go
+    Returns: {counts: dict, results: list, message: str, error: str}
+    """
+    try:
+      entries = []
+      for event in events:
+        item = event.model_dump() if hasattr(event, "model_dump") else dict(event)
+        parsed_time = self.parse_time(item["time_range"])
+        if "error" in parsed_time:
+          entries.append({"summary": item["summary"], "error": parsed_time["error"]})
+        else:
+          entries.append(self.bulk_event(item["summary"], parsed_time["start"], parsed_time["end"]))
+      result = self.bulk_book(entries, dry_run=not confirmation, idempotency_key=idempotency_key)
+    except Exception as e:
+      self.logger.error(f"Bulk booking failed: {str(e)}")
+      return {"error": f"Booking error: {str(e)}"}
+    counts = ", ".join(f"{count} {status}" for status, count in result["counts"].items())
+    if confirmation:
+      result["message"] = f"Bulk booking done: {counts}"
+    else:
+      result["confirmation_required"] = True
+      result["message"] = (
+        f"Checked {len(entries)} events ({counts}). Show the user and call again with confirmation=true "
+        "and this idempotency_key to book the available ones."
+      )
+    return result
+  
+  def _free_slots(self, busy: list, window_start: datetime, window_end: datetime,
+                  duration_minutes: int, count: int) -> list:
+    return find_free_slots(
+      busy, window_start, window_end,
+      duration=timedelta(minutes=duration_minutes),
+      count=count,
+      tz=self.user_timezone,
+      work_start=int(os.getenv("WORKING_HOURS_START", "9")),
+      work_end=int(os.getenv("WORKING_HOURS_END", "18"))
+    )
+  
+  def find_free_slots(self, window_start: datetime, window_end: datetime,
+                      duration_minutes: int = 60, count: int = 3) -> list:
+    """Earliest free slots in the window from a single freebusy query"""
+    busy = self._freebusy(window_start.isoformat(), window_end.isoformat())
+    return self._free_slots(busy, window_start, window_end, duration_minutes, count)
+  
+  async def afind_free_slots(self, window_start: datetime, window_end: datetime,
+                             duration_minutes: int = 60, count: int = 3) -> list:
+    busy = await self._afreebusy(window_start.isoformat(), window_end.isoformat())
+    return self._free_slots(busy, window_start, window_end, duration_minutes, count)
+  
+  def _slot_window(self, time_range: str = None):
+    """(window_start, window_end) for a free-slot search, or an error dict"""
+    if time_range:
+      parsed_time = self.parse_time(time_range)
+      if "error" in parsed_time:
+          return {"error": parsed_time["error"]}
+      return parsed_time["start"], parsed_time["end"]
+    # Next 14 days, starting at the next quarter hour
+    now = datetime.now(self.user_timezone)
+    window_start = (now + timedelta(minutes=15 - now.minute % 15)).replace(second=0, microsecond=0)
+    return window_start, window_start + timedelta(days=14)
+  
+  def _slots_result(self, slots: list, window_start: datetime, window_end: datetime, duration_minutes: int) -> dict:
+    if not slots:
       return {
-          "success": True,
-          "event_link": event.get("htmlLink", "No link available"),
-          "message": "✅ Booking confirmed and created"
+        "count": 0,
+        "slots": [],
+        "message": f"No free {duration_minutes}-minute slots between {self.format_time(window_start)} and {self.format_time(window_end)}"
       }
+    return {
+      "count": len(slots),
+      "slots": [
+        {"start": start.isoformat(), "end": end.isoformat(), "display": f"{self.format_time(start)} - {self.format_time(end)}"}
+        for start, end in slots
+      ],
+      "message": f"Found {len(slots)} free {duration_minutes}-minute slots"
+    }
+  
+  def find_free_slots_tool(self, duration_minutes: int = 60, time_range: str = None, count: int = 3) -> dict:
+    """
+    Find the earliest free slots of the given duration
+    Returns: {slots: list, count: int, message: str, error: str}
+    """
+    try:
+      window = self._slot_window(time_range)
+      if isinstance(window, dict):
+        return window
+      slots = self.find_free_slots(*window, duration_minutes, count)
+      return self._slots_result(slots, *window, duration_minutes)
+    except ValueError as e:
+      return {"error": str(e)}
     except Exception as e:
-      return {"error": f"Booking error: {str(e)}"} 
+      self.logger.error(f"Free slot search failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  async def afind_free_slots_tool(self, duration_minutes: int = 60, time_range: str = None, count: int = 3) -> dict:
+    try:
+      window = self._slot_window(time_range)
+      if isinstance(window, dict):
+        return window
+      slots = await self.afind_free_slots(*window, duration_minutes, count)
+      return self._slots_result(slots, *window, duration_minutes)
+    except ValueError as e:
+      return {"error": str(e)}
+    except Exception as e:
+      self.logger.error(f"Free slot search failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  def _team_result(self, busy_by_calendar: dict, errors: dict, window_start: datetime, window_end: datetime,
+                   duration_minutes: int, count: int) -> dict:
+    combined = combine_busy({k: v for k, v in busy_by_calendar.items() if k not in errors})
+    return {
+      "combined_busy": combined,
+      "busy_by_calendar": busy_by_calendar,
+      "errors": errors,
+      "slots": self._free_slots(combined, window_start, window_end, duration_minutes, count)
+    }
+  
+  def team_availability(self, calendar_ids: list, window_start: datetime, window_end: datetime,
+                        duration_minutes: int = 60, count: int = 3) -> dict:
+    """Combined free/busy for many calendars and their earliest common free slots"""
+    busy_by_calendar, errors = self.calendar.get_team_freebusy(
+      calendar_ids, window_start.isoformat(), window_end.isoformat()
+    )
+    return self._team_result(busy_by_calendar, errors, window_start, window_end, duration_minutes, count)
+  
+  async def ateam_availability(self, calendar_ids: list, window_start: datetime, window_end: datetime,
+                               duration_minutes: int = 60, count: int = 3) -> dict:
+    busy_by_calendar, errors = await self.acalendar.get_team_freebusy(
+      calendar_ids, window_start.isoformat(), window_end.isoformat()
+    )
+    return self._team_result(busy_by_calendar, errors, window_start, window_end, duration_minutes, count)
+  
+  def _team_tool_result(self, result: dict, duration_minutes: int) -> dict:
+    slots = [
+      {"start": start.isoformat(), "end": end.isoformat(), "display": f"{self.format_time(start)} - {self.format_time(end)}"}
+      for start, end in result["slots"]
+    ]
+    checked = len(result["busy_by_calendar"]) - len(result["errors"])
+    return {
+      "slots": slots,
+      "unavailable_calendars": result["errors"],
+      "message": f"Found {len(slots)} common free {duration_minutes}-minute slots across {checked} calendars"
+    }
+  
+  def team_availability_tool(self, calendar_ids: list, time_range: str,
+                             duration_minutes: int = 60, count: int = 3) -> dict:
+    """
+    Find when everyone in calendar_ids is free
+    Returns: {slots: list, unavailable_calendars: dict, message: str, error: str}
+    """
+    try:
+      parsed_time = self.parse_time(time_range)
+      if "error" in parsed_time:
+          return {"error": parsed_time["error"]}
+      
+      result = self.team_availability(calendar_ids, parsed_time["start"], parsed_time["end"], duration_minutes, count)
+      return self._team_tool_result(result, duration_minutes)
+    except ValueError as e:
+      return {"error": str(e)}
+    except Exception as e:
+      self.logger.error(f"Team availability failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  async def ateam_availability_tool(self, calendar_ids: list, time_range: str,
+                                    duration_minutes: int = 60, count: int = 3) -> dict:
+    try:
+      parsed_time = self.parse_time(time_range)
+      if "error" in parsed_time:
+          return {"error": parsed_time["error"]}
+      
+      result = await self.ateam_availability(calendar_ids, parsed_time["start"], parsed_time["end"], duration_minutes, count)
+      return self._team_tool_result(result, duration_minutes)
+    except ValueError as e:
+      return {"error": str(e)}
+    except Exception as e:
+      self.logger.error(f"Team availability failed: {str(e)}")
+      return {"error": f"Calendar error: {str(e)}"}
+  
+  def _events_result(self, parsed_time: dict, events: list, limit: int = None) -> dict:
+      if not events:
+          return {
+              "count": 0,
+              "events": [],
+              "message": "No events found in this time range"
+          }
+      
+      formatted_events = [self.event_summary(event) for event in events]
+      
+      formatted_start = self.format_time(parsed_time["start"])
+      formatted_end = self.format_time(parsed_time["end"])
+      message = f"Found {len(events)} events between {formatted_start} and {formatted_end}"
+      if limit is not None and len(events) >= limit:
+        # The listing stops at max_results; say so instead of implying that's everything
+        message += f" (showing the first {limit}; there may be more, narrow the range or raise max_results)"
+      
+      return {
+          "count": len(events),
+          "events": formatted_events,
+          "message": message
+      }
+  
+  def event_summary(self, event: dict) -> dict:
+      return {
+          "summary": event.get('summary', 'No title'),
+          "start": event['start'].get('dateTime', event['start'].get('date')),
+          "end": event['end'].get('dateTime', event['end'].get('date')),
+          "status": event.get('status', 'confirmed')
+      }
+  
+  def iter_events(self, start: datetime, end: datetime):
+      """Every event in [start, end), page by page with the next page prefetched"""
+      return iter_events(self.calendar, start.isoformat(), end.isoformat(), int(os.getenv("EVENTS_PAGE_SIZE", "250")))
+  
+  def aiter_events(self, start: datetime, end: datetime):
+      """Async iter_events; uses the native async client when one is configured"""
+      if self.acalendar is None:
+        return None
+      from .async_calendar_client import aiter_events
+      return aiter_events(self.acalendar, start.isoformat(), end.isoformat(), int(os.getenv("EVENTS_PAGE_SIZE", "250")))
   
   def list_events_tool(self, time_range: str, max_results: int = 5) -> dict:
       """
@@ -244,42 +785,49 @@ class CalendarAssistant:
         if "error" in parsed_time:
             return {"error": parsed_time["error"]}
         
-        start_iso = parsed_time["start"].isoformat()
-        end_iso = parsed_time["end"].isoformat()
-        
-        events = self.calendar.list_events(start_iso, end_iso, max_results)
-        
-        if not events:
-            return {
-                "count": 0,
-                "events": [],
-                "message": "No events found in this time range"
-            }
-        
-        formatted_events = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            formatted_events.append({
-                "summary": event.get('summary', 'No title'),
-                "start": start,
-                "end": end,
-                "status": event.get('status', 'confirmed')
-            })
-        
-        formatted_start = self.format_time(parsed_time["start"])
-        formatted_end = self.format_time(parsed_time["end"])
+        events = self._list_events(parsed_time["start"].isoformat(), parsed_time["end"].isoformat(), max_results)
+        return self._events_result(parsed_time, events, max_results)
+      except Exception as e:
+        self.logger.error(f"List events failed: {str(e)}")
+        return {"error": f"Error listing events: {str(e)}"}
+  
+  async def alist_events_tool(self, time_range: str, max_results: int = 5) -> dict:
+      try:
+        parsed_time = self.parse_time(time_range)
+        if "error" in parsed_time:
+            return {"error": parsed_time["error"]}
         
-        return {
-            "count": len(events),
-            "events": formatted_events,
-            "message": f"Found {len(events)} events between {formatted_start} and {formatted_end}"
-        }
+        events = await self._alist_events(parsed_time["start"].isoformat(), parsed_time["end"].isoformat(), max_results)
+        return self._events_result(parsed_time, events, max_results)
       except Exception as e:
         self.logger.error(f"List events failed: {str(e)}")
         return {"error": f"Error listing events: {str(e)}"}
   
   
+  def offload(self, func):
+    """Wrap a blocking tool so async agent runs execute it on the bounded tool pool"""
+    @functools.wraps(func)
+    async def coroutine(*args, **kwargs):
+      loop = asyncio.get_running_loop()
+      # Carry the current session into the worker thread
+      ctx = contextvars.copy_context()
+      return await loop.run_in_executor(
+        self.tool_executor, functools.partial(ctx.run, func, *args, **kwargs)
+      )
+    return coroutine
+  
+  def tool_coroutine(self, name: str, func, native=None, cache: bool = True):
+    """Coroutine for an agent tool: the native async version when an async calendar
+    client is configured, otherwise the blocking version on the tool pool"""
+    if self.acalendar is not None and native is not None:
+      return self.acached(name, native) if cache else native
+    return self.offload(self.cached(name, func) if cache else func)
+  
+  @staticmethod
+  def invalid_arguments(error) -> str:
+    """Observation for tool arguments outside the schema's bounds, so the model can correct them"""
+    return "Invalid arguments: " + "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+  
   def create_tools(self):
       return [
         StructuredTool.from_function(
@@ -289,7 +837,8 @@ class CalendarAssistant:
         ),
         StructuredTool.from_function(
           name="CheckAvailability",
-          func=self.check_availability_tool,
+          func=self.cached("CheckAvailability", self.check_availability_tool),
+          coroutine=self.tool_coroutine("CheckAvailability", self.check_availability_tool, self.acheck_availability_tool),
           description=(
             "Check calendar availability for a specific time range. "
             "Input should be a natural language time expression like: "
@@ -297,9 +846,21 @@ class CalendarAssistant:
           ),
           args_schema=CheckAvailabilitySchema
         ),
+        StructuredTool.from_function(
+          name="CheckMultipleAvailability",
+          func=self.cached("CheckMultipleAvailability", self.check_multiple_availability_tool),
+          coroutine=self.tool_coroutine("CheckMultipleAvailability", self.check_multiple_availability_tool, self.acheck_multiple_availability_tool),
+          description=(
+            "Check several candidate time ranges at once, e.g. when comparing options "
+            "like 'monday 2-3pm' and 'tuesday 10-11am'. Prefer this over repeated "
+            "CheckAvailability calls."
+          ),
+          args_schema=CheckMultipleAvailabilitySchema
+        ),
         StructuredTool.from_function(
           name="CreateBooking",
           func=self.create_booking_tool,
+          coroutine=self.offload(self.create_booking_tool),
           description=(
               "Initiate booking process. Returns confirmation request. "
               "Requires event summary and time range."
@@ -309,15 +870,18 @@ class CalendarAssistant:
         StructuredTool.from_function(
             name="ConfirmBooking",
             func=self.confirm_booking_tool,
+            coroutine=self.tool_coroutine("ConfirmBooking", self.confirm_booking_tool, self.aconfirm_booking_tool, cache=False),
             description=(
                 "Finalize booking after user confirmation. "
-                "Requires confirmation status, event summary, start and end times."
+                "Requires confirmation status, event summary, start and end times. "
+                "Pass the proposal's idempotency_key so a repeated confirmation never books twice."
             ),
             args_schema=ConfirmBookingSchema
         ),
         StructuredTool.from_function(
           name="ListEvents",
-          func=self.list_events_tool,
+          func=self.cached("ListEvents", self.list_events_tool),
+          coroutine=self.tool_coroutine("ListEvents", self.list_events_tool, self.alist_events_tool),
           description=(
             "List calendar events within a specific time range. "
             "Input should be a natural language time expression like: "
@@ -325,16 +889,69 @@ class CalendarAssistant:
             "Optional max_results parameter limits the number of events returned."
           ),
           args_schema=ListEventsSchema
+        ),
+        StructuredTool.from_function(
+          name="FindFreeSlots",
+          func=self.cached("FindFreeSlots", self.find_free_slots_tool),
+          coroutine=self.tool_coroutine("FindFreeSlots", self.find_free_slots_tool, self.afind_free_slots_tool),
+          description=(
+            "Find the earliest free slots of a given duration within working hours. "
+            "Use this instead of repeated CheckAvailability calls when the user asks for "
+            "'a free hour next week' or 'when can we meet'. Optional time_range limits the "
+            "search window (defaults to the next 14 days)."
+          ),
+          args_schema=FindFreeSlotsSchema,
+          handle_validation_error=self.invalid_arguments
+        ),
+        StructuredTool.from_function(
+          name="FindTeamAvailability",
+          func=self.cached("FindTeamAvailability", self.team_availability_tool),
+          coroutine=self.tool_coroutine("FindTeamAvailability", self.team_availability_tool, self.ateam_availability_tool),
+          description=(
+            "Find times when several people are all free. Takes their calendar IDs "
+            "(usually email addresses), a search window and a meeting length, and "
+            "returns the earliest common free slots within working hours."
+          ),
+          args_schema=TeamAvailabilitySchema,
+          handle_validation_error=self.invalid_arguments
+        ),
+        StructuredTool.from_function(
+          name="BulkBooking",
+          func=self.bulk_booking_tool,
+          coroutine=self.tool_coroutine("BulkBooking", self.bulk_booking_tool, cache=False),
+          description=(
+            "Book many events at once, e.g. a weekly series of interviews. First call with "
+            "confirmation=false to check every event for conflicts and show the user the plan; "
+            "after they agree, call again with confirmation=true and the idempotency_key from the check "
+            "to book the conflict-free ones. "
+            "Use this instead of CreateBooking/ConfirmBooking when there are several events."
+          ),
+          args_schema=BulkBookingSchema
         )
       ]
   
+  def create_agent_prompt(self):
+      if self.agent_mode == "tool_calling":
+        return tool_calling_prompt()
+      if os.getenv("AGENT_PROMPT", "bundled").lower() == "hub":
+        from langchain import hub
+        return hub.pull("hwchase17/structured-chat-agent")
+      return structured_chat_prompt()
+  
   def create_agent_executor(self):
-      prompt = hub.pull("hwchase17/structured-chat-agent")
-      agent = create_structured_chat_agent(
-        llm=self.llm,
-        tools=self.tools,
-        prompt=prompt
-      )
+      prompt = self.create_agent_prompt()
+      if self.agent_mode == "tool_calling":
+        # Native function calling: one LLM step can request several tools, which
+        # AgentExecutor runs concurrently on async turns
+        agent = create_tool_calling_agent(llm=self.llm, tools=self.tools, prompt=prompt)
+      elif self.agent_mode == "structured":
+        agent = create_structured_chat_agent(
+          llm=self.llm,
+          tools=self.tools,
+          prompt=prompt
+        )
+      else:
+        raise ValueError(f"Unknown AGENT_MODE: {self.agent_mode}")
       return AgentExecutor(
         agent=agent,
         tools=self.tools,
@@ -344,58 +961,185 @@ class CalendarAssistant:
         return_intermediate_steps=True
       )
   
-  def chat(self, user_input: str):
+  def _record_turn(self, session: ChatSession, user_input: str, response: dict):
+    output = response["output"]
+    # Add conversation to history
+    session.chat_history.append(ChatMessage("human", user_input))
+    session.chat_history.append(ChatMessage("ai", output if isinstance(output, str) else json.dumps(output)))
+    self._track_proposal(session, output, response.get("intermediate_steps", []))
+    return output
+  
+  def _track_proposal(self, session: ChatSession, output, steps: list):
+    """Keep the pending booking proposal as structured session state"""
+    results = [(action.tool, observation) for action, observation in steps]
+    if isinstance(output, dict):
+      results.append(("CreateBooking", output))
+    for tool, observation in results:
+      if not isinstance(observation, dict):
+        continue
+      if tool == "CreateBooking" and observation.get("confirmation_required"):
+        session.pending_proposal = {
+          "summary": observation["proposed_summary"],
+          "start": observation["proposed_start"],
+          "end": observation["proposed_end"],
+          "idempotency_key": observation.get("idempotency_key")
+        }
+      elif tool == "ConfirmBooking" and "error" not in observation:
+        # The proposal was either booked or canceled
+        session.pending_proposal = None
+  
+  def _response_key(self, session: ChatSession, user_input: str):
+    if self.cache is None:
+      return None
+    # Only the latest exchange and any pending proposal shape the answer to a repeated question
+    recent = [message_to_dict(m) for m in session.chat_history[-int(os.getenv("CACHE_HISTORY_MESSAGES", "2")):]]
+    return self.cache.make_key(
+      "response",
+      " ".join(user_input.lower().split()).rstrip("?.! "),
+      recent,
+      session.pending_proposal,
+      session.user_timezone.zone,
+      datetime.now(session.user_timezone).date(),
+      self.calendar_state()
+    )
+  
+  def _cached_response(self, key):
+    return self.cache.get("response", key) if key is not None else None
+  
+  def _store_response(self, key, response: dict):
+    """Cache the agent's reply unless the turn touched bookings, a tool failed or the agent gave up"""
+    if key is None or response["output"] in AGENT_STOPPED_OUTPUTS:
+      return
+    for action, observation in response.get("intermediate_steps", []):
+      if action.tool in ("CreateBooking", "ConfirmBooking", "BulkBooking"):
+        return
+      if isinstance(observation, dict) and "error" in observation:
+        return
+    self.cache.set(key, response["output"])
+  
+  def _agent_error(self, e: Exception) -> str:
+    self.logger.error(f"Agent error: {str(e)}")
+    return f"⚠️ Error: {str(e)}. Please try again or rephrase your request."
+  
+  def _fast_path(self, user_input: str):
+    if self.router is None:
+      return None
     try:
-      response = self.agent_executor.invoke({
-        "input": user_input,
-        "chat_history": self.chat_history
-      })
-      
-      # Add conversation to history
-      self.chat_history.append(HumanMessage(content=user_input))
-      self.chat_history.append(AIMessage(content=response["output"]))
-      
-      # After getting response from agent_executor
-      if "confirmation_required" in response["output"]:
-        # Store proposal in session state
-        self.chat_history.append({
-          "type": "proposal",
-          "summary": response["output"]["proposed_summary"],
-          "start": response["output"]["proposed_start"],
-          "end": response["output"]["proposed_end"]
-        })
-      
-      return response["output"]
+      return self.router.route(user_input)
     except Exception as e:
-      error_msg = f"⚠️ Error: {str(e)}. Please try again or rephrase your request."
-      self.logger.error(f"Agent error: {str(e)}")
-      return error_msg
- 
-  def to_dict(self) -> dict:
-    """Serialize state for session persistence"""
-    return {
-      "session_id": self.session_id,
-      "chat_history": [
-        {
-          "type": "ai" if isinstance(msg, AIMessage) else "human",
-          "content": msg.content
-        }
-        for msg in self.chat_history
-      ]
-    }
-    
-  @classmethod
-  def from_dict(cls, data: dict):
-    """Deserialize from session data"""
-    assistant = cls(session_id=data["session_id"])
-    assistant.chat_history = [
-      AIMessage(content=msg["content"]) if msg["type"] == "ai" 
-      else HumanMessage(content=msg["content"])
-      for msg in data["chat_history"]
-    ]
-    return assistant
+      self.logger.warning(f"Fast path failed, falling back to agent: {str(e)}")
+      return None
+  
+  def _short_reply(self, cache_key, user_input: str):
+    """(reply, path) from the response cache or the fast path, or (None, None)"""
+    started = time.perf_counter()
+    reply = self._cached_response(cache_key)
+    path = "cache"
+    if reply is None:
+      reply = self._fast_path(user_input)
+      path = "fast"
+    if reply is None:
+      return None, None
+    TURN_SECONDS.observe(time.perf_counter() - started, path=path)
+    return reply, path
+  
+  def _record_agent_time(self, started: float, handler: TurnMetricsHandler):
+    elapsed = time.perf_counter() - started
+    TURN_SECONDS.observe(elapsed, path="agent")
+    handler.record_turn()
+    if self.router is not None:
+      self.router.record_agent_turn(elapsed)
   
+  def chat(self, session: ChatSession, user_input: str):
+    token = _current_session.set(session)
+    try:
+      cache_key = self._response_key(session, user_input)
+      reply, _ = self._short_reply(cache_key, user_input)
+      if reply is not None:
+        return self._record_turn(session, user_input, {"output": reply})
+      started = time.perf_counter()
+      handler = TurnMetricsHandler(self.agent_mode)
+      with self.prefetching(user_input):
+        response = self.agent_executor.invoke({
+          "input": user_input,
+          "chat_history": self.history.build(session)
+        }, config={"callbacks": [handler]})
+      self._record_agent_time(started, handler)
+      self._store_response(cache_key, response)
+      output = self._record_turn(session, user_input, response)
+      self.history.compact(session)
+      return output
+    except Exception as e:
+      return self._agent_error(e)
+    finally:
+      _current_session.reset(token)
+  
+  async def achat(self, session: ChatSession, user_input: str):
+    """Non-blocking chat turn, limited to MAX_CONCURRENT_TURNS in flight"""
+    async with self.turn_semaphore:
+      token = _current_session.set(session)
+      try:
+        cache_key = self._response_key(session, user_input)
+        reply, _ = await self.offload(self._short_reply)(cache_key, user_input)
+        if reply is not None:
+          return self._record_turn(session, user_input, {"output": reply})
+        started = time.perf_counter()
+        handler = TurnMetricsHandler(self.agent_mode)
+        with self.prefetching(user_input, in_loop=True):
+          response = await self.agent_executor.ainvoke({
+            "input": user_input,
+            "chat_history": self.history.build(session)
+          }, config={"callbacks": [handler]})
+        self._record_agent_time(started, handler)
+        self._store_response(cache_key, response)
+        output = self._record_turn(session, user_input, response)
+        await self.history.acompact(session)
+        return output
+      except Exception as e:
+        return self._agent_error(e)
+      finally:
+        _current_session.reset(token)
   
-  def clear_history(self):
-    self.chat_history = []
+  async def astream_chat(self, session: ChatSession, user_input: str):
+    """Stream a chat turn as events: token, tool_start, tool_end, then final.
 
+    Tokens are only streamed in tool_calling mode, where model text is the answer
+    itself; in structured mode it is the ReAct JSON blob, so only final carries the reply.
+    """
+    async with self.turn_semaphore:
+      token = _current_session.set(session)
+      try:
+        cache_key = self._response_key(session, user_input)
+        reply, _ = await self.offload(self._short_reply)(cache_key, user_input)
+        if reply is not None:
+          output = self._record_turn(session, user_input, {"output": reply})
+        else:
+          started = time.perf_counter()
+          handler = TurnMetricsHandler(self.agent_mode)
+          response = None
+          with self.prefetching(user_input, in_loop=True):
+            async for event in self.agent_executor.astream_events(
+              {"input": user_input, "chat_history": self.history.build(session)},
+              config={"callbacks": [handler]},
+              version="v2"
+            ):
+              kind = event["event"]
+              if kind == "on_chat_model_stream":
+                chunk = event["data"]["chunk"].content
+                if chunk and self.agent_mode == "tool_calling":
+                  yield {"event": "token", "data": chunk}
+              elif kind == "on_tool_start":
+                yield {"event": "tool_start", "data": {"tool": event["name"], "input": event["data"].get("input")}}
+              elif kind == "on_tool_end":
+                yield {"event": "tool_end", "data": {"tool": event["name"], "output": event["data"].get("output")}}
+              elif kind == "on_chain_end" and event["name"] == "AgentExecutor":
+                response = event["data"]["output"]
+          self._record_agent_time(started, handler)
+          self._store_response(cache_key, response)
+          output = self._record_turn(session, user_input, response)
+          await self.history.acompact(session)
+      except Exception as e:
+        output = self._agent_error(e)
+      finally:
+        _current_session.reset(token)
+      yield {"event": "final", "data": output}
@@ -0,0 +1,154 @@
+import asyncio
+import os
+from urllib.parse import quote
+
+import httpx
+
+from .calendar_client import FREEBUSY_ITEM_LIMIT, PAGE_SIZE_LIMIT, replayed_event
+from .metrics import CALENDAR_API_SECONDS
+
+CALENDAR_API_URL = "https://www.googleapis.com/calendar/v3"
+
+
+async def aiter_events(calendar, start_iso, end_iso, page_size=250):
+  """Async counterpart of calendar_client.iter_events: the next page's request is
+  in flight while the caller consumes the current page"""
+  page = asyncio.ensure_future(calendar.list_events_page(start_iso, end_iso, page_size))
+  try:
+    while page is not None:
+      items, page_token = await page
+      page = asyncio.ensure_future(calendar.list_events_page(start_iso, end_iso, page_size, page_token)) if page_token else None
+      for item in items:
+        yield item
+  finally:
+    if page is not None:
+      page.cancel()
+
+
+class AsyncGoogleCalendar:
+  """asyncio counterpart of GoogleCalendar on a pooled httpx.AsyncClient.
+
+  Awaiting a call parks the coroutine instead of holding a thread, so one worker
+  can keep hundreds of calendar requests in flight. `credentials` is the shared
+  token cache from calendar_transport (None for an unauthenticated stand-in
+  server); `base_url` defaults to GOOGLE_CALENDAR_API_URL or the public API.
+  """
+  def __init__(self, calendar_id=None, credentials=None, base_url=None, client: httpx.AsyncClient = None):
+    self.__calendar_id = calendar_id or os.getenv("GOOGLE_CALENDAR_ID")
+    if not self.__calendar_id:
+      raise ValueError("Calendar ID must be provided or set in GOOGLE_CALENDAR_ID")
+    self.credentials = credentials
+    self.base_url = (base_url or os.getenv("GOOGLE_CALENDAR_API_URL", CALENDAR_API_URL)).rstrip("/")
+    self.client = client or httpx.AsyncClient(
+      timeout=30,
+      limits=httpx.Limits(max_connections=int(os.getenv("CALENDAR_ASYNC_MAX_CONNECTIONS", "100")))
+    )
+
+  @property
+  def calendar_id(self):
+    return self.__calendar_id
+
+  async def _token(self, rejected: str = None) -> str:
+    if rejected is None and self.credentials.fresh():
+      return self.credentials.token()
+    # Refreshing is a blocking token fetch; keep it off the event loop
+    return await asyncio.to_thread(self.credentials.token, rejected)
+
+  async def _request(self, operation: str, method: str, path: str, **kwargs) -> dict:
+    with CALENDAR_API_SECONDS.time(operation=operation):
+      if self.credentials is None:
+        response = await self.client.request(method, self.base_url + path, **kwargs)
+      else:
+        token = await self._token()
+        response = await self.client.request(method, self.base_url + path, headers={"authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+          token = await self._token(rejected=token)
+          response = await self.client.request(method, self.base_url + path, headers={"authorization": f"Bearer {token}"}, **kwargs)
+      response.raise_for_status()
+      return response.json()
+
+  def _events_path(self) -> str:
+    return f"/calendars/{quote(self.__calendar_id, safe='')}/events"
+
+  async def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    body = {
+      "summary": summary,
+      "start": {"dateTime": start_iso, "timeZone": "UTC"},
+      "end": {"dateTime": end_iso, "timeZone": "UTC"}
+    }
+    if event_id:
+      body["id"] = event_id
+    try:
+      return await self._request("insert", "POST", self._events_path(), json=body)
+    except httpx.HTTPStatusError as e:
+      if not event_id or e.response.status_code != 409:
+        raise
+      # Already inserted by an earlier attempt
+      return replayed_event(await self._request("get", "GET", f"{self._events_path()}/{event_id}"))
+
+  async def create_bookings(self, bookings):
+    """Same contract as GoogleCalendar.create_bookings; inserts run concurrently on the pool"""
+    async def insert(booking):
+      try:
+        return await self.create_booking(*booking), None
+      except Exception as e:
+        return None, e
+    return list(await asyncio.gather(*(insert(booking) for booking in bookings)))
+
+  async def _freebusy(self, calendar_ids, start_iso, end_iso) -> dict:
+    body = {
+      "timeMin": start_iso,
+      "timeMax": end_iso,
+      "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+      "timeZone": "UTC"
+    }
+    return (await self._request("freebusy", "POST", "/freeBusy", json=body)).get('calendars', {})
+
+  async def get_freebusy(self, start_iso, end_iso):
+    calendars = await self._freebusy([self.__calendar_id], start_iso, end_iso)
+    return calendars.get(self.__calendar_id, {}).get('busy', [])
+
+  async def get_freebusy_many(self, ranges):
+    """Busy slots for several (start_iso, end_iso) ranges, fetched concurrently"""
+    return list(await asyncio.gather(*(self.get_freebusy(start_iso, end_iso) for start_iso, end_iso in ranges)))
+
+  async def list_events(self, start_iso, end_iso, max_results=10):
+    params = {
+      "timeMin": start_iso,
+      "timeMax": end_iso,
+      "maxResults": max_results,
+      "singleEvents": "true",
+      "orderBy": "startTime"
+    }
+    return (await self._request("list", "GET", self._events_path(), params=params)).get('items', [])
+
+  async def list_events_page(self, start_iso, end_iso, page_size=250, page_token=None):
+    params = {
+      "timeMin": start_iso,
+      "timeMax": end_iso,
+      "maxResults": min(page_size, PAGE_SIZE_LIMIT),
+      "singleEvents": "true",
+      "orderBy": "startTime"
+    }
+    if page_token:
+      params["pageToken"] = page_token
+    response = await self._request("list", "GET", self._events_path(), params=params)
+    return response.get('items', []), response.get('nextPageToken')
+
+  async def get_team_freebusy(self, calendar_ids, start_iso, end_iso):
+    """Same contract as GoogleCalendar.get_team_freebusy; chunks are queried concurrently"""
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    chunks = await asyncio.gather(*(
+      self._freebusy(calendar_ids[i:i + FREEBUSY_ITEM_LIMIT], start_iso, end_iso)
+      for i in range(0, len(calendar_ids), FREEBUSY_ITEM_LIMIT)
+    ))
+    busy, errors = {}, {}
+    for calendars in chunks:
+      for calendar_id, data in calendars.items():
+        if data.get('errors'):
+          errors[calendar_id] = [error.get('reason', 'unknown') for error in data['errors']]
+        busy[calendar_id] = data.get('busy', [])
+    return busy, errors
+
+  async def aclose(self):
+    await self.client.aclose()
@@ -1,8 +1,119 @@
-from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 
+from .calendar_transport import PooledHttp, shared_credentials
+from .metrics import CALENDAR_API_SECONDS
+
+# Google recommends at most 50 calls per batch request
+BATCH_LIMIT = 50
+# freebusy.query accepts at most 50 calendars per request
+FREEBUSY_ITEM_LIMIT = 50
+# events.list returns at most 2500 events per page
+PAGE_SIZE_LIMIT = 2500
+
+
+class BookingDeletedError(RuntimeError):
+  """The event an earlier attempt created under this ID has since been deleted"""
+
+
+def replayed_event(event: dict) -> dict:
+  """The event fetched after a 409 on a client-chosen ID. Google keeps answering 409 for
+  the ID of a deleted event, whose get returns status "cancelled": that is not a booking."""
+  if event.get("status") == "cancelled":
+    raise BookingDeletedError(f"This booking was made earlier and the event has since been deleted (event {event.get('id')})")
+  return event
+
+
+def iter_events(calendar, start_iso, end_iso, page_size=250):
+  """Every event in the range across all pages, in start order. The next page is
+  fetched in the background while the caller works through the current one, so
+  at most two pages are held at a time."""
+  with ThreadPoolExecutor(max_workers=1, thread_name_prefix="calendar-page") as pages:
+    page = pages.submit(calendar.list_events_page, start_iso, end_iso, page_size)
+    while page is not None:
+      items, page_token = page.result()
+      page = pages.submit(calendar.list_events_page, start_iso, end_iso, page_size, page_token) if page_token else None
+      yield from items
+
+
+class BatchResult:
+  """Result slot filled when the owning CalendarBatch executes"""
+  def __init__(self, transform=None):
+    self._transform = transform
+    self._done = False
+    self._value = None
+    self._error = None
+
+  def _set(self, response, exception):
+    self._done = True
+    if exception is not None:
+      self._error = exception
+    else:
+      self._value = self._transform(response) if self._transform else response
+
+  def result(self):
+    if not self._done:
+      raise RuntimeError("Batch has not been executed yet")
+    if self._error is not None:
+      raise self._error
+    return self._value
+
+
+class CalendarBatch:
+  """Collects freebusy/list/insert calls and sends them as Google batch requests.
+
+  Use as a context manager; the batch is executed on exit and each call's
+  BatchResult is then ready.
+  """
+  def __init__(self, calendar):
+    self.calendar = calendar
+    self._pending = []
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    if exc_type is None:
+      self.execute()
+
+  def add(self, request, transform=None, operation="request") -> BatchResult:
+    result = BatchResult(transform)
+    self._pending.append((request, result, operation))
+    return result
+
+  def create_booking(self, summary, start_iso, end_iso, event_id=None) -> BatchResult:
+    return self.add(self.calendar._insert_request(summary, start_iso, end_iso, event_id), operation="insert")
+
+  def get_freebusy(self, start_iso, end_iso) -> BatchResult:
+    return self.add(self.calendar._freebusy_request(start_iso, end_iso), self.calendar._busy_slots, "freebusy")
+
+  def list_events(self, start_iso, end_iso, max_results=10) -> BatchResult:
+    return self.add(
+      self.calendar._list_request(start_iso, end_iso, max_results),
+      lambda response: response.get('items', []),
+      "list"
+    )
+
+  def execute(self):
+    pending, self._pending = self._pending, []
+    if len(pending) == 1:
+      # No point wrapping a single call in a batch envelope
+      request, result, operation = pending[0]
+      try:
+        result._set(self.calendar._execute(operation, request), None)
+      except Exception as e:
+        result._set(None, e)
+      return
+    for offset in range(0, len(pending), BATCH_LIMIT):
+      chunk = pending[offset:offset + BATCH_LIMIT]
+      batch = self.calendar.service.new_batch_http_request()
+      for index, (request, result, _) in enumerate(chunk):
+        batch.add(request, callback=lambda _id, response, exception, result=result: result._set(response, exception), request_id=str(index))
+      self.calendar._execute("batch", batch)
+
 
 class GoogleCalendar:
   __SCOPES = [
@@ -10,54 +121,192 @@ class GoogleCalendar:
   ]
   __FILE_PATH = "credentials.json"
   
-  def __init__(self, calendar_id = None):
+  def __init__(self, calendar_id = None, http = None):
      # Get calendar ID from environment if not provided
     self.__calendar_id = calendar_id or os.getenv("GOOGLE_CALENDAR_ID")
 
     if not self.__calendar_id:
             raise ValueError("Calendar ID must be provided or set in GOOGLE_CALENDAR_ID")
     
-    credentials = service_account.Credentials.from_service_account_file(filename=self.__FILE_PATH, scopes=self.__SCOPES)
+    if http is None:
+      # Thread-safe connection pool authorized with the process-wide token cache
+      http = PooledHttp(
+          self.shared_credentials(),
+          size=int(os.getenv("CALENDAR_HTTP_POOL_SIZE", "10"))
+      )
     
-    # Create service with cache disabled
+    # Build from the discovery document bundled with googleapiclient (no network fetch)
     self.service = build(
         'calendar', 
         'v3', 
-        credentials=credentials,
+        http=http,
         cache_discovery=False,
-        static_discovery=False
+        static_discovery=True
     )
   
-  def create_booking(self, summary, start_iso, end_iso):
+  @classmethod
+  def shared_credentials(cls):
+    """Process-wide service-account token cache for the calendar scopes"""
+    return shared_credentials(cls.__FILE_PATH, cls.__SCOPES)
+  
+  def _execute(self, operation, request):
+    with CALENDAR_API_SECONDS.time(operation=operation):
+      return request.execute()
+  
+  def _insert_request(self, summary, start_iso, end_iso, event_id=None):
     body = {
         "summary": summary,
         "start": {"dateTime": start_iso, "timeZone": "UTC"},
         "end": {"dateTime": end_iso, "timeZone": "UTC"}
     }
+    if event_id:
+      # Client-chosen ID: Calendar rejects a second insert with 409, which makes retries idempotent
+      body["id"] = event_id
     return self.service.events().insert(
         calendarId=self.__calendar_id, 
         body=body
-    ).execute()
+    )
   
-  def get_freebusy(self, start_iso, end_iso):
+  def _freebusy_request(self, start_iso, end_iso):
     body = {
         "timeMin": start_iso,
         "timeMax": end_iso,
         "items": [{"id": self.__calendar_id}],
         "timeZone": "UTC"
     }
-    response = self.service.freebusy().query(body=body).execute()
-    return response.get('calendars', {}).get(self.__calendar_id, {}).get('busy', []) 
+    return self.service.freebusy().query(body=body)
   
-  def list_events(self, start_iso, end_iso, max_results=10):
+  def _busy_slots(self, response):
+    return response.get('calendars', {}).get(self.__calendar_id, {}).get('busy', [])
+  
+  def _list_request(self, start_iso, end_iso, max_results, page_token=None):
     return self.service.events().list(
         calendarId=self.__calendar_id,
         timeMin=start_iso,
         timeMax=end_iso,
         maxResults=max_results,
         singleEvents=True,
-        orderBy="startTime"
-    ).execute().get('items', [])
+        orderBy="startTime",
+        pageToken=page_token
+    )
+  
+  def _team_freebusy_request(self, calendar_ids, start_iso, end_iso):
+    body = {
+        "timeMin": start_iso,
+        "timeMax": end_iso,
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+        "timeZone": "UTC"
+    }
+    return self.service.freebusy().query(body=body)
+  
+  def get_team_freebusy(self, calendar_ids, start_iso, end_iso):
+    """Busy slots per calendar for many calendars: chunked to the freebusy item limit,
+    with the chunks sent together as one batch. Returns (busy_by_calendar, errors_by_calendar)."""
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    with self.batch() as batch:
+      results = [
+        batch.add(self._team_freebusy_request(calendar_ids[i:i + FREEBUSY_ITEM_LIMIT], start_iso, end_iso), operation="freebusy")
+        for i in range(0, len(calendar_ids), FREEBUSY_ITEM_LIMIT)
+      ]
+    busy, errors = {}, {}
+    for result in results:
+      for calendar_id, data in result.result().get('calendars', {}).items():
+        if data.get('errors'):
+          errors[calendar_id] = [error.get('reason', 'unknown') for error in data['errors']]
+        busy[calendar_id] = data.get('busy', [])
+    return busy, errors
+  
+  @property
+  def calendar_id(self):
+    return self.__calendar_id
+  
+  def batch(self) -> CalendarBatch:
+    return CalendarBatch(self)
+  
+  def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    """Insert the event; with an event_id, a replay returns the event created the first time"""
+    try:
+      return self._execute("insert", self._insert_request(summary, start_iso, end_iso, event_id))
+    except HttpError as e:
+      if not event_id or e.resp.status != 409:
+        raise
+      return replayed_event(self._execute("get", self.service.events().get(calendarId=self.__calendar_id, eventId=event_id)))
+  
+  def create_bookings(self, bookings):
+    """Insert many events in batched round-trips. bookings: (summary, start_iso, end_iso, event_id)
+    tuples. Returns one (event, error) per booking; a 409 on a client-chosen ID fetches the
+    event created by an earlier attempt, like create_booking."""
+    with self.batch() as batch:
+      results = [batch.create_booking(*booking) for booking in bookings]
+    outcomes = []
+    replays = {}
+    for index, (booking, result) in enumerate(zip(bookings, results)):
+      try:
+        outcomes.append((result.result(), None))
+      except HttpError as e:
+        outcomes.append((None, e))
+        if booking[3] and e.resp.status == 409:
+          replays[index] = booking[3]
+      except Exception as e:
+        outcomes.append((None, e))
+    if replays:
+      with self.batch() as batch:
+        existing = {
+          index: batch.add(self.service.events().get(calendarId=self.__calendar_id, eventId=event_id), operation="get")
+          for index, event_id in replays.items()
+        }
+      for index, result in existing.items():
+        try:
+          outcomes[index] = (replayed_event(result.result()), None)
+        except Exception as e:
+          outcomes[index] = (None, e)
+    return outcomes
+  
+  def get_freebusy(self, start_iso, end_iso):
+    return self._busy_slots(self._execute("freebusy", self._freebusy_request(start_iso, end_iso)))
+  
+  def list_events(self, start_iso, end_iso, max_results=10):
+    return self._execute("list", self._list_request(start_iso, end_iso, max_results)).get('items', [])
+  
+  def list_events_page(self, start_iso, end_iso, page_size=250, page_token=None):
+    """One page of events in start order: (items, next_page_token or None)"""
+    response = self._execute("list", self._list_request(start_iso, end_iso, min(page_size, PAGE_SIZE_LIMIT), page_token))
+    return response.get('items', []), response.get('nextPageToken')
+  
+  def get_freebusy_many(self, ranges):
+    """Busy slots for several (start_iso, end_iso) ranges in one batched round-trip"""
+    with self.batch() as batch:
+      results = [batch.get_freebusy(start_iso, end_iso) for start_iso, end_iso in ranges]
+    return [result.result() for result in results]
+  
+  def list_events_many(self, ranges, max_results=10):
+    """Events for several (start_iso, end_iso) ranges in one batched round-trip"""
+    with self.batch() as batch:
+      results = [batch.list_events(start_iso, end_iso, max_results) for start_iso, end_iso in ranges]
+    return [result.result() for result in results]
+  
+  def sync_events(self, sync_token=None, time_min=None):
+    """Full (time_min) or incremental (sync_token) events.list sync across all pages.
+    Returns (items, next_sync_token, calendar_timezone); raises HttpError 410 when the token expired."""
+    params = {
+        "calendarId": self.__calendar_id,
+        "singleEvents": True,
+        "showDeleted": True,
+        "maxResults": 2500
+    }
+    if sync_token:
+      params["syncToken"] = sync_token
+    elif time_min:
+      params["timeMin"] = time_min
+    
+    items = []
+    page_token = None
+    while True:
+      response = self._execute("sync", self.service.events().list(pageToken=page_token, **params))
+      items.extend(response.get('items', []))
+      page_token = response.get('nextPageToken')
+      if not page_token:
+        return items, response.get('nextSyncToken'), response.get('timeZone', "UTC")
 
 
 
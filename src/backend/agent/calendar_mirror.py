@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytz
+from googleapiclient.errors import HttpError
+
+
+def parse_iso(value: str) -> datetime:
+  """ISO 8601 string to an aware datetime, treating naive values as UTC"""
+  dt = datetime.fromisoformat(value)
+  return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def parse_event_time(value: dict, tz) -> datetime:
+  """Event start/end to an aware datetime; all-day dates start at midnight in the calendar timezone"""
+  if "dateTime" in value:
+    return parse_iso(value["dateTime"])
+  return tz.localize(datetime.fromisoformat(value["date"]))
+
+
+def to_utc_iso(dt: datetime) -> str:
+  return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def merge_intervals(intervals: list) -> list:
+  """Merge overlapping (start, end) datetime pairs into a sorted, disjoint list"""
+  merged = []
+  for start, end in sorted(intervals):
+    if merged and start <= merged[-1][1]:
+      merged[-1][1] = max(merged[-1][1], end)
+    else:
+      merged.append([start, end])
+  return [(start, end) for start, end in merged]
+
+
+class CalendarMirror:
+  """Local copy of one calendar kept current with events.list sync tokens.
+
+  Wraps GoogleCalendar with the same create_booking/get_freebusy/list_events
+  interface. Reads inside the mirrored window are answered locally; the mirror
+  runs an incremental sync first when it is older than max_staleness seconds.
+  The lock only guards the local copy: syncs and remote fallbacks run without
+  it, and while one thread syncs the others keep reading the current copy.
+  """
+  def __init__(self, calendar, max_staleness: float = 30, lookback_days: int = 30):
+    self.calendar = calendar
+    self.max_staleness = max_staleness
+    self.lookback = timedelta(days=lookback_days)
+    self._lock = threading.RLock()
+    self._events = {}
+    self._sync_token = None
+    self._synced_at = None
+    self._window_start = None
+    self._tz = pytz.utc
+    self._syncing = False
+    # Bumped by invalidate(); a sync that overlapped one leaves the mirror stale
+    self._generation = 0
+    # Bumped whenever the mirrored events change; callers fold it into cache keys
+    self.version = 0
+
+  @property
+  def calendar_id(self):
+    return self.calendar.calendar_id
+
+  def invalidate(self):
+    """Force an incremental sync before the next read"""
+    with self._lock:
+      self._synced_at = None
+      self._generation += 1
+
+  def _apply(self, items: list):
+    if items:
+      self.version += 1
+    for event in items:
+      if event.get("status") == "cancelled":
+        self._events.pop(event["id"], None)
+        continue
+      start = parse_event_time(event["start"], self._tz)
+      end = parse_event_time(event["end"], self._tz)
+      self._events[event["id"]] = (start, end, event)
+
+  def _fetch(self, sync_token):
+    """Run the sync against Google: (items, next_sync_token, tz_name, window_start), where
+    tz_name and window_start are None for an incremental sync"""
+    if sync_token is not None:
+      try:
+        items, next_token, _ = self.calendar.sync_events(sync_token=sync_token)
+        return items, next_token, None, None
+      except HttpError as e:
+        if e.resp.status != 410:
+          raise
+        # Sync token expired: start over
+    window_start = datetime.now(timezone.utc) - self.lookback
+    items, next_token, tz_name = self.calendar.sync_events(time_min=to_utc_iso(window_start))
+    return items, next_token, tz_name, window_start
+
+  def _ensure_fresh(self):
+    with self._lock:
+      if self._syncing or self._is_fresh():
+        return
+      self._syncing = True
+      sync_token, generation = self._sync_token, self._generation
+    try:
+      items, next_token, tz_name, window_start = self._fetch(sync_token)
+      with self._lock:
+        if window_start is not None:
+          self._window_start = window_start
+          self._tz = pytz.timezone(tz_name)
+          self._events = {}
+        self._sync_token = next_token
+        self._apply(items)
+        if window_start is not None:
+          logging.info(f"Calendar mirror full sync: {len(self._events)} events")
+        # A booking during the sync may be missing from a full listing; sync again next read
+        self._synced_at = time.monotonic() if generation == self._generation else None
+    finally:
+      with self._lock:
+        self._syncing = False
+
+  def _covers(self, start: datetime) -> bool:
+    return self._window_start is not None and start >= self._window_start
+
+  def _is_fresh(self) -> bool:
+    return self._synced_at is not None and time.monotonic() - self._synced_at < self.max_staleness
+
+  def may_cover(self, start_iso: str) -> bool:
+    """False only when reads from start_iso are known to fall outside the mirrored window"""
+    with self._lock:
+      return self._window_start is None or self._covers(parse_iso(start_iso))
+
+  def _overlapping(self, start: datetime, end: datetime) -> list:
+    return sorted(
+      (item for item in self._events.values() if item[0] < end and item[1] > start),
+      key=lambda item: item[0]
+    )
+
+  def record(self, events: list):
+    """Apply events created through another client, then sync again before the next read"""
+    with self._lock:
+      if self._window_start is not None:
+        self._apply(events)
+      self.invalidate()
+
+  def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    event = self.calendar.create_booking(summary, start_iso, end_iso, event_id)
+    self.record([event])
+    return event
+
+  def create_bookings(self, bookings):
+    outcomes = self.calendar.create_bookings(bookings)
+    self.record([event for event, error in outcomes if error is None])
+    return outcomes
+
+  def _local_freebusy(self, start: datetime, end: datetime) -> list:
+    busy = [
+      (max(ev_start, start), min(ev_end, end))
+      for ev_start, ev_end, event in self._overlapping(start, end)
+      if event.get("transparency") != "transparent"
+    ]
+    return [{"start": to_utc_iso(s), "end": to_utc_iso(e)} for s, e in merge_intervals(busy)]
+
+  def cached_freebusy(self, start_iso, end_iso):
+    """Busy slots from the local copy without any I/O, or None when that needs a sync or Google"""
+    start, end = parse_iso(start_iso), parse_iso(end_iso)
+    with self._lock:
+      if self._is_fresh() and self._covers(start):
+        return self._local_freebusy(start, end)
+    return None
+
+  def cached_list_events(self, start_iso, end_iso, max_results=10):
+    """Events from the local copy without any I/O, or None when that needs a sync or Google"""
+    start, end = parse_iso(start_iso), parse_iso(end_iso)
+    with self._lock:
+      if self._is_fresh() and self._covers(start):
+        return [event for _, _, event in self._overlapping(start, end)[:max_results]]
+    return None
+
+  def get_freebusy(self, start_iso, end_iso):
+    start, end = parse_iso(start_iso), parse_iso(end_iso)
+    self._ensure_fresh()
+    with self._lock:
+      if self._covers(start):
+        return self._local_freebusy(start, end)
+    return self.calendar.get_freebusy(start_iso, end_iso)
+
+  def get_freebusy_many(self, ranges):
+    """Answer covered ranges locally and batch the rest into one Google round-trip"""
+    self._ensure_fresh()
+    with self._lock:
+      remote = [r for r in ranges if not self._covers(parse_iso(r[0]))]
+    fetched = dict(zip(remote, self.calendar.get_freebusy_many(remote))) if remote else {}
+    return [fetched[r] if r in fetched else self.get_freebusy(*r) for r in ranges]
+
+  def list_events_many(self, ranges, max_results=10):
+    self._ensure_fresh()
+    with self._lock:
+      remote = [r for r in ranges if not self._covers(parse_iso(r[0]))]
+    fetched = dict(zip(remote, self.calendar.list_events_many(remote, max_results))) if remote else {}
+    return [fetched[r] if r in fetched else self.list_events(*r, max_results) for r in ranges]
+
+  def get_team_freebusy(self, calendar_ids, start_iso, end_iso):
+    # Only our own calendar is mirrored; other calendars always go to Google
+    return self.calendar.get_team_freebusy(calendar_ids, start_iso, end_iso)
+
+  def list_events(self, start_iso, end_iso, max_results=10):
+    start, end = parse_iso(start_iso), parse_iso(end_iso)
+    self._ensure_fresh()
+    with self._lock:
+      if self._covers(start):
+        return [event for _, _, event in self._overlapping(start, end)[:max_results]]
+    return self.calendar.list_events(start_iso, end_iso, max_results)
+
+  def list_events_page(self, start_iso, end_iso, page_size=250, page_token=None):
+    # Full-range listings stream straight from the API
+    return self.calendar.list_events_page(start_iso, end_iso, page_size, page_token)
+
+
+class AsyncCalendarMirror:
+  """Async interface for native async turns that keeps reads on a CalendarMirror.
+
+  Reads the local copy can answer right away run inline on the event loop.
+  Reads that first need a sync run the mirror on `executor`, since it syncs
+  with the blocking client. Ranges outside the mirrored window, other
+  calendars, full listings and writes go to the async client; writes are
+  recorded in the mirror.
+  """
+  def __init__(self, mirror: CalendarMirror, acalendar, executor):
+    self.mirror = mirror
+    self.acalendar = acalendar
+    self.executor = executor
+
+  @property
+  def calendar_id(self):
+    return self.mirror.calendar_id
+
+  def _offload(self, func, *args):
+    return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+  async def _read_many(self, ranges, cached: list, mirrored, remote):
+    """cached answers where present; the rest from the mirror if it may hold any of them, else from Google"""
+    missing = [r for r, answer in zip(ranges, cached) if answer is None]
+    if not missing:
+      return cached
+    if any(self.mirror.may_cover(r[0]) for r in missing):
+      return await self._offload(mirrored, ranges)
+    fetched = iter(await remote(missing))
+    return [answer if answer is not None else next(fetched) for answer in cached]
+
+  async def get_freebusy(self, start_iso, end_iso):
+    busy = self.mirror.cached_freebusy(start_iso, end_iso)
+    if busy is not None:
+      return busy
+    if self.mirror.may_cover(start_iso):
+      return await self._offload(self.mirror.get_freebusy, start_iso, end_iso)
+    return await self.acalendar.get_freebusy(start_iso, end_iso)
+
+  async def list_events(self, start_iso, end_iso, max_results=10):
+    events = self.mirror.cached_list_events(start_iso, end_iso, max_results)
+    if events is not None:
+      return events
+    if self.mirror.may_cover(start_iso):
+      return await self._offload(self.mirror.list_events, start_iso, end_iso, max_results)
+    return await self.acalendar.list_events(start_iso, end_iso, max_results)
+
+  async def get_freebusy_many(self, ranges):
+    ranges = [tuple(r) for r in ranges]
+    return await self._read_many(
+      ranges, [self.mirror.cached_freebusy(*r) for r in ranges],
+      self.mirror.get_freebusy_many, self.acalendar.get_freebusy_many
+    )
+
+  async def get_team_freebusy(self, calendar_ids, start_iso, end_iso):
+    return await self.acalendar.get_team_freebusy(calendar_ids, start_iso, end_iso)
+
+  async def list_events_page(self, start_iso, end_iso, page_size=250, page_token=None):
+    return await self.acalendar.list_events_page(start_iso, end_iso, page_size, page_token)
+
+  async def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    event = await self.acalendar.create_booking(summary, start_iso, end_iso, event_id)
+    self.mirror.record([event])
+    return event
+
+  async def create_bookings(self, bookings):
+    outcomes = await self.acalendar.create_bookings(bookings)
+    self.mirror.record([event for event, error in outcomes if error is None])
+    return outcomes
@@ -0,0 +1,266 @@
+import asyncio
+import functools
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import httpx
+from googleapiclient.errors import HttpError
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from .metrics import CALENDAR_COALESCED, CALENDAR_IN_FLIGHT, CALENDAR_QUEUE_DEPTH, CALENDAR_RATE_LIMITED
+
+# 403 reasons Google uses for quota rather than permission errors
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+
+def is_rate_limited(e: BaseException) -> bool:
+  """True for 429s and quota 403s from either calendar client"""
+  if isinstance(e, HttpError):
+    status, content = e.resp.status, e.content
+  elif isinstance(e, httpx.HTTPStatusError):
+    status, content = e.response.status_code, e.response.content
+  else:
+    return False
+  if status == 429:
+    return True
+  if status != 403:
+    return False
+  try:
+    errors = json.loads(content)["error"].get("errors", [])
+  except (ValueError, KeyError, TypeError, AttributeError):
+    return False
+  return any(error.get("reason") in RATE_LIMIT_REASONS for error in errors)
+
+
+class TokenBucket:
+  """Thread-safe token bucket; reserve() books tokens and says how long to wait for them"""
+  def __init__(self, rate: float, burst: float):
+    self.rate = rate
+    self.burst = burst
+    self._tokens = burst
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def reserve(self, tokens: float = 1) -> float:
+    with self._lock:
+      now = time.monotonic()
+      self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+      self._updated = now
+      # Going negative queues this caller behind earlier reservations
+      self._tokens -= tokens
+      return max(0.0, -self._tokens / self.rate)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def calendar_bucket(calendar_id: str, rate: float, burst: float) -> TokenBucket:
+  """One bucket per calendar, shared by the sync and async schedulers"""
+  with _buckets_lock:
+    if calendar_id not in _buckets:
+      _buckets[calendar_id] = TokenBucket(rate, burst)
+    return _buckets[calendar_id]
+
+
+class CalendarScheduler:
+  """Shared request scheduler in front of GoogleCalendar, with the same interface.
+
+  Identical reads in flight at the same time share one call (single-flight);
+  every call waits for a token from its calendar's bucket; 429s and quota 403s
+  are retried with jittered exponential backoff. Writes are never coalesced.
+  """
+  def __init__(self, calendar, rate: float = 10, burst: float = 20, max_attempts: int = 5,
+               backoff: float = 0.5, max_backoff: float = 30):
+    self.calendar = calendar
+    self.bucket = calendar_bucket(calendar.calendar_id, rate, burst)
+    self.max_attempts = max_attempts
+    self.backoff = backoff
+    self.max_backoff = max_backoff
+    self._in_flight = {}
+    self._lock = threading.Lock()
+
+  @property
+  def calendar_id(self):
+    return self.calendar.calendar_id
+
+  def _retrying(self, operation: str, retrying_class=Retrying):
+    return retrying_class(
+      retry=retry_if_exception(is_rate_limited),
+      wait=wait_random_exponential(multiplier=self.backoff, max=self.max_backoff),
+      stop=stop_after_attempt(self.max_attempts),
+      before_sleep=lambda state: CALENDAR_RATE_LIMITED.inc(operation=operation),
+      reraise=True
+    )
+
+  def _throttled(self, func, cost: int):
+    def call():
+      delay = self.bucket.reserve(cost)
+      if delay:
+        CALENDAR_QUEUE_DEPTH.inc(calendar=self.calendar_id)
+        try:
+          time.sleep(delay)
+        finally:
+          CALENDAR_QUEUE_DEPTH.dec(calendar=self.calendar_id)
+      CALENDAR_IN_FLIGHT.inc(calendar=self.calendar_id)
+      try:
+        return func()
+      finally:
+        CALENDAR_IN_FLIGHT.dec(calendar=self.calendar_id)
+    return call
+
+  def _run(self, operation: str, func, cost: int = 1):
+    return self._retrying(operation)(self._throttled(func, cost))
+
+  def _single_flight(self, key: tuple, func, cost: int = 1):
+    with self._lock:
+      call = self._in_flight.get(key)
+      leader = call is None
+      if leader:
+        call = self._in_flight[key] = Future()
+    if not leader:
+      CALENDAR_COALESCED.inc(operation=key[0])
+      return call.result()
+    try:
+      result = self._run(key[0], func, cost)
+      call.set_result(result)
+      return result
+    except BaseException as e:
+      call.set_exception(e)
+      raise
+    finally:
+      with self._lock:
+        del self._in_flight[key]
+
+  def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    return self._run("insert", lambda: self.calendar.create_booking(summary, start_iso, end_iso, event_id))
+
+  def create_bookings(self, bookings):
+    """Batched inserts; items the batch rejected for rate limits are resent on their own with backoff"""
+    bookings = list(bookings)
+    outcomes = [None] * len(bookings)
+    pending = list(range(len(bookings)))
+
+    def attempt():
+      nonlocal pending
+      results = self._throttled(lambda: self.calendar.create_bookings([bookings[i] for i in pending]), len(pending))()
+      pending = self._rate_limited(outcomes, pending, results)
+      if pending:
+        # Let the retrier back off, then resend only these
+        raise outcomes[pending[0]][1]
+
+    try:
+      self._retrying("insert")(attempt)
+    except Exception as e:
+      if not is_rate_limited(e):
+        raise
+    return outcomes
+
+  @staticmethod
+  def _rate_limited(outcomes: list, pending: list, results: list) -> list:
+    """Store results for the pending indexes; returns the ones rejected for rate limits"""
+    limited = []
+    for index, (event, error) in zip(pending, results):
+      outcomes[index] = (event, error)
+      if error is not None and is_rate_limited(error):
+        limited.append(index)
+    return limited
+
+  def get_freebusy(self, start_iso, end_iso):
+    return self._single_flight(("freebusy", start_iso, end_iso), lambda: self.calendar.get_freebusy(start_iso, end_iso))
+
+  def list_events(self, start_iso, end_iso, max_results=10):
+    return self._single_flight(
+      ("list", start_iso, end_iso, max_results), lambda: self.calendar.list_events(start_iso, end_iso, max_results)
+    )
+
+  def list_events_page(self, start_iso, end_iso, page_size=250, page_token=None):
+    return self._single_flight(
+      ("list_page", start_iso, end_iso, page_size, page_token),
+      lambda: self.calendar.list_events_page(start_iso, end_iso, page_size, page_token)
+    )
+
+  def get_freebusy_many(self, ranges):
+    ranges = [tuple(r) for r in ranges]
+    return self._single_flight(("freebusy_many", tuple(ranges)), lambda: self.calendar.get_freebusy_many(ranges), len(ranges))
+
+  def list_events_many(self, ranges, max_results=10):
+    ranges = [tuple(r) for r in ranges]
+    return self._single_flight(
+      ("list_many", tuple(ranges), max_results), lambda: self.calendar.list_events_many(ranges, max_results), len(ranges)
+    )
+
+  def get_team_freebusy(self, calendar_ids, start_iso, end_iso):
+    return self._single_flight(
+      ("team_freebusy", tuple(calendar_ids), start_iso, end_iso),
+      lambda: self.calendar.get_team_freebusy(calendar_ids, start_iso, end_iso)
+    )
+
+  def sync_events(self, sync_token=None, time_min=None):
+    return self._single_flight(("sync", sync_token, time_min), lambda: self.calendar.sync_events(sync_token, time_min))
+
+
+class AsyncCalendarScheduler(CalendarScheduler):
+  """CalendarScheduler for AsyncGoogleCalendar: waits with asyncio.sleep and shares
+  in-flight reads through asyncio tasks. Uses the same per-calendar buckets."""
+  def _throttled(self, func, cost: int):
+    async def call():
+      delay = self.bucket.reserve(cost)
+      if delay:
+        CALENDAR_QUEUE_DEPTH.inc(calendar=self.calendar_id)
+        try:
+          await asyncio.sleep(delay)
+        finally:
+          CALENDAR_QUEUE_DEPTH.dec(calendar=self.calendar_id)
+      CALENDAR_IN_FLIGHT.inc(calendar=self.calendar_id)
+      try:
+        return await func()
+      finally:
+        CALENDAR_IN_FLIGHT.dec(calendar=self.calendar_id)
+    return call
+
+  async def _run(self, operation: str, func, cost: int = 1):
+    return await self._retrying(operation, AsyncRetrying)(self._throttled(func, cost))
+
+  async def _single_flight(self, key: tuple, func, cost: int = 1):
+    task = self._in_flight.get(key)
+    if task is None:
+      # The shared call is its own task, so cancelling any caller (the first included,
+      # often a speculative prefetch) leaves it running for the others
+      task = self._in_flight[key] = asyncio.ensure_future(self._run(key[0], func, cost))
+      task.add_done_callback(functools.partial(self._call_done, key))
+    else:
+      CALENDAR_COALESCED.inc(operation=key[0])
+    return await asyncio.shield(task)
+
+  def _call_done(self, key: tuple, task: asyncio.Task):
+    if self._in_flight.get(key) is task:
+      del self._in_flight[key]
+    # Mark retrieved so a call whose callers were all cancelled doesn't log "never retrieved"
+    if not task.cancelled():
+      task.exception()
+
+  async def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    return await self._run("insert", lambda: self.calendar.create_booking(summary, start_iso, end_iso, event_id))
+
+  async def create_bookings(self, bookings):
+    bookings = list(bookings)
+    outcomes = [None] * len(bookings)
+    pending = list(range(len(bookings)))
+
+    async def attempt():
+      nonlocal pending
+      results = await self._throttled(lambda: self.calendar.create_bookings([bookings[i] for i in pending]), len(pending))()
+      pending = self._rate_limited(outcomes, pending, results)
+      if pending:
+        # Let the retrier back off, then resend only these
+        raise outcomes[pending[0]][1]
+
+    try:
+      await self._retrying("insert", AsyncRetrying)(attempt)
+    except Exception as e:
+      if not is_rate_limited(e):
+        raise
+    return outcomes
@@ -0,0 +1,105 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2 import service_account
+
+from .metrics import CALENDAR_HTTP_CONNECTIONS, CALENDAR_TOKEN_REFRESHES
+
+
+class SharedCredentials:
+  """Service-account access token shared by every caller in the process.
+
+  The token is refreshed under a lock once it is within refresh_margin of
+  expiry, so concurrent calls never mint tokens in parallel or use a stale one.
+  """
+  def __init__(self, credentials, refresh_margin: float = 300):
+    self._credentials = credentials
+    self.refresh_margin = timedelta(seconds=refresh_margin)
+    self._lock = threading.Lock()
+
+  def fresh(self) -> bool:
+    expiry = self._credentials.expiry
+    # google-auth keeps expiry as naive UTC
+    return bool(self._credentials.token) and (expiry is None or expiry - datetime.utcnow() > self.refresh_margin)
+
+  def token(self, rejected: str = None) -> str:
+    """Current access token; pass a token the server rejected to force one refresh"""
+    if rejected is None and self.fresh():
+      return self._credentials.token
+    with self._lock:
+      # Callers that saw the same rejected token share a single refresh
+      if (rejected is not None and rejected == self._credentials.token) or not self.fresh():
+        self._credentials.refresh(google_auth_httplib2.Request(httplib2.Http()))
+        CALENDAR_TOKEN_REFRESHES.inc()
+        logging.info(f"Refreshed calendar access token (expires {self._credentials.expiry})")
+      return self._credentials.token
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_credentials(path: str, scopes: list) -> SharedCredentials:
+  """One SharedCredentials per (key file, scopes), loaded on first use"""
+  key = (os.path.abspath(path), tuple(scopes))
+  with _shared_lock:
+    if key not in _shared:
+      credentials = service_account.Credentials.from_service_account_file(filename=path, scopes=scopes)
+      _shared[key] = SharedCredentials(
+        credentials,
+        refresh_margin=float(os.getenv("CALENDAR_TOKEN_REFRESH_MARGIN", "300"))
+      )
+    return _shared[key]
+
+
+class PooledHttp:
+  """Thread-safe stand-in for httplib2.Http.
+
+  httplib2.Http is not safe to share between threads, so each request borrows
+  one from a pool for its duration. Pooled connections stay open (keep-alive),
+  so concurrent calls reuse TLS sessions instead of handshaking per request.
+  """
+  def __init__(self, credentials: SharedCredentials, size: int = 10, timeout: float = 30):
+    self.auth = credentials
+    self.size = size
+    self.timeout = timeout
+    self._idle = queue.LifoQueue()
+    self._created = 0
+    self._lock = threading.Lock()
+
+  @contextmanager
+  def _connection(self):
+    try:
+      http = self._idle.get_nowait()
+    except queue.Empty:
+      with self._lock:
+        create = self._created < self.size
+        if create:
+          self._created += 1
+      if create:
+        http = httplib2.Http(timeout=self.timeout)
+        CALENDAR_HTTP_CONNECTIONS.inc()
+      else:
+        http = self._idle.get()
+    try:
+      yield http
+    finally:
+      self._idle.put(http)
+
+  def request(self, uri, method="GET", body=None, headers=None, redirections=httplib2.DEFAULT_MAX_REDIRECTS, connection_type=None):
+    headers = dict(headers or {})
+    with self._connection() as http:
+      token = self.auth.token()
+      headers["authorization"] = f"Bearer {token}"
+      response, content = http.request(uri, method, body=body, headers=headers, redirections=redirections, connection_type=connection_type)
+      if response.status == 401:
+        # Token revoked or expired early: refresh once and retry
+        headers["authorization"] = f"Bearer {self.auth.token(rejected=token)}"
+        response, content = http.request(uri, method, body=body, headers=headers, redirections=redirections, connection_type=connection_type)
+      return response, content
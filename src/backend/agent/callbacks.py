@@ -0,0 +1,80 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .metrics import AGENT_ITERATIONS, LLM_CALL_SECONDS, LLM_CALLS, LLM_TOKENS, PARSE_ERROR_RETRIES, TOOL_CALL_SECONDS
+
+
+def _usage(response) -> dict:
+  """Token counts the model reported for a call, or {}"""
+  for generations in response.generations:
+    for generation in generations:
+      usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+      if usage:
+        return usage
+  return (response.llm_output or {}).get("usage_metadata") or {}
+
+
+class TurnMetricsHandler(BaseCallbackHandler):
+  """Per-turn callback that times LLM and tool calls and counts agent iterations and LLM round-trips.
+  purpose labels the LLM metrics: "agent" for turns, "summary" for history summarization."""
+  run_inline = True
+
+  def __init__(self, mode: str = "structured", purpose: str = "agent"):
+    self._started = {}
+    self.mode = mode
+    self.purpose = purpose
+    self.iterations = 0
+    self.llm_calls = 0
+    self.parse_errors = 0
+
+  def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+    self._started[run_id] = time.perf_counter()
+    self.llm_calls += 1
+
+  def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+    self._started[run_id] = time.perf_counter()
+    self.llm_calls += 1
+
+  def _finish_llm(self, run_id, kwargs, response=None):
+    started = self._started.pop(run_id, None)
+    if started is None:
+      return
+    model = (kwargs.get("metadata") or {}).get("ls_model_name", "gemini")
+    LLM_CALL_SECONDS.observe(time.perf_counter() - started, model=model, purpose=self.purpose)
+    if response is not None:
+      usage = _usage(response)
+      for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+          LLM_TOKENS.inc(usage[kind], model=model, purpose=self.purpose, kind=kind.split("_")[0])
+
+  def on_llm_end(self, response, *, run_id, **kwargs):
+    self._finish_llm(run_id, kwargs, response)
+
+  def on_llm_error(self, error, *, run_id, **kwargs):
+    self._finish_llm(run_id, kwargs)
+
+  def on_agent_action(self, action, *, run_id, **kwargs):
+    self.iterations += 1
+    # AgentExecutor reports output-parsing failures as the "_Exception" pseudo-tool
+    if action.tool == "_Exception":
+      self.parse_errors += 1
+
+  def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+    self._started[run_id] = (time.perf_counter(), (serialized or {}).get("name", kwargs.get("name", "unknown")))
+
+  def _finish_tool(self, run_id):
+    started = self._started.pop(run_id, None)
+    if started is not None:
+      TOOL_CALL_SECONDS.observe(time.perf_counter() - started[0], tool=started[1])
+
+  def on_tool_end(self, output, *, run_id, **kwargs):
+    self._finish_tool(run_id)
+
+  def on_tool_error(self, error, *, run_id, **kwargs):
+    self._finish_tool(run_id)
+
+  def record_turn(self):
+    AGENT_ITERATIONS.observe(self.iterations)
+    LLM_CALLS.observe(self.llm_calls, mode=self.mode)
+    PARSE_ERROR_RETRIES.observe(self.parse_errors)
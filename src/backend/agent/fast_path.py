@@ -0,0 +1,94 @@
+import re
+import threading
+import time
+from datetime import datetime
+
+_DAY = r"(?:today|tomorrow|(?:next |this )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday))"
+_CLOCK = r"\d{1,2}(?::\d{2})?\s*(?:am|pm)?"
+_TIME = rf"(?P<time>{_DAY}(?:\s+(?:at\s+|from\s+|between\s+)?{_CLOCK}(?:\s*(?:-|to|and)\s*{_CLOCK})?)?)"
+
+AVAILABILITY_PATTERN = re.compile(
+  rf"^(?:am i|are we|is my calendar|is the calendar)\s+(?:free|available|busy|open)\s+(?:on\s+)?{_TIME}\s*\??$"
+)
+LISTING_PATTERN = re.compile(
+  r"^(?:what(?:'s| is| do i have)|show(?: me)?|list)\s+(?:my\s+)?"
+  r"(?:(?:on|events|meetings|schedule|agenda|calendar|plans)\s+)?"
+  r"(?:(?:on|for)\s+)?(?:my\s+)?(?:(?:calendar|schedule|agenda)\s+)?(?:(?:on|for)\s+)?"
+  rf"{_TIME}\s*\??$"
+)
+
+
+class FastPathRouter:
+  """Answers high-confidence availability and listing questions without the LLM.
+
+  route() returns a templated reply, or None when the message should go to the agent.
+  """
+  def __init__(self, assistant):
+    self.assistant = assistant
+    self._lock = threading.Lock()
+    self.counters = {"hits": 0, "misses": 0, "fast_seconds": 0.0, "agent_turns": 0, "agent_seconds": 0.0}
+
+  def classify(self, user_input: str):
+    text = " ".join(user_input.lower().strip().split())
+    # Normalize "2-4pm" into "2pm-4pm" so both ends carry the period
+    text = re.sub(r"(\d{1,2}(?::\d{2})?)\s*(-|to)\s*(\d{1,2}(?::\d{2})?)\s*(am|pm)", r"\1\4 \2 \3\4", text)
+    for intent, pattern in (("availability", AVAILABILITY_PATTERN), ("listing", LISTING_PATTERN)):
+      match = pattern.match(text)
+      if match:
+        return intent, match.group("time")
+    return None, None
+
+  def route(self, user_input: str):
+    started = time.perf_counter()
+    intent, time_range = self.classify(user_input)
+    reply = None
+    if intent == "availability":
+      reply = self._availability(time_range)
+    elif intent == "listing":
+      reply = self._listing(time_range)
+    with self._lock:
+      if reply is None:
+        self.counters["misses"] += 1
+      else:
+        self.counters["hits"] += 1
+        self.counters["fast_seconds"] += time.perf_counter() - started
+    return reply
+
+  def record_agent_turn(self, seconds: float):
+    with self._lock:
+      self.counters["agent_turns"] += 1
+      self.counters["agent_seconds"] += seconds
+
+  def stats(self) -> dict:
+    with self._lock:
+      counters = dict(self.counters)
+    total = counters["hits"] + counters["misses"]
+    return {
+      **counters,
+      "hit_rate": counters["hits"] / total if total else 0.0,
+      "avg_fast_ms": 1000 * counters["fast_seconds"] / counters["hits"] if counters["hits"] else None,
+      "avg_agent_ms": 1000 * counters["agent_seconds"] / counters["agent_turns"] if counters["agent_turns"] else None
+    }
+
+  def _display(self, iso: str) -> str:
+    if "T" not in iso:
+      return datetime.fromisoformat(iso).strftime("%d %b %Y (all day)")
+    return self.assistant.format_time(datetime.fromisoformat(iso.replace("Z", "+00:00")))
+
+  def _availability(self, time_range: str):
+    result = self.assistant.check_availability_tool(time_range)
+    if "error" in result:
+      return None
+    if result["available"]:
+      return f"✅ You're free. {result['message']}."
+    busy = "\n".join(f"- {self._display(slot['start'])} to {self._display(slot['end'])}" for slot in result["busy_slots"])
+    return f"❌ You're not free in that range. Busy times:\n{busy}"
+
+  def _listing(self, time_range: str):
+    result = self.assistant.list_events_tool(time_range, max_results=10)
+    if "error" in result:
+      return None
+    if not result["count"]:
+      return f"📭 {result['message']}."
+    lines = "\n".join(f"- {self._display(event['start'])}: {event['summary']}" for event in result["events"])
+    return f"📅 {result['message']}:\n{lines}"
@@ -0,0 +1,67 @@
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from .calendar_mirror import merge_intervals, parse_iso, to_utc_iso
+
+
+class BusyIndex:
+  """Sorted, merged busy intervals with bisect lookup of the gaps between them"""
+  def __init__(self, busy: list):
+    intervals = merge_intervals([(parse_iso(slot["start"]), parse_iso(slot["end"])) for slot in busy])
+    self.starts = [start for start, _ in intervals]
+    self.ends = [end for _, end in intervals]
+
+  def overlapping(self, lo: datetime, hi: datetime) -> list:
+    """(start, end) busy intervals that overlap [lo, hi)"""
+    i = bisect_right(self.ends, lo)
+    found = []
+    while i < len(self.starts) and self.starts[i] < hi:
+      found.append((self.starts[i], self.ends[i]))
+      i += 1
+    return found
+
+  def free_gaps(self, lo: datetime, hi: datetime):
+    """Yield (start, end) free gaps inside [lo, hi)"""
+    i = bisect_right(self.ends, lo)
+    cursor = lo
+    while cursor < hi:
+      if i >= len(self.starts) or self.starts[i] >= hi:
+        yield cursor, hi
+        return
+      if self.starts[i] > cursor:
+        yield cursor, self.starts[i]
+      cursor = max(cursor, self.ends[i])
+      i += 1
+
+
+def combine_busy(busy_by_calendar: dict) -> list:
+  """Union of busy slots across calendars, merged into a combined busy view"""
+  intervals = [
+    (parse_iso(slot["start"]), parse_iso(slot["end"]))
+    for busy in busy_by_calendar.values()
+    for slot in busy
+  ]
+  return [{"start": to_utc_iso(start), "end": to_utc_iso(end)} for start, end in merge_intervals(intervals)]
+
+
+def find_free_slots(busy: list, window_start: datetime, window_end: datetime, duration: timedelta,
+                    count: int, tz, work_start: int = 9, work_end: int = 18, weekdays_only: bool = True) -> list:
+  """Return the `count` earliest (start, end) slots of `duration` inside working hours"""
+  if duration <= timedelta(0):
+    raise ValueError("Slot duration must be positive")
+  index = BusyIndex(busy)
+  slots = []
+  day = window_start.astimezone(tz).date()
+  last_day = window_end.astimezone(tz).date()
+  while day <= last_day and len(slots) < count:
+    if not (weekdays_only and day.weekday() >= 5):
+      lo = max(tz.localize(datetime.combine(day, time(work_start))), window_start)
+      hi = min(tz.localize(datetime.combine(day, time(work_end))), window_end)
+      for gap_start, gap_end in index.free_gaps(lo, hi):
+        while gap_start + duration <= gap_end and len(slots) < count:
+          slots.append((gap_start.astimezone(tz), (gap_start + duration).astimezone(tz)))
+          gap_start += duration
+        if len(slots) >= count:
+          break
+    day += timedelta(days=1)
+  return slots
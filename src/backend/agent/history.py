@@ -0,0 +1,104 @@
+import json
+import logging
+
+from langchain_core.messages import SystemMessage
+
+from .callbacks import TurnMetricsHandler
+from .session import ChatMessage
+
+SUMMARY_PROMPT = (
+  "You maintain a running summary of a conversation between a user and a calendar "
+  "booking assistant. Fold the new messages into the existing summary. Keep every "
+  "date, time, event title, attendee and decision; drop small talk. Reply with the "
+  "updated summary only.\n\n"
+  "Existing summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+
+def estimate_tokens(message) -> int:
+  """Cheap token estimate (~4 characters per token) that needs no tokenizer round-trip"""
+  content = message.content if isinstance(message, ChatMessage) else json.dumps(message)
+  if not isinstance(content, str):
+    content = json.dumps(content, default=str)
+  return len(content) // 4 + 4
+
+
+class HistoryManager:
+  """Keeps the prompt history within a token budget.
+
+  Recent turns are passed verbatim; once they exceed the budget the oldest are
+  folded into session.summary. A pending booking proposal is carried as its own
+  structured message so summarization never loses it.
+  """
+  def __init__(self, llm, token_budget: int = 2000, keep_recent: int = 6):
+    self.llm = llm
+    self.token_budget = token_budget
+    self.keep_recent = keep_recent
+
+  def _live_messages(self, session) -> list:
+    return [m for m in session.chat_history[session.summarized_count:] if isinstance(m, ChatMessage)]
+
+  def build(self, session) -> list:
+    """Messages to pass as chat_history for the next turn"""
+    messages = []
+    if session.summary:
+      messages.append(SystemMessage(content=f"Summary of the earlier conversation: {session.summary}"))
+    messages.extend(m.to_langchain() for m in self._live_messages(session))
+    if session.pending_proposal:
+      messages.append(SystemMessage(
+        content=f"Booking proposal awaiting the user's confirmation: {json.dumps(session.pending_proposal)}"
+      ))
+    return messages
+
+  def _fold_range(self, session):
+    """(cut index, messages to fold) or None when the live history fits the budget"""
+    live = session.chat_history[session.summarized_count:]
+    sizes = [estimate_tokens(m) for m in live]
+    if sum(sizes) <= self.token_budget:
+      return None
+    # Keep the newest messages that fit in half the budget, and at least keep_recent
+    kept, kept_tokens = 0, 0
+    for size in reversed(sizes):
+      if kept >= self.keep_recent and kept_tokens + size > self.token_budget // 2:
+        break
+      kept += 1
+      kept_tokens += size
+    cut = len(live) - kept
+    if cut <= 0:
+      return None
+    folded = [m for m in live[:cut] if isinstance(m, ChatMessage)]
+    return session.summarized_count + cut, folded
+
+  def _prompt(self, session, folded: list) -> str:
+    lines = "\n".join(
+      f"{'Assistant' if m.type == 'ai' else 'User'}: {m.content}" for m in folded
+    )
+    return SUMMARY_PROMPT.format(summary=session.summary or "(none)", messages=lines)
+
+  @staticmethod
+  def _config() -> dict:
+    # Summarization latency and tokens show up in /metrics under purpose="summary"
+    return {"callbacks": [TurnMetricsHandler(purpose="summary")]}
+
+  def compact(self, session):
+    fold = self._fold_range(session)
+    if fold is None:
+      return
+    cut, folded = fold
+    try:
+      session.summary = self.llm.invoke(self._prompt(session, folded), config=self._config()).content
+      session.summarized_count = cut
+    except Exception as e:
+      # Keep the verbatim history and retry on a later turn
+      logging.warning(f"History summarization failed: {str(e)}")
+
+  async def acompact(self, session):
+    fold = self._fold_range(session)
+    if fold is None:
+      return
+    cut, folded = fold
+    try:
+      session.summary = (await self.llm.ainvoke(self._prompt(session, folded), config=self._config())).content
+      session.summarized_count = cut
+    except Exception as e:
+      logging.warning(f"History summarization failed: {str(e)}")
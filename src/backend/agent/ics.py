@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+from .calendar_mirror import parse_iso
+
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//calendar-assistant//EN\r\nCALSCALE:GREGORIAN\r\n"
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+_STATUS = {"confirmed": "CONFIRMED", "tentative": "TENTATIVE", "cancelled": "CANCELLED"}
+
+
+def _escape(text: str) -> str:
+  return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+  """RFC 5545 line folding: at most 75 octets per line, continuations start with a space"""
+  encoded = line.encode()
+  if len(encoded) <= 75:
+    return line + "\r\n"
+  parts = []
+  start = 0
+  limit = 75
+  while start < len(encoded):
+    end = min(start + limit, len(encoded))
+    # Never split a UTF-8 sequence
+    while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+      end -= 1
+    parts.append(encoded[start:end].decode())
+    start = end
+    limit = 74
+  return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc_stamp(dt: datetime) -> str:
+  return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _time_property(name: str, value: dict) -> str:
+  if "dateTime" in value:
+    return f"{name}:{_utc_stamp(parse_iso(value['dateTime']))}"
+  return f"{name};VALUE=DATE:{value['date'].replace('-', '')}"
+
+
+def ics_event(event: dict) -> str:
+  """One Calendar API event as a VEVENT block"""
+  lines = [
+    "BEGIN:VEVENT",
+    f"UID:{event.get('iCalUID') or event['id']}",
+    f"DTSTAMP:{_utc_stamp(parse_iso(event['updated']) if event.get('updated') else datetime.now(timezone.utc))}",
+    _time_property("DTSTART", event["start"]),
+    _time_property("DTEND", event["end"]),
+    f"SUMMARY:{_escape(event.get('summary', 'No title'))}",
+  ]
+  if event.get("originalStartTime"):
+    # Instances of a recurring event share the series' iCalUID; RECURRENCE-ID tells them apart
+    lines.append(_time_property("RECURRENCE-ID", event["originalStartTime"]))
+  if event.get("location"):
+    lines.append(f"LOCATION:{_escape(event['location'])}")
+  if event.get("description"):
+    lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+  if event.get("status") in _STATUS:
+    lines.append(f"STATUS:{_STATUS[event['status']]}")
+  if event.get("htmlLink"):
+    lines.append(f"URL:{event['htmlLink']}")
+  lines.append("END:VEVENT")
+  return "".join(_fold(line) for line in lines)
@@ -0,0 +1,200 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_text(labelnames: tuple, values: tuple, extra: str = "") -> str:
+  pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+  if extra:
+    pairs.append(extra)
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+  def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = labelnames
+    self._values = {}
+    self._lock = threading.Lock()
+
+  def inc(self, amount: float = 1, **labels):
+    key = tuple(str(labels[name]) for name in self.labelnames)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+  def render(self) -> list:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+    with self._lock:
+      for key, value in sorted(self._values.items()):
+        lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+    return lines
+
+
+class Gauge:
+  def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = labelnames
+    self._values = {}
+    self._lock = threading.Lock()
+
+  def inc(self, amount: float = 1, **labels):
+    key = tuple(str(labels[name]) for name in self.labelnames)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+  def dec(self, amount: float = 1, **labels):
+    self.inc(-amount, **labels)
+
+  def set(self, value: float, **labels):
+    key = tuple(str(labels[name]) for name in self.labelnames)
+    with self._lock:
+      self._values[key] = value
+
+  def render(self) -> list:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+    with self._lock:
+      for key, value in sorted(self._values.items()):
+        lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+    return lines
+
+
+class Histogram:
+  def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = labelnames
+    self.buckets = tuple(buckets)
+    self._series = {}
+    self._lock = threading.Lock()
+
+  def observe(self, value: float, **labels):
+    key = tuple(str(labels[name]) for name in self.labelnames)
+    with self._lock:
+      series = self._series.get(key)
+      if series is None:
+        series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+      for i, bound in enumerate(self.buckets):
+        if value <= bound:
+          series["buckets"][i] += 1
+      series["sum"] += value
+      series["count"] += 1
+
+  @contextmanager
+  def time(self, **labels):
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - started, **labels)
+
+  def render(self) -> list:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+    with self._lock:
+      for key, series in sorted(self._series.items()):
+        for bound, count in zip(self.buckets, series["buckets"]):
+          le = 'le="%s"' % bound
+          lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {count}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {series['count']}")
+        lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {series['sum']}")
+        lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series['count']}")
+    return lines
+
+
+class Registry:
+  def __init__(self):
+    self._metrics = []
+
+  def register(self, metric):
+    self._metrics.append(metric)
+    return metric
+
+  def render(self) -> str:
+    lines = []
+    for metric in self._metrics:
+      lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TURN_SECONDS = REGISTRY.register(Histogram(
+  "assistant_turn_seconds", "Total chat turn time", ("path",)
+))
+LLM_CALL_SECONDS = REGISTRY.register(Histogram(
+  "assistant_llm_call_seconds", "Time per Gemini call", ("model", "purpose")
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+  "assistant_llm_tokens_total", "Tokens Gemini reported per call, by input or output", ("model", "purpose", "kind")
+))
+TOOL_CALL_SECONDS = REGISTRY.register(Histogram(
+  "assistant_tool_call_seconds", "Time per agent tool call", ("tool",)
+))
+CALENDAR_API_SECONDS = REGISTRY.register(Histogram(
+  "assistant_calendar_api_seconds", "Time per Google Calendar API request", ("operation",)
+))
+SESSION_LOAD_SECONDS = REGISTRY.register(Histogram(
+  "assistant_session_load_seconds", "Time to load a session from the session store"
+))
+SESSION_SAVE_SECONDS = REGISTRY.register(Histogram(
+  "assistant_session_save_seconds", "Time to persist a session turn"
+))
+SESSION_CONFLICTS = REGISTRY.register(Counter(
+  "assistant_session_conflicts_total", "Session saves retried because another worker wrote first"
+))
+SESSIONS_RESIDENT = REGISTRY.register(Gauge(
+  "assistant_sessions_resident", "Sessions held in the in-process session cache"
+))
+SESSIONS_RESIDENT_BYTES = REGISTRY.register(Gauge(
+  "assistant_sessions_resident_bytes", "Approximate bytes of session state held in the session cache"
+))
+SESSION_BYTES = REGISTRY.register(Histogram(
+  "assistant_session_bytes", "Approximate resident bytes per session when cached",
+  buckets=(1024, 4096, 16384, 65536, 262144, 1048576)
+))
+SESSION_EVICTIONS = REGISTRY.register(Counter(
+  "assistant_session_evictions_total", "Sessions dropped from the session cache, by limit reached", ("reason",)
+))
+QUEUED_TURNS = REGISTRY.register(Counter(
+  "assistant_queued_turns_total", "Turns that waited for an earlier turn of the same session"
+))
+AGENT_ITERATIONS = REGISTRY.register(Histogram(
+  "assistant_agent_iterations", "Agent iterations (tool steps) per turn", buckets=(0, 1, 2, 3, 4, 5, 10)
+))
+LLM_CALLS = REGISTRY.register(Histogram(
+  "assistant_agent_llm_calls", "LLM round-trips per agent turn", ("mode",), buckets=(1, 2, 3, 4, 5, 6, 10)
+))
+PARSE_ERROR_RETRIES = REGISTRY.register(Histogram(
+  "assistant_agent_parse_error_retries", "Output parsing-error retries per turn", buckets=(0, 1, 2, 3, 5)
+))
+CALENDAR_HTTP_CONNECTIONS = REGISTRY.register(Counter(
+  "assistant_calendar_http_connections_total", "Pooled Google API HTTP connections opened"
+))
+CALENDAR_TOKEN_REFRESHES = REGISTRY.register(Counter(
+  "assistant_calendar_token_refreshes_total", "Service-account access token refreshes"
+))
+CALENDAR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+  "assistant_calendar_queue_depth", "Calendar calls waiting for a rate-limit token", ("calendar",)
+))
+CALENDAR_IN_FLIGHT = REGISTRY.register(Gauge(
+  "assistant_calendar_in_flight", "Calendar calls currently executing", ("calendar",)
+))
+CALENDAR_COALESCED = REGISTRY.register(Counter(
+  "assistant_calendar_coalesced_total", "Calendar reads served by an identical in-flight call", ("operation",)
+))
+CALENDAR_RATE_LIMITED = REGISTRY.register(Counter(
+  "assistant_calendar_rate_limited_total", "Calendar calls retried after a 403/429 rate-limit response", ("operation",)
+))
+CALENDAR_PREFETCHES = REGISTRY.register(Counter(
+  "assistant_calendar_prefetches_total", "Speculative calendar reads started from time expressions in the message", ("operation",)
+))
+PREFETCH_LOOKUPS = REGISTRY.register(Counter(
+  "assistant_prefetch_lookups_total", "Tool calendar reads during turns with a prefetch, by whether one covered them", ("operation", "result")
+))
+PREFETCH_WASTED = REGISTRY.register(Counter(
+  "assistant_prefetch_wasted_total", "Speculative calendar reads no tool used", ("operation",)
+))
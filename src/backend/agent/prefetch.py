@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import re
+from concurrent.futures import Future
+from contextvars import ContextVar
+
+from .metrics import CALENDAR_PREFETCHES, PREFETCH_LOOKUPS, PREFETCH_WASTED
+from .time_parser import find_time_expressions
+
+# Prefetch for the turn being handled; tools on worker threads see it through copied contexts
+current_prefetch: ContextVar = ContextVar("current_prefetch", default=None)
+
+# Which read a message is likely to need: availability tools use freebusy, listings use events.list
+_OPERATION_HINTS = {
+  "freebusy": re.compile(r"\b(?:free|available|availability|busy|open|book|schedule|slot|slots)\b"),
+  "list": re.compile(r"\b(?:what|show|list|events?|meetings?|agenda|plans|calendar)\b"),
+}
+
+
+class TurnPrefetch:
+  """Speculative calendar reads for one agent turn.
+
+  start() submits freebusy and list queries for the time ranges named in the
+  user's message, so they run while the LLM is still planning. Tools then call
+  take() with the range they resolved; an exact match hands over the pending
+  call. finish() counts whatever no tool asked for as wasted.
+  """
+  def __init__(self, operations: tuple, max_results: int):
+    self.operations = operations
+    self.max_results = max_results
+    self._calls = {}
+    self._used = set()
+
+  def start(self, calendar, executor, ranges: list):
+    """Submit blocking reads for each (start_iso, end_iso) to executor"""
+    for start_iso, end_iso in ranges:
+      if "freebusy" in self.operations:
+        self._add(("freebusy", start_iso, end_iso), executor.submit(calendar.get_freebusy, start_iso, end_iso))
+      if "list" in self.operations:
+        self._add(("list", start_iso, end_iso), executor.submit(calendar.list_events, start_iso, end_iso, self.max_results))
+
+  def astart(self, acalendar, ranges: list):
+    """Start native async reads for each (start_iso, end_iso) as tasks on the running loop"""
+    for start_iso, end_iso in ranges:
+      if "freebusy" in self.operations:
+        self._add(("freebusy", start_iso, end_iso), asyncio.ensure_future(acalendar.get_freebusy(start_iso, end_iso)))
+      if "list" in self.operations:
+        self._add(("list", start_iso, end_iso), asyncio.ensure_future(acalendar.list_events(start_iso, end_iso, self.max_results)))
+
+  def _add(self, key: tuple, call):
+    if key in self._calls:
+      call.cancel()
+      return
+    self._calls[key] = call
+    CALENDAR_PREFETCHES.inc(operation=key[0])
+
+  def take(self, operation: str, start_iso: str, end_iso: str, max_results: int = None):
+    """The prefetched call covering this read, or None to fetch it directly"""
+    key = (operation, start_iso, end_iso)
+    call = self._calls.get(key)
+    if call is None or (max_results is not None and max_results > self.max_results):
+      PREFETCH_LOOKUPS.inc(operation=operation, result="miss")
+      return None
+    if isinstance(call, Future) and call.cancel():
+      # Still queued behind the tool pool: waiting on it from a pool thread could deadlock
+      del self._calls[key]
+      PREFETCH_LOOKUPS.inc(operation=operation, result="miss")
+      return None
+    self._used.add(key)
+    PREFETCH_LOOKUPS.inc(operation=operation, result="hit")
+    return call
+
+  def finish(self):
+    for key, call in self._calls.items():
+      if key in self._used:
+        continue
+      PREFETCH_WASTED.inc(operation=key[0])
+      if not call.done():
+        call.cancel()
+      elif isinstance(call, asyncio.Future) and not call.cancelled():
+        # Nobody awaits it now; retrieve any error so it isn't logged as unhandled
+        call.exception()
+
+
+class CalendarPrefetcher:
+  """Builds a TurnPrefetch from the time expressions in a message"""
+  def __init__(self, assistant, operations: tuple = ("freebusy", "list"), max_ranges: int = 2, max_results: int = 10):
+    self.assistant = assistant
+    self.operations = operations
+    self.max_ranges = max_ranges
+    self.max_results = max_results
+
+  def operations_for(self, user_input: str) -> tuple:
+    """Configured operations the message hints at; none when it hints at neither"""
+    text = user_input.lower()
+    return tuple(op for op in self.operations if op in _OPERATION_HINTS and _OPERATION_HINTS[op].search(text))
+
+  def ranges(self, user_input: str) -> list:
+    try:
+      found = find_time_expressions(user_input, self.assistant.user_timezone, limit=self.max_ranges)
+    except Exception as e:
+      logging.warning(f"Prefetch time extraction failed: {str(e)}")
+      return []
+    return [(start.isoformat(), end.isoformat()) for _, start, end in found]
+
+  def _plan(self, user_input: str):
+    operations = self.operations_for(user_input)
+    if not operations:
+      return None, None
+    ranges = self.ranges(user_input)
+    if not ranges:
+      return None, None
+    return TurnPrefetch(operations, self.max_results), ranges
+
+  def start(self, user_input: str):
+    """TurnPrefetch with blocking reads running on the tool pool, or None"""
+    prefetch, ranges = self._plan(user_input)
+    if prefetch is not None:
+      prefetch.start(self.assistant.calendar, self.assistant.tool_executor, ranges)
+    return prefetch
+
+  def astart(self, user_input: str):
+    """TurnPrefetch for an async turn: native tasks when an async calendar client is configured"""
+    if self.assistant.acalendar is None:
+      return self.start(user_input)
+    prefetch, ranges = self._plan(user_input)
+    if prefetch is not None:
+      prefetch.astart(self.assistant.acalendar, ranges)
+    return prefetch
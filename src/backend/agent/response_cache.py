@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+  """Key/value storage with per-entry TTL and LRU eviction"""
+  def get(self, key: str):
+    raise NotImplementedError
+
+  def set(self, key: str, value, ttl: float):
+    raise NotImplementedError
+
+  def clear(self):
+    raise NotImplementedError
+
+  def counter(self, name: str) -> int:
+    raise NotImplementedError
+
+  def increment(self, name: str):
+    raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+  def __init__(self, max_entries: int = 1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._counters = {}
+    self._lock = threading.Lock()
+
+  def get(self, key: str):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires_at, value = entry
+      if expires_at < time.monotonic():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key: str, value, ttl: float):
+    with self._lock:
+      self._entries[key] = (time.monotonic() + ttl, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def counter(self, name: str) -> int:
+    with self._lock:
+      return self._counters.get(name, 0)
+
+  def increment(self, name: str):
+    with self._lock:
+      self._counters[name] = self._counters.get(name, 0) + 1
+
+
+class DiskCacheBackend(CacheBackend):
+  """SQLite-backed cache that survives restarts and can be shared by local workers"""
+  def __init__(self, path: str = "response_cache.db", max_entries: int = 10000):
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.executescript("""
+      CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+      );
+      CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+      );
+    """)
+
+  def get(self, key: str):
+    now = time.time()
+    with self._lock:
+      row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+      if row is None:
+        return None
+      if row[1] < now:
+        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return None
+      self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+      return json.loads(row[0])
+
+  def set(self, key: str, value, ttl: float):
+    now = time.time()
+    with self._lock:
+      self._conn.execute(
+        "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+        (key, json.dumps(value, default=str), now + ttl, now)
+      )
+      self._conn.execute(
+        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+        (self.max_entries,)
+      )
+
+  def clear(self):
+    with self._lock:
+      self._conn.execute("DELETE FROM cache")
+
+  def counter(self, name: str) -> int:
+    with self._lock:
+      row = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+      return row[0] if row else 0
+
+  def increment(self, name: str):
+    with self._lock:
+      self._conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,)
+      )
+
+
+class ResponseCache:
+  """Caches agent replies and tool results.
+
+  Callers fold the calendar ID and its generation into every key, so a booking
+  makes earlier entries unreachable; TTL and LRU eviction clean them up. The
+  generation lives in the backend, so workers sharing a disk cache see each
+  other's bookings.
+  """
+  def __init__(self, backend: CacheBackend, ttl: float = 300):
+    self.backend = backend
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self.counters = {}
+
+  @staticmethod
+  def make_key(kind: str, *parts) -> str:
+    payload = json.dumps([kind, *parts], sort_keys=True, default=str)
+    return f"{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+  def _count(self, kind: str, outcome: str):
+    with self._lock:
+      counts = self.counters.setdefault(kind, {"hits": 0, "misses": 0})
+      counts[outcome] += 1
+
+  def get(self, kind: str, key: str):
+    value = self.backend.get(key)
+    self._count(kind, "misses" if value is None else "hits")
+    return value
+
+  def set(self, key: str, value):
+    self.backend.set(key, value, self.ttl)
+
+  def generation(self, scope: str) -> int:
+    return self.backend.counter(f"generation:{scope}")
+
+  def bump(self, scope: str):
+    """Make every entry keyed on scope's current generation unreachable"""
+    self.backend.increment(f"generation:{scope}")
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {kind: dict(counts) for kind, counts in self.counters.items()}
@@ -1,5 +1,12 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+# Bounds on free-slot searches: a slot fits in a day, and nobody reads more than a page of them
+MAX_SLOT_MINUTES = 24 * 60
+MAX_SLOT_COUNT = 50
+# Each 50 calendars is one more freebusy call in the team availability batch
+MAX_TEAM_CALENDARS = 100
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
@@ -11,6 +18,9 @@ class ChatResponse(BaseModel):
 class CheckAvailabilitySchema(BaseModel):
   time_range: str = Field(..., description="Time range in natural language (e.g., 'tomorrow 2-4pm', '2025-07-05 14:00 to 16:00')")
 
+class CheckMultipleAvailabilitySchema(BaseModel):
+  time_ranges: List[str] = Field(..., description="Several time ranges in natural language (e.g., ['monday 2-3pm', 'tuesday 10-11am'])")
+
 class CreateBookingSchema(BaseModel):
   summary: str = Field(..., description="Event title or description")
   time_range: str = Field(..., description="Time range in natural language (e.g., 'next monday 10am to 11am')")
@@ -24,4 +34,48 @@ class ConfirmBookingSchema(BaseModel):
     confirmation: bool = Field(..., description="User confirmation (True/False)")
     summary: str = Field(..., description="Event title")
     start_iso: str = Field(..., description="Start time in ISO format")
-    end_iso: str = Field(..., description="End time in ISO format")
\ No newline at end of file
+    end_iso: str = Field(..., description="End time in ISO format")
+    idempotency_key: Optional[str] = Field(None, description="idempotency_key from the booking proposal")
+    
+class FindFreeSlotsSchema(BaseModel):
+    duration_minutes: int = Field(60, gt=0, le=MAX_SLOT_MINUTES, description="Length of the slot in minutes (default: 60)")
+    time_range: Optional[str] = Field(None, description="Window to search in natural language (e.g., 'next monday', 'tomorrow'). Defaults to the next 14 days")
+    count: int = Field(3, ge=1, le=MAX_SLOT_COUNT, description="Number of slots to return (default: 3)")
+
+class FreeSlotsRequest(BaseModel):
+    duration_minutes: int = Field(60, gt=0, le=MAX_SLOT_MINUTES)
+    start_iso: Optional[str] = None
+    end_iso: Optional[str] = None
+    count: int = Field(3, ge=1, le=MAX_SLOT_COUNT)
+
+class TeamAvailabilitySchema(BaseModel):
+    calendar_ids: List[str] = Field(..., min_length=1, max_length=MAX_TEAM_CALENDARS, description="Calendar IDs or email addresses of everyone who must attend")
+    time_range: str = Field(..., description="Window to search in natural language (e.g., 'next week', 'tomorrow 9am to 6pm')")
+    duration_minutes: int = Field(60, gt=0, le=MAX_SLOT_MINUTES, description="Meeting length in minutes (default: 60)")
+    count: int = Field(3, ge=1, le=MAX_SLOT_COUNT, description="Number of common free slots to return (default: 3)")
+
+class BulkEventSchema(BaseModel):
+    summary: str = Field(..., description="Event title")
+    time_range: str = Field(..., description="Time range in natural language (e.g., 'next monday 10am to 11am')")
+
+class BulkBookingSchema(BaseModel):
+    events: List[BulkEventSchema] = Field(..., description="Events to book, each with a summary and a time range")
+    confirmation: bool = Field(False, description="False to only check for conflicts; True once the user has confirmed the plan")
+    idempotency_key: Optional[str] = Field(None, description="idempotency_key returned by the conflict check")
+
+class TeamAvailabilityRequest(BaseModel):
+    calendar_ids: List[str] = Field(..., min_length=1, max_length=MAX_TEAM_CALENDARS)
+    start_iso: str
+    end_iso: str
+    duration_minutes: int = Field(60, gt=0, le=MAX_SLOT_MINUTES)
+    count: int = Field(3, ge=1, le=MAX_SLOT_COUNT)
+
+class BulkBookingItem(BaseModel):
+    summary: str
+    start_iso: str
+    end_iso: str
+
+class BulkBookingRequest(BaseModel):
+    events: List[BulkBookingItem]
+    dry_run: bool = False
+    idempotency_key: Optional[str] = None
@@ -0,0 +1,124 @@
+import sys
+import uuid
+import pytz
+
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+
+
+class ChatMessage:
+  """Compact history entry: just the role and the text.
+
+  A LangChain message is a pydantic model carrying ids, metadata and kwargs
+  dicts; history only needs these two fields, so sessions keep this slotted
+  record and HistoryManager builds LangChain messages per turn for the prompt.
+  """
+  __slots__ = ("type", "content")
+
+  def __init__(self, type: str, content: str):
+    self.type = sys.intern(type)
+    self.content = content
+
+  def to_langchain(self):
+    from langchain_core.messages import AIMessage, HumanMessage
+    return AIMessage(content=self.content) if self.type == "ai" else HumanMessage(content=self.content)
+
+  def __eq__(self, other):
+    return isinstance(other, ChatMessage) and self.type == other.type and self.content == other.content
+
+  def __repr__(self):
+    return f"ChatMessage({self.type!r}, {self.content!r})"
+
+
+def message_to_dict(msg) -> dict:
+  # Proposal records are already plain dicts
+  if isinstance(msg, dict):
+    return msg
+  return {
+    "type": "ai" if msg.type == "ai" else "human",
+    "content": msg.content
+  }
+
+
+def message_from_dict(data: dict):
+  if data["type"] in ("ai", "human"):
+    return ChatMessage(data["type"], data["content"])
+  return data
+
+
+# Per-entry cost beyond the text itself: the slotted record plus its list slot
+_MESSAGE_OVERHEAD = sys.getsizeof(ChatMessage("ai", "")) + 8
+_LIST_SLOT = 8
+
+
+def _deep_sizeof(value) -> int:
+  """Bytes held by a JSON-like value: its containers plus every key and item"""
+  size = sys.getsizeof(value)
+  if isinstance(value, dict):
+    size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+  elif isinstance(value, (list, tuple)):
+    size += sum(_deep_sizeof(item) for item in value)
+  return size
+
+
+class ChatSession:
+  """Light per-session state paired with the shared CalendarAssistant runtime"""
+  __slots__ = ("session_id", "chat_history", "user_timezone", "persisted_count",
+               "summary", "summarized_count", "pending_proposal", "version")
+
+  def __init__(self, session_id: str = None, chat_history: list = None, timezone: str = DEFAULT_TIMEZONE):
+    self.session_id = session_id or str(uuid.uuid4())
+    self.chat_history = chat_history if chat_history is not None else []
+    self.user_timezone = pytz.timezone(timezone)
+    # Number of chat_history entries already written to the session store
+    self.persisted_count = 0
+    # Rolling summary of chat_history[:summarized_count], maintained by HistoryManager
+    self.summary = ""
+    self.summarized_count = 0
+    # Booking proposal from CreateBooking that still awaits confirmation
+    self.pending_proposal = None
+    # Store version this copy was loaded at; saves compare-and-swap against it
+    self.version = 0
+
+  def clear_history(self):
+    self.chat_history = []
+    self.persisted_count = 0
+    self.summary = ""
+    self.summarized_count = 0
+    self.pending_proposal = None
+
+  def approximate_size(self) -> int:
+    """Approximate resident bytes of this session's state"""
+    size = sys.getsizeof(self) + sys.getsizeof(self.chat_history) + sys.getsizeof(self.summary)
+    for message in self.chat_history:
+      if isinstance(message, ChatMessage):
+        size += _MESSAGE_OVERHEAD + sys.getsizeof(message.content)
+      else:
+        size += _LIST_SLOT + _deep_sizeof(message)
+    if self.pending_proposal:
+      size += _deep_sizeof(self.pending_proposal)
+    return size
+
+  def to_dict(self) -> dict:
+    """Serialize state for session persistence"""
+    return {
+      "session_id": self.session_id,
+      "timezone": self.user_timezone.zone,
+      "chat_history": [message_to_dict(msg) for msg in self.chat_history],
+      "summary": self.summary,
+      "summarized_count": self.summarized_count,
+      "pending_proposal": self.pending_proposal
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict):
+    """Deserialize from session data"""
+    session = cls(
+      session_id=data["session_id"],
+      chat_history=[message_from_dict(msg) for msg in data.get("chat_history", [])],
+      timezone=data.get("timezone", DEFAULT_TIMEZONE)
+    )
+    session.summary = data.get("summary", "")
+    session.summarized_count = data.get("summarized_count", 0)
+    session.pending_proposal = data.get("pending_proposal")
+    return session
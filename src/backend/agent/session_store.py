@@ -0,0 +1,294 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import (
+  SESSION_BYTES, SESSION_CONFLICTS, SESSION_EVICTIONS, SESSION_LOAD_SECONDS, SESSION_SAVE_SECONDS,
+  SESSIONS_RESIDENT, SESSIONS_RESIDENT_BYTES
+)
+from .session import ChatSession, message_to_dict, message_from_dict
+
+
+class SessionConflictError(RuntimeError):
+  """A session kept changing underneath a save until the retries ran out"""
+
+
+class SessionStore:
+  """Pluggable session persistence shared by every worker.
+
+  Each stored session carries a version number that every write bumps. Cached
+  sessions are revalidated against it on get(), and save() is a compare-and-swap:
+  when another worker wrote first, this turn's messages are rebased onto the
+  latest stored history and the write is retried.
+
+  The cache is bounded by both cache_size sessions and memory_budget bytes
+  (approximate, per process). Sessions are written through on every save, so
+  evicting the least recently used ones just drops them from memory; the next
+  get() rehydrates them from the store.
+
+  Store calls block (SQLite I/O, fsync, CAS retries); async code uses the
+  a-prefixed wrappers, which run them on the store's own thread.
+
+  Subclasses implement the _version/_load/_insert/_append/_clear hooks.
+  """
+  def __init__(self, cache_size: int = 1024, max_retries: int = 5, memory_budget: int = None):
+    self.cache_size = cache_size
+    self.max_retries = max_retries
+    self.memory_budget = memory_budget
+    self._cache = OrderedDict()
+    self._sizes = {}
+    self._resident_bytes = 0
+    self._lock = threading.RLock()
+    # Every call takes _lock anyway, so one thread is enough
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+
+  def get(self, session_id: str):
+    """Return the session, loading it lazily on a cache miss or when another worker changed it, or None if unknown"""
+    with self._lock:
+      session = self._cache.get(session_id)
+      if session is not None and session.version == self._version(session_id):
+        self._cache.move_to_end(session_id)
+        return session
+      with SESSION_LOAD_SECONDS.time():
+        session = self._load(session_id)
+      if session is not None:
+        self._remember(session)
+      return session
+
+  def get_or_create(self, session_id: str) -> ChatSession:
+    with self._lock:
+      session = self.get(session_id)
+      if session is None:
+        session = ChatSession(session_id=session_id)
+        self._insert(session)
+        self._remember(session)
+        logging.info(f"Created new session: {session_id}")
+      return session
+
+  def save(self, session: ChatSession):
+    """Persist only the messages added since the last save, plus the small summary state"""
+    with self._lock, SESSION_SAVE_SECONDS.time():
+      for _ in range(self.max_retries):
+        new_messages = session.chat_history[session.persisted_count:]
+        if self._append(session, session.persisted_count, [message_to_dict(m) for m in new_messages]):
+          session.version += 1
+          session.persisted_count = len(session.chat_history)
+          self._remember(session)
+          return
+        SESSION_CONFLICTS.inc()
+        logging.info(f"Session {session.session_id} changed since version {session.version}; rebasing")
+        self._rebase(session, new_messages)
+      raise SessionConflictError(f"Session {session.session_id} is being updated concurrently")
+
+  def _offload(self, func, *args):
+    return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+  async def aget_or_create(self, session_id: str) -> ChatSession:
+    return await self._offload(self.get_or_create, session_id)
+
+  async def asave(self, session: ChatSession):
+    return await self._offload(self.save, session)
+
+  async def aclear(self, session_id: str) -> bool:
+    return await self._offload(self.clear, session_id)
+
+  async def alist_ids(self) -> list:
+    return await self._offload(self.list_ids)
+
+  def _rebase(self, session: ChatSession, new_messages: list):
+    """Move this turn's unsaved messages on top of the latest stored history.
+
+    The stored summary wins (a skipped compaction reruns next turn); the pending
+    proposal is this turn's, being the most recent.
+    """
+    latest = self._load(session.session_id) or ChatSession(session_id=session.session_id)
+    session.chat_history = latest.chat_history + new_messages
+    session.persisted_count = latest.persisted_count
+    session.summary, session.summarized_count = latest.summary, latest.summarized_count
+    session.version = latest.version
+
+  def clear(self, session_id: str) -> bool:
+    with self._lock:
+      session = self.get(session_id)
+      if session is None:
+        return False
+      session.clear_history()
+      self._clear(session_id)
+      session.version += 1
+      self._remember(session)
+      return True
+
+  def _remember(self, session: ChatSession):
+    size = session.approximate_size()
+    SESSION_BYTES.observe(size)
+    self._resident_bytes += size - self._sizes.get(session.session_id, 0)
+    self._sizes[session.session_id] = size
+    self._cache[session.session_id] = session
+    self._cache.move_to_end(session.session_id)
+    # Always keep the session just touched, even if it alone exceeds the budget
+    while len(self._cache) > 1:
+      if len(self._cache) > self.cache_size:
+        reason = "count"
+      elif self.memory_budget is not None and self._resident_bytes > self.memory_budget:
+        reason = "memory"
+      else:
+        break
+      evicted, _ = self._cache.popitem(last=False)
+      self._resident_bytes -= self._sizes.pop(evicted)
+      SESSION_EVICTIONS.inc(reason=reason)
+    SESSIONS_RESIDENT.set(len(self._cache))
+    SESSIONS_RESIDENT_BYTES.set(self._resident_bytes)
+
+  def resident_stats(self) -> dict:
+    # Lock-free on purpose: called from the event loop, and a slightly torn read is harmless
+    return {
+      "resident": len(self._cache),
+      "resident_bytes": self._resident_bytes,
+      "memory_budget": self.memory_budget
+    }
+
+  def list_ids(self) -> list:
+    raise NotImplementedError
+
+  def _version(self, session_id: str):
+    """Stored version of the session, or None if unknown"""
+    raise NotImplementedError
+
+  def _load(self, session_id: str):
+    raise NotImplementedError
+
+  def _insert(self, session: ChatSession) -> bool:
+    """Create the session row unless it exists; True if this call created it"""
+    raise NotImplementedError
+
+  def _append(self, session: ChatSession, start_seq: int, messages: list) -> bool:
+    """Write messages and summary state if the stored version still equals session.version; False otherwise"""
+    raise NotImplementedError
+
+  def _clear(self, session_id: str):
+    raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+  """SQLite (WAL) store: one row per session, one row per message"""
+  def __init__(self, path: str = "sessions.db", cache_size: int = 1024, memory_budget: int = None):
+    super().__init__(cache_size=cache_size, memory_budget=memory_budget)
+    self.path = path
+    self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.executescript("""
+      CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        timezone TEXT NOT NULL,
+        summary TEXT NOT NULL DEFAULT '',
+        summarized_count INTEGER NOT NULL DEFAULT 0,
+        pending_proposal TEXT,
+        version INTEGER NOT NULL DEFAULT 0
+      );
+      CREATE TABLE IF NOT EXISTS messages (
+        session_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        PRIMARY KEY (session_id, seq)
+      );
+    """)
+    # Databases created before summaries and versions existed
+    columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+    for column, ddl in (
+      ("summary", "TEXT NOT NULL DEFAULT ''"),
+      ("summarized_count", "INTEGER NOT NULL DEFAULT 0"),
+      ("pending_proposal", "TEXT"),
+      ("version", "INTEGER NOT NULL DEFAULT 0")
+    ):
+      if column not in columns:
+        self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {ddl}")
+
+  def list_ids(self) -> list:
+    with self._lock:
+      return [row[0] for row in self._conn.execute("SELECT session_id FROM sessions")]
+
+  def _version(self, session_id: str):
+    row = self._conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+    return row[0] if row else None
+
+  def _load(self, session_id: str):
+    row = self._conn.execute(
+      "SELECT timezone, summary, summarized_count, pending_proposal, version FROM sessions WHERE session_id = ?",
+      (session_id,)
+    ).fetchone()
+    if row is None:
+      return None
+    history = [
+      message_from_dict(json.loads(payload))
+      for (payload,) in self._conn.execute(
+        "SELECT payload FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+      )
+    ]
+    session = ChatSession(session_id=session_id, chat_history=history, timezone=row[0])
+    session.persisted_count = len(history)
+    session.summary, session.summarized_count = row[1], row[2]
+    session.pending_proposal = json.loads(row[3]) if row[3] else None
+    session.version = row[4]
+    return session
+
+  def _insert(self, session: ChatSession) -> bool:
+    return self._conn.execute(
+      "INSERT OR IGNORE INTO sessions (session_id, timezone) VALUES (?, ?)",
+      (session.session_id, session.user_timezone.zone)
+    ).rowcount > 0
+
+  def _append(self, session: ChatSession, start_seq: int, messages: list) -> bool:
+    with self._conn:
+      # IMMEDIATE takes the write lock up front, so other processes queue behind the swap
+      self._conn.execute("BEGIN IMMEDIATE")
+      swapped = self._conn.execute(
+        "UPDATE sessions SET summary = ?, summarized_count = ?, pending_proposal = ?, version = version + 1 "
+        "WHERE session_id = ? AND version = ?",
+        (
+          session.summary,
+          session.summarized_count,
+          json.dumps(session.pending_proposal) if session.pending_proposal else None,
+          session.session_id,
+          session.version
+        )
+      ).rowcount
+      if not swapped:
+        return False
+      self._conn.executemany(
+        "INSERT INTO messages (session_id, seq, payload) VALUES (?, ?, ?)",
+        [(session.session_id, start_seq + i, json.dumps(m)) for i, m in enumerate(messages)]
+      )
+      return True
+
+  def _clear(self, session_id: str):
+    with self._conn:
+      self._conn.execute("BEGIN IMMEDIATE")
+      self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+      self._conn.execute(
+        "UPDATE sessions SET summary = '', summarized_count = 0, pending_proposal = NULL, version = version + 1 WHERE session_id = ?",
+        (session_id,)
+      )
+
+  def import_snapshot(self, path: str):
+    """Load a legacy sessions_backup.json dump, skipping sessions already stored"""
+    if not os.path.exists(path):
+      return 0
+    with open(path) as f:
+      snapshot = json.load(f)
+    imported = 0
+    with self._lock:
+      for session_id, data in snapshot.items():
+        session = ChatSession.from_dict(data)
+        # Another worker may be importing the same snapshot
+        if not self._insert(session):
+          continue
+        self.save(session)
+        imported += 1
+    logging.info(f"Imported {imported} sessions from {path}")
+    return imported
@@ -0,0 +1,363 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import dateutil.parser
+import pytz
+
+
+class TimeParseError(ValueError):
+  pass
+
+
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_WEEKDAY = r"(?:mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:rs(?:day)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)"
+
+_DAY = (
+  r"(?P<named>today|tomorrow|tonight|yesterday)"
+  # A date, optionally after its weekday ("monday, july 7"); the date decides the day
+  rf"|(?:{_WEEKDAY}\.?,?\s+)?(?:"
+  r"(?P<iso>\d{4}-\d{2}-\d{2})"
+  rf"|(?P<dm_day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<dm_month>{_MONTH})\.?(?:,?\s+(?P<dm_year>\d{{4}}))?"
+  rf"|(?P<md_month>{_MONTH})\.?\s+(?P<md_day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<md_year>\d{{4}}))?"
+  r")"
+  rf"|(?:(?P<rel>next|this|coming)\s+)?(?P<weekday>{_WEEKDAY})"
+)
+_CLOCK = r"\d{1,2}(?::\d{2})?\s*(?:am|pm)?|noon|midnight"
+
+POINT_PATTERN = re.compile(
+  r"(?:"
+  r"(?P<isodt>\d{4}-\d{2}-\d{2}[t ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)"
+  rf"|(?:(?:on\s+)?(?P<day>{_DAY}))?"
+  r"(?:,?\s*(?:at\s+|from\s+|@\s*)?(?P<clock>"
+  r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?"
+  r"|(?P<special>noon|midnight)"
+  r"))?"
+  r")"
+)
+# "5pm today", "at 3pm tomorrow", "2pm-4pm on friday", "(between) 2 and 4pm tomorrow":
+# the time (or time range) before the day
+TIME_FIRST_PATTERN = re.compile(
+  rf"^(?:at\s+)?(?P<clock>(?:{_CLOCK})(?:\s*(?:-|–|\bto\b|\buntil\b|\btill\b|\band\b)\s*(?:{_CLOCK}))?)"
+  rf",?\s+(?:on\s+)?(?P<day>{_DAY})$"
+)
+# A day that follows a clock time in free text
+TRAILING_DAY_PATTERN = re.compile(rf",?\s+(?:on\s+)?(?:{_DAY})")
+SEPARATOR_PATTERN = re.compile(r"\s*(?:-|–|\bto\b|\buntil\b|\btill\b|\bthrough\b|\band\b)\s*")
+_PERIOD = (
+  r"(?P<rel>this|next|last|coming)\s+(?P<unit>week|month|year|weekend)"
+  r"|(?:the\s+)?(?:next|coming)\s+(?P<count>\d+)\s+(?P<count_unit>days?|weeks?)"
+  r"|(?P<weekend>(?:this\s+)?weekend)"
+)
+PERIOD_PATTERN = re.compile(rf"^(?:{_PERIOD})$")
+SCAN_PERIOD_PATTERN = re.compile(rf"(?:{_PERIOD})\b")
+WORD_PATTERN = re.compile(r"\b\w+")
+RELATIVE_WORD_PATTERN = re.compile(rf"\b(?:today|tomorrow|tonight|yesterday|next|this|coming|last)\b|^{_WEEKDAY}$")
+NOW_PATTERN = re.compile(r"^(?:now|right now|current time|(?:the\s+)?rest of (?:the\s+)?day|rest of today)$")
+
+
+def normalize(text: str) -> str:
+  text = " ".join(text.lower().strip().split())
+  text = text.rstrip("?.! ")
+  text = re.sub(r"^(?:from|between|on)\s+", "", text)
+  text = text.replace("a.m.", "am").replace("p.m.", "pm")
+  return text
+
+
+def _day_first(text: str) -> str:
+  """Reorder a time-first expression into the day-first form the grammar reads"""
+  match = TIME_FIRST_PATTERN.match(text)
+  if match is None:
+    return text
+  return f"{match.group('day')} {match.group('clock')}"
+
+
+def _month_index(name: str) -> int:
+  return _MONTHS.index(name[:3]) + 1
+
+
+def _resolve_day(match, reference: date):
+  """Day named by the match, or None when the expression carries no day"""
+  if match.group("named"):
+    offset = {"today": 0, "tonight": 0, "tomorrow": 1, "yesterday": -1}[match.group("named")]
+    return reference + timedelta(days=offset)
+  if match.group("weekday"):
+    target = _WEEKDAYS.index(match.group("weekday")[:3])
+    ahead = (target - reference.weekday()) % 7
+    if match.group("rel") == "next" and ahead == 0:
+      ahead = 7
+    return reference + timedelta(days=ahead)
+  if match.group("iso"):
+    return date.fromisoformat(match.group("iso"))
+  if match.group("dm_month") or match.group("md_month"):
+    month = _month_index(match.group("dm_month") or match.group("md_month"))
+    day = int(match.group("dm_day") or match.group("md_day"))
+    year = match.group("dm_year") or match.group("md_year")
+    if year:
+      return date(int(year), month, day)
+    # No year given: prefer the next occurrence
+    resolved = date(reference.year, month, day)
+    return resolved if resolved >= reference else date(reference.year + 1, month, day)
+  return None
+
+
+def _resolve_clock(match, default_pm: bool = False):
+  """(hour, minute, has_period) named by the match, or None"""
+  if match.group("special"):
+    return (12 if match.group("special") == "noon" else 0), 0, True
+  if match.group("hour") is None:
+    return None
+  hour = int(match.group("hour"))
+  minute = int(match.group("minute") or 0)
+  period = match.group("ampm")
+  if hour > 23 or minute > 59 or (period and not 1 <= hour <= 12):
+    raise TimeParseError(f"Invalid clock time: {match.group('clock')}")
+  if period == "pm" and hour < 12:
+    hour += 12
+  elif period == "am" and hour == 12:
+    hour = 0
+  elif not period and default_pm and 1 <= hour < 12:
+    hour += 12
+  return hour, minute, bool(period)
+
+
+def _match_point(text: str, pos: int = 0, full: bool = False):
+  match = (POINT_PATTERN.fullmatch if full else POINT_PATTERN.match)(text, pos)
+  if match is None or match.end() == pos:
+    return None
+  if not (match.group("isodt") or match.group("day") or match.group("clock")):
+    return None
+  return match
+
+
+def _localize(tz, day: date, hour: int = 0, minute: int = 0) -> datetime:
+  return tz.localize(datetime.combine(day, time(hour, minute)))
+
+
+def _point_to_datetime(match, tz, reference: date, default_day: date = None, clock=None):
+  """(start datetime, day-only flag) for a single point"""
+  if match.group("isodt"):
+    dt = datetime.fromisoformat(match.group("isodt").upper().replace("Z", "+00:00"))
+    return (tz.localize(dt) if dt.tzinfo is None else dt.astimezone(tz)), False
+  day = _resolve_day(match, reference)
+  if clock is None:
+    clock = _resolve_clock(match, default_pm=match.group("named") == "tonight")
+  if clock is None:
+    if match.group("named") == "tonight":
+      return _localize(tz, day, 18), False
+    return _localize(tz, day), True
+  hour, minute, _ = clock
+  return _localize(tz, day or default_day or reference, hour, minute), False
+
+
+def _parse_range(text: str, tz, reference: date):
+  first = _match_point(text)
+  if first is None:
+    return None
+  if first.end() == len(text):
+    start, day_only = _point_to_datetime(first, tz, reference)
+    if day_only:
+      return start, _localize(tz, start.date() + timedelta(days=1))
+    if first.group("named") == "tonight" and first.group("clock") is None:
+      return start, _localize(tz, start.date() + timedelta(days=1))
+    return start, start + timedelta(hours=1)
+
+  separator = SEPARATOR_PATTERN.match(text, first.end())
+  if separator is None:
+    return None
+  second = _match_point(text, separator.end(), full=True)
+  if second is None:
+    return None
+
+  # "2-4pm": the start borrows the end's pm when that keeps the range forward
+  start_clock = _resolve_clock(first, default_pm=first.group("named") == "tonight")
+  end_clock = _resolve_clock(second, default_pm=first.group("named") == "tonight")
+  if start_clock and end_clock and not start_clock[2] and second.group("ampm") == "pm":
+    if start_clock[0] < 12 and start_clock[0] + 12 < end_clock[0]:
+      start_clock = (start_clock[0] + 12, start_clock[1], True)
+
+  start, _ = _point_to_datetime(first, tz, reference, clock=start_clock)
+  # "monday to friday": relative end days count from the start day
+  end_reference = start.date() if (second.group("weekday") or second.group("dm_month") or second.group("md_month")) else reference
+  end, end_day_only = _point_to_datetime(second, tz, end_reference, default_day=start.date(), clock=end_clock)
+  if end_day_only:
+    # Day ranges include the whole end day
+    end = _localize(tz, end.date() + timedelta(days=1))
+  if end <= start and not second.group("day") and not second.group("isodt"):
+    if _is_bare_hour(second) and end + timedelta(hours=12) > start:
+      # "9 to 5", "11 to 1": a bare end hour is in the afternoon
+      end += timedelta(hours=12)
+    elif not _is_bare_hour(second):
+      # "10pm to 1am", "22:00 to 01:00" wrap past midnight; a bare "10pm to 1" does not
+      end += timedelta(days=1)
+  if end <= start:
+    raise TimeParseError(f"End time is before start time: {text}")
+  return start, end
+
+
+def _is_bare_hour(match) -> bool:
+  """A 1-12 clock time with no am/pm, as in "9 to 5"; "01:00" or "17:00" read as 24-hour"""
+  hour = match.group("hour")
+  return bool(hour) and not match.group("ampm") and not hour.startswith("0") and 1 <= int(hour) <= 12
+
+
+def _parse_side(text: str, tz, default: datetime) -> datetime:
+  """One end of a range: the grammar's point, else dateutil's fuzzy parse on top of `default`"""
+  point = _match_point(text, full=True)
+  if point is not None:
+    return _point_to_datetime(point, tz, default.date(), default_day=default.date())[0]
+  # Fuzzy parsing drops words it doesn't know, so a relative day would silently become `default`'s
+  if RELATIVE_WORD_PATTERN.search(text):
+    raise TimeParseError(f"Could not parse time: {text}")
+  try:
+    dt = dateutil.parser.parse(text, fuzzy=True, default=default.replace(tzinfo=None))
+  except (ValueError, OverflowError) as e:
+    raise TimeParseError(f"Could not parse time: {text}") from e
+  return tz.localize(dt) if dt.tzinfo is None else dt.astimezone(tz)
+
+
+def _parse_sides(text: str, tz, reference: date):
+  """Ranges outside the grammar: split at a separator and parse each side on its own.
+  The end defaults to the start's day, as in the fuzzy split this parser replaced."""
+  for separator in SEPARATOR_PATTERN.finditer(text):
+    lo, hi = separator.start(), separator.end()
+    # "2025-07-05" is a date, not a range
+    if separator.group().strip() in "-–" and text[lo - 1:lo].isdigit() and text[hi:hi + 1].isdigit():
+      continue
+    try:
+      start = _parse_side(text[:lo], tz, _localize(tz, reference))
+      end = _parse_side(text[hi:], tz, start)
+    except (TimeParseError, ValueError):
+      continue
+    if end > start:
+      return start, end
+  return None
+
+
+def _parse_period(text: str, tz, reference: date):
+  match = PERIOD_PATTERN.match(text)
+  if match is None:
+    return None
+  if match.group("count"):
+    count = int(match.group("count"))
+    days = count * 7 if match.group("count_unit").startswith("week") else count
+    return _localize(tz, reference), _localize(tz, reference + timedelta(days=days))
+  unit = "weekend" if match.group("weekend") else match.group("unit")
+  rel = match.group("rel") or "this"
+  shift = {"this": 0, "coming": 0, "next": 1, "last": -1}[rel]
+  if unit in ("week", "weekend"):
+    monday = reference - timedelta(days=reference.weekday()) + timedelta(weeks=shift)
+    if unit == "week":
+      return _localize(tz, monday), _localize(tz, monday + timedelta(days=7))
+    saturday = monday + timedelta(days=5)
+    return _localize(tz, saturday), _localize(tz, saturday + timedelta(days=2))
+  if unit == "month":
+    month_index = reference.year * 12 + reference.month - 1 + shift
+    first = date(month_index // 12, month_index % 12 + 1, 1)
+    following = date((month_index + 1) // 12, (month_index + 1) % 12 + 1, 1)
+    return _localize(tz, first), _localize(tz, following)
+  year = reference.year + shift
+  return _localize(tz, date(year, 1, 1)), _localize(tz, date(year + 1, 1, 1))
+
+
+def _parse_fallback(text: str, tz, reference: date):
+  try:
+    dt = dateutil.parser.parse(text, default=datetime.combine(reference, time()))
+  except (ValueError, OverflowError) as e:
+    raise TimeParseError(f"Could not parse time: {text}") from e
+  dt = tz.localize(dt) if dt.tzinfo is None else dt.astimezone(tz)
+  return dt, dt + timedelta(hours=1)
+
+
+@lru_cache(maxsize=4096)
+def _parse_cached(text: str, reference: date, tz_name: str):
+  """(start, end) or an error string; cached per (normalized text, reference day, timezone)"""
+  tz = pytz.timezone(tz_name)
+  text = _day_first(text)
+  try:
+    for parser in (_parse_period, _parse_range, _parse_sides, _parse_fallback):
+      result = parser(text, tz, reference)
+      if result is not None:
+        return result
+  except TimeParseError as e:
+    return str(e)
+  except ValueError:
+    # Out-of-range calendar values such as "31 feb"
+    pass
+  return f"Could not parse time: {text}"
+
+
+def parse_time_expression(time_str: str, tz, reference: datetime = None) -> dict:
+  """Parse natural language time expressions into {"start", "end"} or {"error"}"""
+  if reference is None:
+    reference = datetime.now(tz)
+  text = normalize(time_str)
+  if NOW_PATTERN.match(text):
+    if text.startswith("now") or text.endswith("now") or text == "current time":
+      return {"start": reference, "end": reference + timedelta(hours=1)}
+    return {"start": reference, "end": _localize(tz, reference.date() + timedelta(days=1))}
+  result = _parse_cached(text, reference.astimezone(tz).date(), tz.zone)
+  if isinstance(result, str):
+    return {"error": result}
+  return {"start": result[0], "end": result[1]}
+
+
+def _is_anchored(match) -> bool:
+  """A point specific enough to be a time on its own (not a bare number)"""
+  return bool(match.group("isodt") or match.group("day") or match.group("ampm") or match.group("special"))
+
+
+def _expression_end(text: str, pos: int):
+  """End of the date/time expression starting at pos, or None"""
+  period = SCAN_PERIOD_PATTERN.match(text, pos)
+  if period:
+    return period.end()
+  first = _match_point(text, pos)
+  if first is None:
+    return None
+  end = first.end() if _is_anchored(first) else None
+  separator = SEPARATOR_PATTERN.match(text, first.end())
+  if separator:
+    second = _match_point(text, separator.end())
+    # "monday and tuesday" names two days, not a range; "2 and 4pm" is a range
+    if second is not None and not text[second.end():second.end() + 1].isalnum():
+      joined_days = separator.group().strip() == "and" and second.group("day")
+      if not joined_days and (_is_anchored(second) or (end is not None and second.group("clock"))):
+        end = second.end()
+  if end is not None and not first.group("day") and not first.group("isodt"):
+    trailing = TRAILING_DAY_PATTERN.match(text, end)
+    if trailing and not text[trailing.end():trailing.end() + 1].isalnum():
+      end = trailing.end()
+  if end is None or text[end:end + 1].isalnum():
+    return None
+  return end
+
+
+def find_time_expressions(text: str, tz, reference: datetime = None, limit: int = 3) -> list:
+  """(expression, start, end) for up to `limit` date/time expressions in free text, left to right"""
+  if reference is None:
+    reference = datetime.now(tz)
+  text = normalize(text)
+  found = []
+  pos = 0
+  while len(found) < limit:
+    word = WORD_PATTERN.search(text, pos)
+    if word is None:
+      break
+    end = _expression_end(text, word.start())
+    if end is None:
+      pos = word.end()
+      continue
+    expression = text[word.start():end].strip(" ,")
+    result = _parse_cached(normalize(expression), reference.astimezone(tz).date(), tz.zone)
+    if not isinstance(result, str):
+      found.append((expression, result[0], result[1]))
+    pos = end
+  return found
+
+
+def cache_info():
+  return _parse_cached.cache_info()
@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from .metrics import QUEUED_TURNS
+
+
+class SessionTurnQueue:
+  """Runs each session's turns one at a time, in arrival order, while different
+  sessions proceed in parallel. asyncio.Lock wakes waiters first-in first-out,
+  and a session's lock is dropped once nothing holds or awaits it.
+  """
+  def __init__(self):
+    self._entries = {}
+
+  @asynccontextmanager
+  async def turn(self, session_id: str):
+    entry = self._entries.get(session_id)
+    if entry is None:
+      entry = self._entries[session_id] = {"lock": asyncio.Lock(), "users": 0}
+    if entry["lock"].locked():
+      QUEUED_TURNS.inc()
+    entry["users"] += 1
+    try:
+      async with entry["lock"]:
+        yield
+    finally:
+      entry["users"] -= 1
+      if not entry["users"]:
+        del self._entries[session_id]
+
+  def __len__(self):
+    return len(self._entries)
@@ -2,14 +2,20 @@ import os
 import sys
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import logging
 import json
-import atexit
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from .agent.assistant import CalendarAssistant
-from .agent.schemas import ChatRequest, ChatResponse
+from .agent.metrics import REGISTRY
+from .agent.session import ChatSession
+from .agent.session_store import SessionConflictError, SQLiteSessionStore
+from .agent.turn_queue import SessionTurnQueue
+from .agent.schemas import BulkBookingRequest, ChatRequest, ChatResponse, FreeSlotsRequest, TeamAvailabilityRequest
 
 
 # Load environment variables from .env if exists
@@ -20,13 +26,36 @@ if os.path.exists(env_path):
 else:
     logging.info("No .env file found, using system environment variables")
 
-# Session storage (in production, use a database)
-sessions_db = {}
+# Session storage: SQLite (WAL) with an in-memory LRU of hot sessions
+session_store = SQLiteSessionStore(
+  path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+  cache_size=int(os.getenv("SESSION_CACHE_SIZE", "1024")),
+  memory_budget=int(float(os.getenv("SESSION_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+)
+# One-time migration of the legacy atexit JSON dump
+session_store.import_snapshot("sessions_backup.json")
+# Double-submitted or retried requests for one session run one after another
+turn_queue = SessionTurnQueue()
+
+def _warmup_done(task: asyncio.Task):
+  if not task.cancelled() and task.exception() is not None:
+    logging.error(f"Assistant warmup failed: {str(task.exception())}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Optionally build the runtime in the background so the first request doesn't pay for it;
+  # requests that arrive meanwhile wait on the same build without blocking the event loop
+  warmup = None
+  if os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true":
+    warmup = asyncio.create_task(get_assistant())
+    warmup.add_done_callback(_warmup_done)
+  yield
 
 app = FastAPI(
   title="Calendar Assistant API",
   description="Backend for conversational calendar booking assistant",
-  version="1.0.0"
+  version="1.0.0",
+  lifespan=lifespan
 )
 
 # CORS configuration
@@ -38,58 +67,290 @@ app.add_middleware(
   allow_headers=["*"],
 )
 
-def get_or_create_session(session_id: str):
+_assistant = None
+_assistant_lock = asyncio.Lock()
+
+def build_assistant():
+  """Build the shared assistant runtime (blocking: imports and constructs the whole stack)"""
+  global _assistant
+  if _assistant is None:
+    # Imported here so the heavy LangChain/Gemini/googleapiclient stack loads on first use
+    from .agent.assistant import CalendarAssistant
+    logging.info("Initializing shared assistant runtime")
+    _assistant = CalendarAssistant()
+  return _assistant
+
+async def get_assistant():
+  """The shared assistant runtime, built once per worker on a thread so the event loop keeps serving"""
+  if _assistant is None:
+    async with _assistant_lock:
+      if _assistant is None:
+        await asyncio.get_running_loop().run_in_executor(None, build_assistant)
+  return _assistant
+
+async def get_or_create_session(session_id: str) -> ChatSession:
   """Get or create session with error handling"""
   try:
-    if session_id not in sessions_db:
-      assistant = CalendarAssistant(session_id=session_id)
-      sessions_db[session_id] = assistant.to_dict()
-      logging.info(f"Created new session: {session_id}")
-    else:
-      assistant = CalendarAssistant.from_dict(sessions_db[session_id])
-    return assistant
+    return await session_store.aget_or_create(session_id)
   except Exception as e:
     logging.error(f"Session creation failed: {str(e)}")
     raise HTTPException(status_code=500, detail="Session initialization error")
 
+SESSION_CONFLICT_DETAIL = "Session was updated concurrently, please retry"
+
+def _internal_error_detail(e: Exception) -> str:
+  return "Internal server error" if os.getenv("IS_PRODUCTION") == "true" else str(e)
+
+def _sse(event: str, data) -> str:
+  return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
   try:
-    assistant = get_or_create_session(request.session_id)
-    
-    logging.info(f"Assistant Session Id >> {assistant.session_id}")
-    response = assistant.chat(request.message)
-    
-    sessions_db[request.session_id] = assistant.to_dict()
+    assistant = await get_assistant()
+    async with turn_queue.turn(request.session_id):
+      session = await get_or_create_session(request.session_id)
+      
+      logging.info(f"Assistant Session Id >> {session.session_id}")
+      response = await assistant.achat(session, request.message)
+      
+      await session_store.asave(session)
     return {"response": response, "session_id": request.session_id}
+  except SessionConflictError as e:
+    logging.warning(str(e))
+    raise HTTPException(status_code=409, detail=SESSION_CONFLICT_DETAIL)
   except Exception as e:
     logging.error(f"Chat error: {str(e)}")
-    raise HTTPException(
-      status_code=500,
-      detail="Internal server error" if os.getenv("IS_PRODUCTION") == "true" else str(e)
+    raise HTTPException(status_code=500, detail=_internal_error_detail(e))
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+  """Server-sent events: token (tool_calling mode), tool_start and tool_end as they happen, then
+  final, or error ({status, detail}, as /chat would have answered) if the turn fails"""
+  assistant = await get_assistant()
+  
+  async def event_stream():
+    # The response has started, so failures are reported in-stream rather than as a status code
+    try:
+      async with turn_queue.turn(request.session_id):
+        session = await get_or_create_session(request.session_id)
+        async for event in assistant.astream_chat(session, request.message):
+          if event["event"] == "final":
+            await session_store.asave(session)
+          yield _sse(event["event"], event["data"])
+    except SessionConflictError as e:
+      logging.warning(str(e))
+      yield _sse("error", {"status": 409, "detail": SESSION_CONFLICT_DETAIL})
+    except HTTPException as e:
+      yield _sse("error", {"status": e.status_code, "detail": e.detail})
+    except Exception as e:
+      logging.error(f"Chat stream error: {str(e)}")
+      yield _sse("error", {"status": 500, "detail": _internal_error_detail(e)})
+  
+  return StreamingResponse(
+    event_stream(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+  )
+
+
+def _parse_iso(assistant, value: str, name: str) -> datetime:
+  """Aware datetime from a request field (naive values are in the user's timezone); 400 if malformed"""
+  try:
+    return assistant.localize(datetime.fromisoformat(value))
+  except ValueError:
+    raise HTTPException(status_code=400, detail=f"{name} is not an ISO 8601 datetime: {value!r}")
+
+
+@app.post("/free-slots")
+async def free_slots(request: FreeSlotsRequest):
+  """Earliest free slots of the given duration within working hours (one freebusy query)"""
+  assistant = await get_assistant()
+  # Defaults to the next 14 days from the next quarter hour, like the FindFreeSlots tool
+  window_start, window_end = assistant._slot_window()
+  if request.start_iso:
+    window_start = _parse_iso(assistant, request.start_iso, "start_iso")
+    window_end = window_start + timedelta(days=14)
+  if request.end_iso:
+    window_end = _parse_iso(assistant, request.end_iso, "end_iso")
+  if window_end <= window_start:
+    raise HTTPException(status_code=400, detail="end_iso must be after start_iso")
+  try:
+    slots = await asyncio.get_running_loop().run_in_executor(
+      assistant.tool_executor,
+      assistant.find_free_slots, window_start, window_end, request.duration_minutes, request.count
     )
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  except Exception as e:
+    logging.error(f"Free slot search failed: {str(e)}")
+    raise HTTPException(status_code=500, detail=str(e))
+  return {"slots": [{"start": start.isoformat(), "end": end.isoformat()} for start, end in slots]}
+
+
+@app.post("/team-availability")
+async def team_availability(request: TeamAvailabilityRequest):
+  """Combined free/busy for many calendars in one batched freebusy round-trip"""
+  assistant = await get_assistant()
+  start = _parse_iso(assistant, request.start_iso, "start_iso")
+  end = _parse_iso(assistant, request.end_iso, "end_iso")
+  if end <= start:
+    raise HTTPException(status_code=400, detail="end_iso must be after start_iso")
+  try:
+    result = await asyncio.get_running_loop().run_in_executor(
+      assistant.tool_executor,
+      assistant.team_availability,
+      request.calendar_ids,
+      start,
+      end,
+      request.duration_minutes,
+      request.count
+    )
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  except Exception as e:
+    logging.error(f"Team availability failed: {str(e)}")
+    raise HTTPException(status_code=500, detail=str(e))
+  result["slots"] = [{"start": start.isoformat(), "end": end.isoformat()} for start, end in result["slots"]]
+  return result
+
+
+@app.post("/bookings/bulk")
+async def bulk_bookings(request: BulkBookingRequest):
+  """Book many events: conflicts checked against one freebusy snapshot, inserts batched, one outcome per event"""
+  assistant = await get_assistant()
+  events = []
+  for item in request.events:
+    try:
+      events.append(assistant.bulk_event(item.summary, datetime.fromisoformat(item.start_iso), datetime.fromisoformat(item.end_iso)))
+    except ValueError as e:
+      events.append({"summary": item.summary, "error": str(e)})
+  try:
+    return await asyncio.get_running_loop().run_in_executor(
+      assistant.tool_executor,
+      assistant.bulk_book, events, request.dry_run, request.idempotency_key
+    )
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  except Exception as e:
+    logging.error(f"Bulk booking failed: {str(e)}")
+    raise HTTPException(status_code=500, detail=str(e))
+
+
+def _events_range(assistant, time_range: str, start_iso: str, end_iso: str):
+  """(start, end) from a natural-language time_range or ISO bounds"""
+  if time_range:
+    parsed = assistant.parse_time(time_range)
+    if "error" in parsed:
+      raise HTTPException(status_code=400, detail=parsed["error"])
+    return parsed["start"], parsed["end"]
+  if not (start_iso and end_iso):
+    raise HTTPException(status_code=400, detail="Pass time_range or both start_iso and end_iso")
+  start, end = _parse_iso(assistant, start_iso, "start_iso"), _parse_iso(assistant, end_iso, "end_iso")
+  if end <= start:
+    raise HTTPException(status_code=400, detail="end_iso must be after start_iso")
+  return start, end
+
+
+@app.get("/events")
+async def list_all_events(time_range: str = None, start_iso: str = None, end_iso: str = None):
+  """Every event in a range as NDJSON, streamed page by page (constant memory for any range)"""
+  assistant = await get_assistant()
+  start, end = _events_range(assistant, time_range, start_iso, end_iso)
+  
+  def line(event: dict) -> str:
+    return json.dumps(assistant.event_summary(event)) + "\n"
+  
+  def error_line(e: Exception) -> str:
+    logging.error(f"Event stream failed: {str(e)}")
+    return json.dumps({"error": str(e)}) + "\n"
+  
+  events = assistant.aiter_events(start, end)
+  if events is not None:
+    async def stream():
+      try:
+        async for event in events:
+          yield line(event)
+      except Exception as e:
+        yield error_line(e)
+  else:
+    # Starlette iterates sync generators on its thread pool, so paging never blocks the event loop
+    def stream():
+      try:
+        for event in assistant.iter_events(start, end):
+          yield line(event)
+      except Exception as e:
+        yield error_line(e)
+  return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/events.ics")
+async def export_events(time_range: str = None, start_iso: str = None, end_iso: str = None):
+  """Every event in a range as an iCalendar file, streamed page by page"""
+  assistant = await get_assistant()
+  # ics pulls in calendar_mirror and googleapiclient; load them on first use, like the assistant
+  from .agent.ics import ICS_FOOTER, ICS_HEADER, ics_event
+  start, end = _events_range(assistant, time_range, start_iso, end_iso)
+  headers = {"Content-Disposition": 'attachment; filename="events.ics"'}
+  
+  events = assistant.aiter_events(start, end)
+  if events is not None:
+    async def stream():
+      yield ICS_HEADER
+      try:
+        async for event in events:
+          yield ics_event(event)
+      except Exception as e:
+        # Headers are already sent: abort the response rather than end a silently truncated calendar
+        logging.error(f"ICS export failed: {str(e)}")
+        raise
+      yield ICS_FOOTER
+  else:
+    def stream():
+      yield ICS_HEADER
+      try:
+        for event in assistant.iter_events(start, end):
+          yield ics_event(event)
+      except Exception as e:
+        logging.error(f"ICS export failed: {str(e)}")
+        raise
+      yield ICS_FOOTER
+  return StreamingResponse(stream(), media_type="text/calendar", headers=headers)
 
 
 @app.post("/reset/{session_id}")
 async def reset_session(session_id: str):
   """Reset conversation history"""
-  if session_id in sessions_db:
-    assistant = CalendarAssistant.from_dict(sessions_db[session_id])
-    assistant.clear_history()
-    sessions_db[session_id] = assistant.to_dict()
+  async with turn_queue.turn(session_id):
+    cleared = await session_store.aclear(session_id)
+  if cleared:
     return {"status": "History cleared"}
   return {"status": "Session not found"}
 
+@app.get("/fast-path")
+async def fast_path_stats():
+  """Fast-path router hit rate and latency (for debugging)"""
+  router = (await get_assistant()).router
+  return router.stats() if router else {"enabled": False}
+
+@app.get("/cache")
+async def cache_stats():
+  """Response and tool cache hit/miss counters (for debugging)"""
+  cache = (await get_assistant()).cache
+  return cache.stats() if cache else {"enabled": False}
+
+@app.get("/metrics")
+async def metrics():
+  """Per-stage latency histograms in Prometheus text format"""
+  return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/sessions")
 async def list_sessions():
   """List active sessions (for debugging)"""
+  sessions = await session_store.alist_ids()
   return {
-    "count": len(sessions_db),
-    "sessions": list(sessions_db.keys())
+    "count": len(sessions),
+    "cache": session_store.resident_stats(),
+    "sessions": sessions
   }
-    
-@atexit.register
-def save_sessions():
-  with open("sessions_backup.json", "w") as f:
-    json.dump(sessions_db, f)
-  logging.info("Sessions saved to backup file")
\ No newline at end of file
@@ -11,9 +11,39 @@ if IS_PRODUCTION:
 else:
     BACKEND_HOST = "http://192.168.1.7:8000"
 
-API_URL = f"{BACKEND_HOST}/chat"
+STREAM_URL = f"{BACKEND_HOST}/chat/stream"
 RESET_URL = f"{BACKEND_HOST}/reset/"
 
+
+def stream_reply(payload, token_placeholder, status):
+    """Read the SSE stream, rendering tokens and tool progress as they arrive.
+    Returns (reply, error): the final reply, or the error the server reported."""
+    reply = None
+    tokens = ""
+    event = None
+    with requests.post(STREAM_URL, json=payload, stream=True) as response:
+        if response.status_code != 200:
+            return None, f"Received status code {response.status_code}"
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "token":
+                    tokens += data
+                    token_placeholder.markdown(tokens)
+                elif event == "tool_start":
+                    status.update(label=f"Running {data['tool']}...")
+                    status.write(f"🔧 {data['tool']}")
+                elif event == "tool_end":
+                    status.write(f"✔️ {data['tool']} done")
+                elif event == "final":
+                    reply = data
+                elif event == "error":
+                    return None, data["detail"]
+    return reply, None
+
+
 # Initialize session
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -106,34 +136,41 @@ if prompt := st.chat_input("Ask about availability or book a meeting..."):
     with st.chat_message("user"):
         st.write(prompt)
     
-    # Get assistant response
-    with st.spinner("Thinking..."):
+    # Stream assistant response
+    with st.chat_message("assistant"):
+        status = st.status("Thinking...", expanded=False)
+        token_placeholder = st.empty()
         try:
             payload = {
                 "session_id": st.session_state.session_id,
                 "message": prompt
             }
-            response = requests.post(API_URL, json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                reply = data["response"]
-                
-                # Check if this is a booking confirmation request
-                if isinstance(reply, dict) and reply.get("confirmation_required"):
-                    # Store pending booking details
-                    st.session_state.pending_booking = {
-                        "proposed_summary": reply["proposed_summary"],
-                        "proposed_start": reply["proposed_start"],
-                        "proposed_end": reply["proposed_end"]
-                    }
+            reply, error = stream_reply(payload, token_placeholder, status)
+            if error is not None:
+                status.update(label="Error", state="error")
+                reply = f"⚠️ Error: {error}"
+            elif reply is None:
+                # The stream ended without a final event (e.g. the server failed mid-turn)
+                status.update(label="Incomplete reply", state="error")
+                reply = "⚠️ The assistant's reply was interrupted. Please try again."
             else:
-                reply = f"⚠️ Error: Received status code {response.status_code}"
-        except requests.exceptions.RequestException as e:
+                status.update(label="Done", state="complete")
+            
+            # Check if this is a booking confirmation request
+            if isinstance(reply, dict) and reply.get("confirmation_required"):
+                # Store pending booking details
+                st.session_state.pending_booking = {
+                    "proposed_summary": reply["proposed_summary"],
+                    "proposed_start": reply["proposed_start"],
+                    "proposed_end": reply["proposed_end"]
+                }
+        except requests.exceptions.RequestException:
+            status.update(label="Connection error", state="error")
             reply = "⚠️ Sorry, I'm having trouble connecting to the assistant."
-    
-    # Display assistant response
-    with st.chat_message("assistant"):
+        
+        # Replace the raw token stream with the final answer
+        token_placeholder.empty()
+        
         # For confirmation requests, we'll store the structured data
         if isinstance(reply, dict) and reply.get("confirmation_required"):
             # Add timestamp for unique keys
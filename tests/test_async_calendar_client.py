@@ -0,0 +1,135 @@
+"""AsyncGoogleCalendar against the stand-in Calendar server (benchmarks/fake_calendar_server.py)"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.fake_calendar_server import serve_in_thread
+from benchmarks.fakes import FakeCalendarBackend, FakeCalendarHttp
+from src.backend.agent.async_calendar_client import AsyncGoogleCalendar, aiter_events
+from src.backend.agent.calendar_client import BookingDeletedError, GoogleCalendar
+from src.backend.agent.calendar_mirror import AsyncCalendarMirror, CalendarMirror
+
+DAY = datetime(2030, 1, 7, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def backend():
+  backend = FakeCalendarBackend(["primary"])
+  # Meetings at 10:00, 12:00 and 14:00 UTC on each of three days from DAY
+  backend.seed("primary", days=3, start=DAY)
+  return backend
+
+
+@pytest.fixture
+def base_url(backend):
+  with serve_in_thread(backend) as url:
+    yield url
+
+
+def run(coroutine_function, base_url):
+  async def main():
+    calendar = AsyncGoogleCalendar(calendar_id="primary", base_url=base_url)
+    try:
+      return await coroutine_function(calendar)
+    finally:
+      await calendar.client.aclose()
+  return asyncio.run(main())
+
+
+def test_freebusy_returns_seeded_meetings(base_url):
+  busy = run(lambda calendar: calendar.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z"), base_url)
+  assert busy == [
+    {"start": "2030-01-07T10:00:00Z", "end": "2030-01-07T11:00:00Z"},
+    {"start": "2030-01-07T12:00:00Z", "end": "2030-01-07T13:00:00Z"},
+    {"start": "2030-01-07T14:00:00Z", "end": "2030-01-07T15:00:00Z"},
+  ]
+
+
+def test_freebusy_many_keeps_range_order(base_url):
+  ranges = [("2030-01-08T09:00:00Z", "2030-01-08T11:30:00Z"), ("2030-01-07T11:00:00Z", "2030-01-07T12:00:00Z")]
+  busy = run(lambda calendar: calendar.get_freebusy_many(ranges), base_url)
+  assert busy == [[{"start": "2030-01-08T10:00:00Z", "end": "2030-01-08T11:00:00Z"}], []]
+
+
+def test_list_events_in_start_order_up_to_max_results(base_url):
+  events = run(lambda calendar: calendar.list_events("2030-01-07T00:00:00Z", "2030-01-09T00:00:00Z", max_results=4), base_url)
+  assert [event["summary"] for event in events] == [
+    "Seeded meeting 0.0", "Seeded meeting 0.1", "Seeded meeting 0.2", "Seeded meeting 1.0"
+  ]
+
+
+def test_aiter_events_reads_every_page(base_url):
+  async def collect(calendar):
+    return [event async for event in aiter_events(calendar, "2030-01-07T00:00:00Z", "2030-01-10T00:00:00Z", page_size=2)]
+  events = run(collect, base_url)
+  assert len(events) == 9
+  assert [event["start"]["dateTime"] for event in events] == sorted(event["start"]["dateTime"] for event in events)
+
+
+def test_insert_with_event_id_is_idempotent(backend, base_url):
+  async def book_twice(calendar):
+    first = await calendar.create_booking("Sync", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "abc123")
+    # Same ID again: Calendar answers 409 and the client returns the existing event
+    second = await calendar.create_booking("Sync", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "abc123")
+    return first, second
+  first, second = run(book_twice, base_url)
+  assert first["id"] == second["id"] == "abc123"
+  assert second["status"] == "confirmed"
+  assert sum(1 for event in backend.calendars["primary"].values() if event["summary"] == "Sync") == 1
+  assert backend.requests["insert"] == 2 and backend.requests["get"] == 1
+
+
+def test_replay_of_deleted_event_is_an_error(backend, base_url):
+  async def book(calendar):
+    return await calendar.create_booking("Sync", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "abc123")
+  run(book, base_url)
+  backend.delete("primary", "abc123")
+  with pytest.raises(BookingDeletedError):
+    run(book, base_url)
+
+
+def test_create_bookings_reports_each_outcome(backend, base_url):
+  backend.insert("primary", {"id": "taken", "summary": "Earlier", "start": {"dateTime": "2030-01-08T16:00:00Z"}, "end": {"dateTime": "2030-01-08T17:00:00Z"}})
+  backend.delete("primary", "taken")
+  outcomes = run(lambda calendar: calendar.create_bookings([
+    ("A", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "a1"),
+    ("B", "2030-01-08T16:00:00Z", "2030-01-08T17:00:00Z", "taken"),
+    ("C", "2030-01-09T16:00:00Z", "2030-01-09T17:00:00Z", None),
+  ]), base_url)
+  (a, a_error), (b, b_error), (c, c_error) = outcomes
+  assert a["id"] == "a1" and a_error is None
+  assert b is None and isinstance(b_error, BookingDeletedError)
+  assert c["summary"] == "C" and c_error is None
+
+
+def test_async_reads_go_through_the_mirror(backend, base_url):
+  mirror = CalendarMirror(GoogleCalendar("primary", http=FakeCalendarHttp(backend)), max_staleness=60)
+  day = ("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+
+  async def reads(acalendar):
+    with ThreadPoolExecutor(2) as executor:
+      calendar = AsyncCalendarMirror(mirror, acalendar, executor)
+      first = await calendar.get_freebusy(*day)
+      synced = dict(backend.requests)
+      # Fresh and in the window: answered from the local copy, no request
+      second = await calendar.get_freebusy_many([day, day])
+      events = await calendar.list_events(*day, max_results=2)
+      local = dict(backend.requests)
+      # Before the mirrored window: straight to Google over the async client
+      await calendar.get_freebusy("2000-01-01T00:00:00Z", "2000-01-02T00:00:00Z")
+      remote = dict(backend.requests)
+      # Writes go out over the async client and the mirror picks them up
+      await calendar.create_booking("Sync", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "abc123")
+      after_booking = await calendar.get_freebusy(*day)
+      return first, synced, second, events, local, remote, after_booking
+
+  first, synced, second, events, local, remote, after_booking = run(reads, base_url)
+  assert synced.get("freebusy", 0) == 0
+  assert second == [first, first] and len(first) == 3
+  assert [event["summary"] for event in events] == ["Seeded meeting 0.0", "Seeded meeting 0.1"]
+  assert local == synced
+  assert remote["freebusy"] == 1
+  assert {"start": "2030-01-07T16:00:00Z", "end": "2030-01-07T17:00:00Z"} in after_booking
+  assert backend.requests["freebusy"] == 1
@@ -0,0 +1,83 @@
+"""Booking confirmation idempotency, against the in-memory Calendar fakes"""
+import pytest
+
+from benchmarks.fakes import FakeCalendarBackend, ScriptedChatModel, offline_assistant
+from src.backend.agent.assistant import _current_session
+from src.backend.agent.session import ChatSession
+
+
+@pytest.fixture
+def backend():
+  return FakeCalendarBackend(["primary"])
+
+
+@pytest.fixture
+def assistant(backend, monkeypatch):
+  monkeypatch.setenv("RESPONSE_CACHE", "false")
+  return offline_assistant(backend, ScriptedChatModel())
+
+
+def booked(backend, status="confirmed"):
+  return [event for event in backend.calendars["primary"].values() if event["summary"] == "Team Sync" and event["status"] == status]
+
+
+def test_repeated_confirmation_books_once(assistant, backend):
+  session = ChatSession()
+  assistant.chat(session, "book team sync tomorrow 4pm")
+  proposal = session.pending_proposal
+  assistant.chat(session, "yes")
+  # A retried confirmation of the same proposal, e.g. replayed by the model
+  token = _current_session.set(session)
+  try:
+    result = assistant.confirm_booking_tool(True, proposal["summary"], proposal["start"], proposal["end"], proposal["idempotency_key"])
+  finally:
+    _current_session.reset(token)
+  assert result["success"]
+  assert len(booked(backend)) == 1
+
+
+def test_confirmation_without_key_uses_the_pending_proposal(assistant, backend):
+  session = ChatSession()
+  assistant.chat(session, "book team sync tomorrow 4pm")
+  proposal = session.pending_proposal
+  token = _current_session.set(session)
+  try:
+    for _ in range(2):
+      assert assistant.confirm_booking_tool(True, proposal["summary"], proposal["start"], proposal["end"])["success"]
+  finally:
+    _current_session.reset(token)
+  assert [event["id"] for event in booked(backend)] == [proposal["idempotency_key"]]
+
+
+def test_rebooking_a_deleted_slot_creates_a_new_event(assistant, backend):
+  session = ChatSession()
+  assistant.chat(session, "book team sync tomorrow 4pm")
+  assistant.chat(session, "yes")
+  [first] = booked(backend)
+  backend.delete("primary", first["id"])
+
+  assistant.chat(session, "book team sync tomorrow 4pm")
+  assistant.chat(session, "yes")
+  [second] = booked(backend)
+  assert second["id"] != first["id"]
+  assert second["start"] == first["start"] and second["end"] == first["end"]
+  assert session.pending_proposal is None
+
+
+def test_bulk_plan_key_dedupes_and_a_new_request_books_anew(assistant, backend):
+  from datetime import datetime, timezone
+  events = [assistant.bulk_event("Team Sync", datetime(2030, 1, 7, 16, tzinfo=timezone.utc), datetime(2030, 1, 7, 17, tzinfo=timezone.utc))]
+  plan = assistant.bulk_book(events, dry_run=True)
+  assert plan["counts"] == {"available": 1}
+  first = assistant.bulk_book(events, idempotency_key=plan["idempotency_key"])
+  assert first["idempotency_key"] == plan["idempotency_key"]
+  # A retry under the plan's key maps to the same event IDs and books nothing new
+  assistant.bulk_book(events, idempotency_key=plan["idempotency_key"])
+  assert [event["id"] for event in booked(backend)] == [first["results"][0]["event_id"]]
+
+  backend.delete("primary", first["results"][0]["event_id"])
+  # Made outside the service, so the mirror only sees the delete on its next sync
+  assistant.calendar.invalidate()
+  again = assistant.bulk_book(events)
+  assert again["counts"] == {"booked": 1}
+  assert again["results"][0]["event_id"] != first["results"][0]["event_id"]
@@ -0,0 +1,199 @@
+"""CalendarScheduler: single-flight reads, token bucket pacing and rate-limit backoff, against a fake calendar"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.backend.agent import calendar_scheduler
+from src.backend.agent.calendar_scheduler import AsyncCalendarScheduler, CalendarScheduler, TokenBucket
+from src.backend.agent.metrics import CALENDAR_COALESCED, CALENDAR_RATE_LIMITED
+
+BUSY = [{"start": "2030-01-07T10:00:00Z", "end": "2030-01-07T11:00:00Z"}]
+
+
+def http_error(status: int, reason: str = None) -> HttpError:
+  content = {"error": {"code": status, "errors": [{"reason": reason}] if reason else []}}
+  return HttpError(httplib2.Response({"status": status}), json.dumps(content).encode())
+
+
+def count(counter, *labels) -> float:
+  return counter._values.get(labels, 0)
+
+
+class FakeCalendar:
+  """Counts upstream calls; reads can be held open until released, and errors queued up front"""
+  def __init__(self):
+    # Buckets are per calendar and process-wide, so each test gets its own
+    self.calendar_id = f"test-{uuid.uuid4().hex}"
+    self.calls = []
+    self.errors = []
+    self.release = threading.Event()
+    self.release.set()
+
+  def _call(self, name, *args):
+    self.calls.append((name,) + args)
+    if self.errors:
+      raise self.errors.pop(0)
+
+  def get_freebusy(self, start_iso, end_iso):
+    self._call("freebusy", start_iso, end_iso)
+    self.release.wait(5)
+    return BUSY
+
+  def create_booking(self, summary, start_iso, end_iso, event_id=None):
+    self._call("insert", summary, start_iso, end_iso, event_id)
+    self.release.wait(5)
+    return {"id": event_id or uuid.uuid4().hex, "summary": summary}
+
+
+class AsyncFakeCalendar(FakeCalendar):
+  def __init__(self):
+    super().__init__()
+    self.async_release = asyncio.Event()
+
+  async def get_freebusy(self, start_iso, end_iso):
+    self._call("freebusy", start_iso, end_iso)
+    await self.async_release.wait()
+    return BUSY
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+  """Record backoff and throttle sleeps instead of sleeping"""
+  slept = []
+  monkeypatch.setattr(time, "sleep", slept.append)
+  return slept
+
+
+def wait_until(predicate, timeout: float = 5):
+  deadline = time.monotonic() + timeout
+  while not predicate():
+    assert time.monotonic() < deadline, "timed out"
+    threading.Event().wait(0.005)
+
+
+def test_identical_concurrent_reads_share_one_call():
+  calendar = FakeCalendar()
+  calendar.release.clear()
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100)
+  coalesced = count(CALENDAR_COALESCED, "freebusy")
+  results = []
+  threads = [
+    threading.Thread(target=lambda: results.append(scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")))
+    for _ in range(8)
+  ]
+  for thread in threads:
+    thread.start()
+  # Hold the leader's call open until every other caller has joined it
+  wait_until(lambda: count(CALENDAR_COALESCED, "freebusy") == coalesced + 7)
+  calendar.release.set()
+  for thread in threads:
+    thread.join()
+
+  assert len(calendar.calls) == 1
+  assert results == [BUSY] * 8
+  # Once it finished, the next read is a new call
+  scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+  assert len(calendar.calls) == 2
+
+
+def test_different_reads_are_not_coalesced():
+  calendar = FakeCalendar()
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100)
+  scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+  scheduler.get_freebusy("2030-01-08T00:00:00Z", "2030-01-09T00:00:00Z")
+  assert len(calendar.calls) == 2
+
+
+def test_writes_are_never_coalesced():
+  calendar = FakeCalendar()
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100)
+  # Every insert must be in flight at once to get past the barrier
+  barrier = threading.Barrier(4, timeout=5)
+  create_booking = calendar.create_booking
+
+  def insert(*args):
+    event = create_booking(*args)
+    barrier.wait()
+    return event
+
+  calendar.create_booking = insert
+  threads = [
+    threading.Thread(target=scheduler.create_booking, args=("Sync", "2030-01-07T16:00:00Z", "2030-01-07T17:00:00Z", "abc"))
+    for _ in range(4)
+  ]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert [call[0] for call in calendar.calls] == ["insert"] * 4
+
+
+def test_rate_limited_reads_back_off_and_retry(sleeps):
+  calendar = FakeCalendar()
+  calendar.errors = [http_error(429), http_error(403, "userRateLimitExceeded")]
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100, backoff=0.5, max_backoff=30)
+  limited = count(CALENDAR_RATE_LIMITED, "freebusy")
+
+  assert scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z") == BUSY
+  assert len(calendar.calls) == 3
+  assert count(CALENDAR_RATE_LIMITED, "freebusy") == limited + 2
+  assert len(sleeps) == 2 and all(0 <= delay <= 30 for delay in sleeps)
+
+
+def test_rate_limit_gives_up_after_max_attempts(sleeps):
+  calendar = FakeCalendar()
+  calendar.errors = [http_error(429)] * 3
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100, max_attempts=3)
+  with pytest.raises(HttpError):
+    scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+  assert len(calendar.calls) == 3
+
+
+def test_permission_errors_are_not_retried(sleeps):
+  calendar = FakeCalendar()
+  calendar.errors = [http_error(403, "forbidden")]
+  scheduler = CalendarScheduler(calendar, rate=100, burst=100)
+  with pytest.raises(HttpError):
+    scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+  assert len(calendar.calls) == 1 and sleeps == []
+
+
+def test_token_bucket_paces_calls_beyond_the_burst(monkeypatch):
+  now = [1000.0]
+  monkeypatch.setattr(calendar_scheduler.time, "monotonic", lambda: now[0])
+  bucket = TokenBucket(rate=2, burst=3)
+  assert [bucket.reserve() for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+  # Refills at `rate` per second, never beyond the burst
+  now[0] += 10
+  assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+def test_scheduler_sleeps_for_its_token(sleeps):
+  calendar = FakeCalendar()
+  scheduler = CalendarScheduler(calendar, rate=1, burst=1)
+  scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")
+  scheduler.get_freebusy("2030-01-08T00:00:00Z", "2030-01-09T00:00:00Z")
+  assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
+
+
+def test_async_identical_reads_share_one_call():
+  async def main():
+    calendar = AsyncFakeCalendar()
+    scheduler = AsyncCalendarScheduler(calendar, rate=100, burst=100)
+    reads = [asyncio.ensure_future(scheduler.get_freebusy("2030-01-07T00:00:00Z", "2030-01-08T00:00:00Z")) for _ in range(8)]
+    await asyncio.sleep(0)
+    # Cancelling the first caller leaves the shared call running for the rest
+    reads[0].cancel()
+    calendar.async_release.set()
+    results = await asyncio.gather(*reads[1:])
+    return calendar, results
+
+  calendar, results = asyncio.run(main())
+  assert len(calendar.calls) == 1
+  assert results == [BUSY] * 7
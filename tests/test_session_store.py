@@ -0,0 +1,160 @@
+"""SQLiteSessionStore versioning: compare-and-swap saves, rebase on conflict, clear, reopening the file"""
+import sqlite3
+import threading
+
+import pytest
+
+from src.backend.agent.metrics import SESSION_CONFLICTS
+from src.backend.agent.session import ChatMessage, ChatSession
+from src.backend.agent.session_store import SessionConflictError, SQLiteSessionStore
+
+
+@pytest.fixture
+def path(tmp_path):
+  return str(tmp_path / "sessions.db")
+
+
+def texts(session):
+  return [message.content for message in session.chat_history]
+
+
+def add_turn(session, text):
+  session.chat_history += [ChatMessage("human", text), ChatMessage("ai", f"re: {text}")]
+
+
+def test_second_writer_on_the_same_version_rebases(path):
+  # Two workers, each with its own connection and cache
+  first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+  first.get_or_create("s")
+  mine, theirs = first.get("s"), second.get("s")
+  assert mine.version == theirs.version
+
+  add_turn(mine, "a")
+  first.save(mine)
+  conflicts = SESSION_CONFLICTS._values.get((), 0)
+  add_turn(theirs, "b")
+  theirs.pending_proposal = {"summary": "Sync"}
+  second.save(theirs)
+
+  assert SESSION_CONFLICTS._values.get((), 0) == conflicts + 1
+  # The later turn lands on top of the earlier one; nothing is lost or duplicated
+  assert texts(theirs) == ["a", "re: a", "b", "re: b"]
+  stored = SQLiteSessionStore(path).get("s")
+  assert texts(stored) == texts(theirs)
+  assert stored.version == theirs.version
+  assert stored.pending_proposal == {"summary": "Sync"}
+  # The first worker's cached copy is stale and gets reloaded
+  assert texts(first.get("s")) == texts(theirs)
+
+
+def test_save_after_a_concurrent_clear_keeps_only_the_new_turn(path):
+  first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+  session = first.get_or_create("s")
+  add_turn(session, "old")
+  first.save(session)
+
+  stale = second.get("s")
+  assert second.clear("s")  # e.g. /reset handled by another worker
+  add_turn(session, "new")
+  first.save(session)
+
+  assert texts(session) == ["new", "re: new"]
+  assert texts(SQLiteSessionStore(path).get("s")) == ["new", "re: new"]
+  # The second worker's copy is stale again; clearing reloads it first
+  assert stale.version < session.version
+  assert second.clear("s")
+  assert texts(first.get("s")) == []
+
+
+def test_concurrent_writers_lose_no_turns(path):
+  stores = [SQLiteSessionStore(path) for _ in range(2)]
+  stores[0].get_or_create("s")
+
+  def write(store, name):
+    session = store.get("s")
+    for i in range(20):
+      add_turn(session, f"{name}{i}")
+      store.save(session)
+
+  threads = [threading.Thread(target=write, args=(store, name)) for store, name in zip(stores, "ab")]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  history = texts(SQLiteSessionStore(path).get("s"))
+  assert len(history) == 80
+  # Each turn's two messages stay adjacent and every writer's turns keep their order
+  assert all(reply == f"re: {turn}" for turn, reply in zip(history[::2], history[1::2]))
+  for name in "ab":
+    assert [turn for turn in history[::2] if turn.startswith(name)] == [f"{name}{i}" for i in range(20)]
+
+
+def test_clear_unknown_session(path):
+  assert SQLiteSessionStore(path).clear("missing") is False
+
+
+def test_conflict_error_when_retries_run_out(path):
+  class AlwaysConflicting(SQLiteSessionStore):
+    def _append(self, session, start_seq, messages):
+      return False
+
+  store = AlwaysConflicting(path)
+  session = store.get_or_create("s")
+  add_turn(session, "a")
+  with pytest.raises(SessionConflictError):
+    store.save(session)
+
+
+def test_reopening_the_wal_file_restores_sessions(path):
+  store = SQLiteSessionStore(path)
+  session = store.get_or_create("s")
+  session.summary, session.summarized_count = "Earlier turns", 2
+  add_turn(session, "a")
+  add_turn(session, "b")
+  store.save(session)
+  store._conn.close()
+
+  reopened = SQLiteSessionStore(path)
+  assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+  loaded = reopened.get("s")
+  assert texts(loaded) == ["a", "re: a", "b", "re: b"]
+  assert (loaded.summary, loaded.summarized_count) == ("Earlier turns", 2)
+  assert loaded.version == session.version
+  assert loaded.persisted_count == 4
+  # Only the new messages are written on the next save
+  add_turn(loaded, "c")
+  reopened.save(loaded)
+  assert reopened._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 6
+
+
+def test_reopening_a_database_from_before_versions(path):
+  conn = sqlite3.connect(path)
+  conn.executescript("""
+    CREATE TABLE sessions (session_id TEXT PRIMARY KEY, timezone TEXT NOT NULL);
+    CREATE TABLE messages (session_id TEXT NOT NULL, seq INTEGER NOT NULL, payload TEXT NOT NULL, PRIMARY KEY (session_id, seq));
+    INSERT INTO sessions VALUES ('s', 'UTC');
+    INSERT INTO messages VALUES ('s', 0, '{"type": "human", "content": "hi"}');
+  """)
+  conn.close()
+
+  store = SQLiteSessionStore(path)
+  session = store.get("s")
+  assert texts(session) == ["hi"] and session.version == 0
+  add_turn(session, "a")
+  store.save(session)
+  assert session.version == 1
+
+
+def test_approximate_size_measures_proposal_records():
+  session = ChatSession("s")
+  add_turn(session, "a")
+  base = session.approximate_size()
+  proposal = {"summary": "x" * 1000, "start": "2030-01-07T10:00:00+05:30", "end": "2030-01-07T11:00:00+05:30"}
+  session.pending_proposal = proposal
+  with_proposal = session.approximate_size()
+  # The summary string, the dict and its short keys and ISO strings; nothing scaled up
+  assert 1000 < with_proposal - base < 1700
+  # A proposal record kept in history costs the same plus its list slot (and any list growth)
+  session.chat_history.append(dict(proposal))
+  assert session.approximate_size() - with_proposal >= with_proposal - base + 8
@@ -0,0 +1,20 @@
+"""The benchmarks time-expression corpus as exact start/end assertions"""
+from datetime import datetime
+
+import pytest
+
+from benchmarks.bench_time_parser import load_corpus
+from src.backend.agent.time_parser import parse_time_expression
+
+CASES, TZ, REFERENCE = load_corpus()
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"] for case in CASES])
+def test_corpus_case(case):
+  result = parse_time_expression(case["text"], TZ, REFERENCE)
+  if case.get("error"):
+    assert "error" in result
+  else:
+    assert "error" not in result, result["error"]
+    assert result["start"] == datetime.fromisoformat(case["start"])
+    assert result["end"] == datetime.fromisoformat(case["end"])